@@ -0,0 +1,362 @@
+"""BLE hirdetések dekódolása és ismétlődésszűrése
+
+A hirdetések többsége bájtra ugyanaz, csak az RSSI változik. A pipeline ezért
+címenként megjegyzi a hasznos teher (név, gyártói adat, szolgáltatás adat, TX
+teljesítmény, UUID-k) hash-ét, az ismétlődő hirdetéseket dekódolás nélkül
+eldobja, a többit kötegekben dekódolja. A fogyasztók (nyilvántartás, GUI)
+csak a tényleges változásokat kapják meg.
+"""
+import asyncio
+import struct
+import time
+import uuid
+
+from bluetooth_metrics import metrics
+
+BASE_UUID_SUFFIX = '-0000-1000-8000-00805f9b34fb'
+
+# Bluetooth SIG cégazonosítók (részlet)
+COMPANY_NAMES = {
+    0x0006: 'Microsoft',
+    0x004C: 'Apple',
+    0x0059: 'Nordic Semiconductor',
+    0x0075: 'Samsung',
+    0x0087: 'Garmin',
+    0x00E0: 'Google',
+    0x0157: 'Anhui Huami',
+    0x0171: 'Amazon',
+    0x038F: 'Xiaomi',
+}
+
+# 16 bites szolgáltatás UUID-k (részlet)
+SERVICE_NAMES = {
+    0x1800: 'Generic Access',
+    0x1801: 'Generic Attribute',
+    0x180A: 'Device Information',
+    0x180D: 'Heart Rate',
+    0x180F: 'Battery',
+    0x1812: 'Human Interface Device',
+    0x1816: 'Cycling Speed and Cadence',
+    0x181A: 'Environmental Sensing',
+    0xFD6F: 'Exposure Notification',
+    0xFE9F: 'Google',
+    0xFEAA: 'Eddystone',
+}
+
+EDDYSTONE_URL_SCHEMES = ('http://www.', 'https://www.', 'http://', 'https://')
+EDDYSTONE_URL_CODES = ('.com/', '.org/', '.edu/', '.net/', '.info/', '.biz/', '.gov/',
+                       '.com', '.org', '.edu', '.net', '.info', '.biz', '.gov')
+
+
+def short_uuid(value):
+    """A 16 bites rövid UUID, ha a teljes UUID a Bluetooth alap UUID-ra épül, különben None"""
+    value = str(value).lower()
+    if value.startswith('0000') and value.endswith(BASE_UUID_SUFFIX) and len(value) == 36:
+        return int(value[4:8], 16)
+    return None
+
+
+def service_name(value):
+    short = short_uuid(value)
+    return SERVICE_NAMES.get(short) if short is not None else None
+
+
+# --- Dekóderek: bytes -> szótár vagy None ---
+
+def decode_ibeacon(data):
+    """Apple iBeacon (0x02 0x15 előtag, 16 bájt UUID, major, minor, mért teljesítmény)"""
+    if len(data) < 23 or data[0] != 0x02 or data[1] != 0x15:
+        return None
+    major, minor, power = struct.unpack_from('>HHb', data, 18)
+    return {'format': 'ibeacon', 'uuid': str(uuid.UUID(bytes=bytes(data[2:18]))),
+            'major': major, 'minor': minor, 'measured_power': power}
+
+
+def decode_eddystone(data):
+    """Eddystone UID, URL és TLM keretek"""
+    if not data:
+        return None
+    frame = data[0]
+    if frame == 0x00 and len(data) >= 18:
+        return {'format': 'eddystone-uid', 'tx_power': struct.unpack_from('b', data, 1)[0],
+                'namespace': bytes(data[2:12]).hex(), 'instance': bytes(data[12:18]).hex()}
+    if frame == 0x10 and len(data) >= 3:
+        if data[2] >= len(EDDYSTONE_URL_SCHEMES):
+            return None
+        url = EDDYSTONE_URL_SCHEMES[data[2]]
+        for byte in data[3:]:
+            url += EDDYSTONE_URL_CODES[byte] if byte < len(EDDYSTONE_URL_CODES) else chr(byte)
+        return {'format': 'eddystone-url', 'tx_power': struct.unpack_from('b', data, 1)[0], 'url': url}
+    if frame == 0x20 and len(data) >= 14 and data[1] == 0x00:
+        battery, temperature, adv_count, uptime = struct.unpack_from('>HhLL', data, 2)
+        return {'format': 'eddystone-tlm', 'battery_mv': battery or None,
+                'temperature': None if temperature == -0x8000 else temperature / 256,
+                'adv_count': adv_count, 'uptime': uptime / 10}
+    return None
+
+
+def decode_battery_level(data):
+    if len(data) != 1 or data[0] > 100:
+        return None
+    return {'format': 'battery', 'level': data[0]}
+
+
+# cégazonosító -> dekóder, illetve 16 bites szolgáltatás UUID -> dekóder
+MANUFACTURER_DECODERS = {
+    0x004C: decode_ibeacon,
+}
+SERVICE_DATA_DECODERS = {
+    0xFEAA: decode_eddystone,
+    0x180F: decode_battery_level,
+}
+
+
+def register_manufacturer_decoder(company_id, decoder):
+    MANUFACTURER_DECODERS[company_id] = decoder
+
+
+def register_service_data_decoder(short, decoder):
+    SERVICE_DATA_DECODERS[short] = decoder
+
+
+class ManufacturerData:
+    """Egy gyártói adatmező"""
+
+    __slots__ = ('company_id', 'company', 'data', 'decoded')
+
+    def __init__(self, company_id, data):
+        self.company_id = company_id
+        self.company = COMPANY_NAMES.get(company_id)
+        self.data = data
+        decoder = MANUFACTURER_DECODERS.get(company_id)
+        self.decoded = _safe_decode(decoder, data)
+
+    def as_dict(self):
+        return {'company_id': self.company_id, 'company': self.company,
+                'data': self.data.hex(), 'decoded': self.decoded}
+
+
+class ServiceData:
+    """Egy szolgáltatás adatmező"""
+
+    __slots__ = ('uuid', 'name', 'data', 'decoded')
+
+    def __init__(self, service_uuid, data):
+        self.uuid = service_uuid
+        self.name = service_name(service_uuid)
+        self.data = data
+        decoder = SERVICE_DATA_DECODERS.get(short_uuid(service_uuid))
+        self.decoded = _safe_decode(decoder, data)
+
+    def as_dict(self):
+        return {'uuid': self.uuid, 'name': self.name, 'data': self.data.hex(), 'decoded': self.decoded}
+
+
+def _safe_decode(decoder, data):
+    if decoder is None:
+        return None
+    try:
+        return decoder(data)
+    except Exception as e:
+        # Hibás hirdetés nem állíthatja meg a keresést
+        print(f"Hiba a hirdetés dekódolása során: {str(e)}")
+        return None
+
+
+def advertisement_payload(device, advertisement_data):
+    """(név, gyártói adat, szolgáltatás adat, TX teljesítmény, UUID-k) rendezett, hash-elhető alakban
+
+    Régebbi bleak verzióknál az adatok a device.metadata szótárban vannak.
+    """
+    if advertisement_data is not None:
+        name = advertisement_data.local_name or device.name
+        manufacturer_data = getattr(advertisement_data, 'manufacturer_data', None) or {}
+        service_data = getattr(advertisement_data, 'service_data', None) or {}
+        service_uuids = getattr(advertisement_data, 'service_uuids', None) or ()
+        tx_power = getattr(advertisement_data, 'tx_power', None)
+    else:
+        metadata = getattr(device, 'metadata', None) or {}
+        name = device.name
+        manufacturer_data = metadata.get('manufacturer_data') or {}
+        service_data = metadata.get('service_data') or {}
+        service_uuids = metadata.get('uuids') or ()
+        tx_power = None
+    return (name,
+            tuple(sorted((k, bytes(v)) for k, v in manufacturer_data.items())),
+            tuple(sorted((str(k).lower(), bytes(v)) for k, v in service_data.items())),
+            tx_power,
+            tuple(sorted(str(u).lower() for u in service_uuids)))
+
+
+class Advertisement:
+    """Egy eszköz legutóbbi dekódolt hirdetése"""
+
+    __slots__ = ('address', 'local_name', 'rssi', 'tx_power', 'manufacturer_data', 'service_data',
+                 'service_uuids', 'first_seen', 'last_seen', 'raw_count', 'changes', 'device',
+                 'advertisement_data', '_key')
+
+    def __init__(self, address, timestamp):
+        self.address = address
+        self.local_name = None
+        self.rssi = None
+        self.tx_power = None
+        self.manufacturer_data = []
+        self.service_data = []
+        self.service_uuids = ()
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        # A legutóbbi továbbadás óta beérkezett nyers hirdetések száma
+        self.raw_count = 0
+        # Mi változott a legutóbbi továbbadás óta: 'new', 'payload', 'rssi' (vagy a végén 'seen')
+        self.changes = frozenset()
+        self.device = None
+        self.advertisement_data = None
+        self._key = None
+
+    def decode(self, payload):
+        name, manufacturer_data, service_data, tx_power, service_uuids = payload
+        self.local_name = name
+        self.tx_power = tx_power
+        self.manufacturer_data = [ManufacturerData(company_id, data) for company_id, data in manufacturer_data]
+        self.service_data = [ServiceData(service_uuid, data) for service_uuid, data in service_data]
+        self.service_uuids = service_uuids
+
+    def service_names(self):
+        return [service_name(u) or u for u in self.service_uuids]
+
+    def as_dict(self):
+        return {
+            'address': self.address,
+            'local_name': self.local_name,
+            'rssi': self.rssi,
+            'tx_power': self.tx_power,
+            'manufacturer_data': [m.as_dict() for m in self.manufacturer_data],
+            'service_data': [s.as_dict() for s in self.service_data],
+            'service_uuids': list(self.service_uuids),
+        }
+
+    def __repr__(self):
+        return f"<Advertisement {self.address} {self.local_name!r} rssi={self.rssi}>"
+
+
+def format_advertisement(advert):
+    """A dekódolt hirdetés ember által olvasható sorai"""
+    lines = []
+    if advert.tx_power is not None:
+        lines.append(f"TX teljesítmény: {advert.tx_power} dBm")
+    if advert.service_uuids:
+        lines.append(f"Szolgáltatások: {', '.join(advert.service_names())}")
+    for m in advert.manufacturer_data:
+        company = m.company or f"0x{m.company_id:04X}"
+        lines.append(f"Gyártói adat ({company}): {m.decoded if m.decoded else m.data.hex()}")
+    for s in advert.service_data:
+        lines.append(f"Szolgáltatás adat ({s.name or s.uuid}): {s.decoded if s.decoded else s.data.hex()}")
+    return lines
+
+
+class AdvertisementPipeline:
+    """Hirdetések gyűjtése, ismétlődésszűrése és kötegelt dekódolása
+
+    A feed() a detection callback-ből hívható és csak eltárolja a hirdetést (egy
+    köteg alatt címenként a legutóbbi marad meg). A flush() köteg szinten
+    ellenőrzi a (cím, hasznos teher) hash-t: változatlan tehernél nincs dekódolás,
+    és az eszköz csak akkor megy tovább, ha az RSSI legalább rssi_delta dB-t
+    változott. A változott hirdetéseket a on_changes(list) kapja meg.
+    Az eseményhurok szálából használandó.
+    """
+
+    def __init__(self, on_changes=None, batch_size=64, batch_interval=0.1, rssi_delta=2):
+        self.on_changes = on_changes
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.rssi_delta = rssi_delta
+        self.adverts = {}
+        self._pending = {}
+        self._raw_counts = {}
+        self.received = 0
+        self.duplicates = 0
+        self.decoded = 0
+
+    def __len__(self):
+        return len(self.adverts)
+
+    def get(self, address):
+        return self.adverts.get(address)
+
+    def feed(self, device, advertisement_data=None):
+        self.received += 1
+        address = device.address
+        self._pending[address] = (device, advertisement_data, time.monotonic())
+        self._raw_counts[address] = self._raw_counts.get(address, 0) + 1
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self, final=False):
+        """A függő hirdetések feldolgozása; a változott hirdetések listáját adja vissza
+
+        final=True esetén (a keresés végén) a csak ismétlődést kapott eszközök is
+        továbbmennek 'seen' változással, hogy a fogyasztók észlelésszámai pontosak legyenek.
+        """
+        if not self._pending and not final:
+            return []
+        pending, self._pending = self._pending, {}
+        raw_counts, self._raw_counts = self._raw_counts, {}
+        changed = []
+        duplicates = 0
+        for address, (device, advertisement_data, timestamp) in pending.items():
+            payload = advertisement_payload(device, advertisement_data)
+            key = hash((address, payload))
+            rssi = getattr(advertisement_data, 'rssi', None)
+            if rssi is None:
+                rssi = getattr(device, 'rssi', None)
+            advert = self.adverts.get(address)
+            changes = set()
+            if advert is None:
+                advert = self.adverts[address] = Advertisement(address, timestamp)
+                changes.add('new')
+            advert.last_seen = timestamp
+            advert.raw_count += raw_counts.get(address, 1)
+            advert.device = device
+            advert.advertisement_data = advertisement_data
+            if key != advert._key:
+                advert.decode(payload)
+                advert._key = key
+                self.decoded += 1
+                changes.add('payload')
+            if rssi is not None and (advert.rssi is None or abs(rssi - advert.rssi) >= self.rssi_delta):
+                advert.rssi = rssi
+                changes.add('rssi')
+            if not changes:
+                duplicates += 1
+                continue
+            advert.changes = frozenset(changes)
+            changed.append(advert)
+        # A batch-en belül összevont hirdetések is ismétlődésnek számítanak
+        duplicates += sum(raw_counts.values()) - len(pending)
+        self.duplicates += duplicates
+        metrics.inc('bluetooth_adverts_total', len(changed), result='changed')
+        metrics.inc('bluetooth_adverts_total', duplicates, result='duplicate')
+        if final:
+            delivered = set(id(advert) for advert in changed)
+            for advert in self.adverts.values():
+                if advert.raw_count and id(advert) not in delivered:
+                    advert.changes = frozenset(('seen',))
+                    changed.append(advert)
+        if changed and self.on_changes is not None:
+            self.on_changes(changed)
+        for advert in changed:
+            advert.raw_count = 0
+        return changed
+
+    async def run(self):
+        """Időzített kiürítés batch_interval-onként, megszakításig"""
+        try:
+            while True:
+                await asyncio.sleep(self.batch_interval)
+                self.flush()
+        finally:
+            self.flush(final=True)
+
+    def stats(self):
+        return {'received': self.received, 'duplicates': self.duplicates,
+                'decoded': self.decoded, 'devices': len(self.adverts)}
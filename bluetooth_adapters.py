@@ -0,0 +1,260 @@
+"""Több Bluetooth vezérlő (HCI adapter) közötti ütemezés
+
+Egyetlen rádión a keresés és a kapcsolódás versenyez egymással. Több adapter
+esetén a feladatok szétoszthatók: szerep szerint (az egyik keres, a többi
+kapcsolódik) vagy eszköz-szeletek szerint (a cím hash-e dönti el, melyik
+adapter kapcsolódik). A kapcsolódási helyek adapterenként korlátosak, az
+ütemező mindig a legkevésbé terhelt adaptert választja, és adapterenként
+számolja a kereséseket, hirdetéseket és kapcsolódásokat.
+
+Linuxon az adapterek a /sys/class/bluetooth alól kerülnek elő; más rendszeren
+(vagy adapter nélkül) egyetlen alapértelmezett adapter van, amely a háttereknek
+nem ad át adapter paramétert.
+"""
+import asyncio
+import os
+import re
+import zlib
+
+from bluetooth_metrics import metrics
+
+SYSFS_BLUETOOTH = '/sys/class/bluetooth'
+SCAN = 'scan'
+CONNECT = 'connect'
+ROLES = (SCAN, CONNECT)
+
+_HCI_NAME = re.compile(r'^hci(\d+)$')
+
+
+class Adapter:
+    """Egy HCI vezérlő, a szerepei és a számlálói"""
+
+    def __init__(self, name=None, index=None, address=None, roles=ROLES, max_connections=4):
+        self.name = name
+        self.index = index
+        self.address = address
+        self.roles = set(roles)
+        self.max_connections = max_connections
+        self.active = 0
+        self.counters = {'scans': 0, 'scan_seconds': 0.0, 'adverts': 0, 'inquiries': 0,
+                         'connects': 0, 'connect_failures': 0, 'connect_seconds': 0.0, 'peak_active': 0}
+
+    @property
+    def label(self):
+        return self.name or 'default'
+
+    def bleak_kwargs(self):
+        """A bleak BleakScanner/BleakClient adapter paramétere (alapértelmezett adapternél üres)"""
+        return {'adapter': self.name} if self.name else {}
+
+    def pybluez_kwargs(self):
+        """A PyBluez discover_devices/DeviceDiscoverer device_id paramétere"""
+        return {'device_id': self.index} if self.index is not None else {}
+
+    def bind_address(self):
+        """Helyi cím, amelyhez az RFCOMM socket köthető (None: az alapértelmezett útvonal)"""
+        return self.address
+
+    def record_connect(self, ok, seconds, transport='ble'):
+        self.counters['connects' if ok else 'connect_failures'] += 1
+        self.counters['connect_seconds'] += seconds
+        metrics.inc('bluetooth_adapter_connects_total', adapter=self.label, transport=transport,
+                    outcome='ok' if ok else 'failed')
+
+    def record_scan(self, seconds, adverts=0, inquiries=0):
+        self.counters['scans'] += 1
+        self.counters['scan_seconds'] += seconds
+        self.counters['adverts'] += adverts
+        self.counters['inquiries'] += inquiries
+        metrics.inc('bluetooth_adapter_scan_seconds_total', seconds, adapter=self.label)
+
+    def load(self):
+        return self.active / self.max_connections if self.max_connections else 1.0
+
+    def as_dict(self):
+        return {'adapter': self.label, 'address': self.address, 'roles': sorted(self.roles),
+                'active': self.active, 'max_connections': self.max_connections, **self.counters}
+
+    def __repr__(self):
+        return f"<Adapter {self.label} {sorted(self.roles)} {self.active}/{self.max_connections}>"
+
+
+def discover_adapters(root=SYSFS_BLUETOOTH):
+    """A rendszer HCI adapterei index szerint rendezve; ha nincs ilyen, üres lista"""
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return []
+    adapters = []
+    for name in names:
+        match = _HCI_NAME.match(name)
+        if match is None:
+            # pl. hci0:12 - kapcsolat bejegyzés, nem adapter
+            continue
+        address = None
+        try:
+            with open(os.path.join(root, name, 'address')) as f:
+                address = f.read().strip().upper() or None
+        except OSError:
+            pass
+        adapters.append(Adapter(name, int(match.group(1)), address))
+    return sorted(adapters, key=lambda a: a.index)
+
+
+def parse_roles(specs):
+    """'hci0=scan' 'hci1=connect' 'hci2=scan,connect' alakú megadás -> {név: szerepek}"""
+    roles = {}
+    for spec in specs or ():
+        name, _, value = spec.partition('=')
+        wanted = {role.strip() for role in value.split(',') if role.strip()}
+        unknown = wanted - set(ROLES)
+        if not name or not wanted or unknown:
+            raise ValueError(f"Érvénytelen adapter szerep: {spec}")
+        roles[name.strip()] = wanted
+    return roles
+
+
+class AdapterScheduler:
+    """Keresési és kapcsolódási feladatok szétosztása az adapterek között
+
+    - szerep mód (alapértelmezés): két vagy több adapternél az első keres, a többi kapcsolódik
+    - szelet mód (shards=True): minden adapter keres, és a cím hash-e szerinti adapter kapcsolódik
+    A kapcsolódási helyeket az acquire()/release() pár foglalja le a kapcsolat teljes idejére.
+    """
+
+    def __init__(self, adapters=None, roles=None, shards=False, max_connections=4, root=SYSFS_BLUETOOTH):
+        self._adapters = adapters
+        self._roles = roles or {}
+        self.shards = shards
+        self.max_connections = max_connections
+        self.root = root
+        self._condition = None
+        self._loop = None
+        self._reclaimers = []
+
+    def configure(self, names=None, roles=None, shards=None, max_connections=None):
+        """Beállítás a parancssorból; a már felderített adapterek listája újraépül"""
+        if roles is not None:
+            self._roles = roles
+        if shards is not None:
+            self.shards = shards
+        if max_connections is not None:
+            self.max_connections = max_connections
+        self._adapters = None
+        if names:
+            detected = {a.name: a for a in discover_adapters(self.root)}
+            self._adapters = [detected.get(name) or Adapter(name, _adapter_index(name)) for name in names]
+            self._assign_roles(self._adapters)
+
+    @property
+    def adapters(self):
+        if self._adapters is None:
+            # Felderítés az első használatkor
+            self._adapters = discover_adapters(self.root) or [Adapter()]
+            self._assign_roles(self._adapters)
+        return self._adapters
+
+    def _assign_roles(self, adapters):
+        for i, adapter in enumerate(adapters):
+            adapter.max_connections = self.max_connections
+            if adapter.name in self._roles:
+                adapter.roles = set(self._roles[adapter.name])
+            elif self.shards or len(adapters) == 1:
+                adapter.roles = set(ROLES)
+            else:
+                adapter.roles = {SCAN} if i == 0 else {CONNECT}
+        # Minden szerepre kell legalább egy adapter
+        for role in ROLES:
+            if not any(role in a.roles for a in adapters):
+                for adapter in adapters:
+                    adapter.roles.add(role)
+
+    def with_role(self, role):
+        return [a for a in self.adapters if role in a.roles]
+
+    def capacity(self):
+        """Egyszerre nyitható kapcsolatok száma az összes kapcsolódó adapteren"""
+        return sum(a.max_connections for a in self.with_role(CONNECT))
+
+    def scan_plan(self, use_ble=True, use_classic=True):
+        """(BLE adapterek listája, klasszikus inquiry adapter)
+
+        A klasszikus inquiry elveszi a rádiót a BLE keresés elől, ezért ha több kereső
+        adapter van, az inquiry az utolsón fut, a BLE keresés a többin.
+        """
+        scanners = self.with_role(SCAN)
+        classic = scanners[-1] if use_classic else None
+        if use_ble and use_classic and len(scanners) > 1:
+            return scanners[:-1], classic
+        return (scanners if use_ble else []), classic
+
+    def _candidates(self, address):
+        connectors = self.with_role(CONNECT)
+        if self.shards and address is not None:
+            return [connectors[zlib.crc32(address.upper().encode()) % len(connectors)]]
+        return connectors
+
+    def _pick(self, address):
+        free = [a for a in self._candidates(address) if a.active < a.max_connections]
+        return min(free, key=lambda a: (a.load(), a.counters['connects'])) if free else None
+
+    def add_reclaimer(self, reclaim):
+        """reclaim(adapters) korutin: ha van tétlen kapcsolata a megadott adapterek egyikén, bontja és igazat ad
+
+        Foglalt adapterek esetén az acquire() előbb ezeket kéri meg egy hely felszabadítására.
+        """
+        self._reclaimers.append(reclaim)
+
+    def remove_reclaimer(self, reclaim):
+        if reclaim in self._reclaimers:
+            self._reclaimers.remove(reclaim)
+
+    async def _reclaim(self, address):
+        candidates = self._candidates(address)
+        for reclaim in list(self._reclaimers):
+            if await reclaim(candidates):
+                return True
+        return False
+
+    async def acquire(self, address=None):
+        """Kapcsolódási hely foglalása a legkevésbé terhelt (szelet módban a címhez tartozó) adapteren"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Új eseményhurok (pl. újabb asyncio.run): a régi hurokhoz kötött feltétel nem használható
+            self._condition = asyncio.Condition()
+            self._loop = loop
+        async with self._condition:
+            while True:
+                adapter = self._pick(address)
+                if adapter is not None:
+                    break
+                if not await self._reclaim(address):
+                    await self._condition.wait()
+            adapter.active += 1
+            adapter.counters['peak_active'] = max(adapter.counters['peak_active'], adapter.active)
+        return adapter
+
+    def release(self, adapter):
+        """A kapcsolódási hely felszabadítása (a kapcsolat bontása vagy sikertelen kapcsolódás után)"""
+        if adapter is None or adapter.active <= 0:
+            return
+        adapter.active -= 1
+        if self._loop is not None and not self._loop.is_closed():
+            # Bármely szálból hívható: a várakozók értesítése a hurok szálában történik
+            self._loop.call_soon_threadsafe(lambda: self._loop.create_task(self._notify()))
+
+    async def _notify(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    def stats(self):
+        return [adapter.as_dict() for adapter in self.adapters]
+
+
+def _adapter_index(name):
+    match = _HCI_NAME.match(name or '')
+    return int(match.group(1)) if match else None
+
+
+# Folyamatszintű alapértelmezett ütemező, a CLI és a GUI is ezt használja
+default_adapters = AdapterScheduler()
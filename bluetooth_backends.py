@@ -0,0 +1,128 @@
+"""Külső hátterek késleltetett betöltése és képesség-nyilvántartás
+
+A bleak, PyBluez (bluetooth), lightblue, netifaces és nmap modul csak az első
+tényleges használatkor töltődik be, így egy sima BLE keresés nem fizet a
+klasszikus vagy hálózati hátterek importjáért. Ha egy csomag hiányzik, csak a
+hozzá tartozó funkció esik ki: available() előre megmondja, mi használható,
+a hiányzó modul használata pedig BackendUnavailable hibát ad telepítési tippel.
+"""
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+
+# név -> (pip csomag, mire kell)
+BACKENDS = {
+    'bleak': ('bleak', "BLE keresés és kapcsolódás"),
+    'bluetooth': ('PyBluez', "klasszikus Bluetooth keresés, SDP és RFCOMM"),
+    'lightblue': ('lightblue', "lightblue alapú kapcsolódás"),
+    'netifaces': ('netifaces', "hálózati interfész adatok"),
+    'nmap': ('python-nmap', "hoszt részletek nmap-pel"),
+}
+
+
+class BackendUnavailable(ImportError):
+    """A kért háttérmodul nincs telepítve vagy nem tölthető be"""
+
+    def __init__(self, name, reason=None):
+        package, purpose = BACKENDS.get(name, (name, name))
+        message = f"A(z) {name} háttér nem elérhető ({purpose}); telepítés: pip install {package}"
+        if reason:
+            message += f" - {reason}"
+        super().__init__(message, name=name)
+        self.backend = name
+
+
+class BackendRegistry:
+    """A hátterek állapota: elérhető-e, betöltődött-e, mennyi ideig tartott"""
+
+    def __init__(self, backends=BACKENDS):
+        self.backends = backends
+        self._modules = {}
+        self._errors = {}
+        self._load_times = {}
+        self._lock = threading.Lock()
+
+    def available(self, name):
+        """Telepítve van-e a modul (betöltés nélkül ellenőrizve)"""
+        if name in self._modules:
+            return True
+        if name in self._errors:
+            return False
+        if name in sys.modules:
+            return sys.modules[name] is not None
+        try:
+            return importlib.util.find_spec(name) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def load(self, name):
+        """A modul betöltése első használatkor; hiba esetén BackendUnavailable"""
+        module = self._modules.get(name)
+        if module is not None:
+            return module
+        with self._lock:
+            if name in self._modules:
+                return self._modules[name]
+            if name in self._errors:
+                raise BackendUnavailable(name, self._errors[name])
+            start_time = time.perf_counter()
+            try:
+                module = importlib.import_module(name)
+            except Exception as e:
+                # Nem csak ImportError: egyes hátterek betöltéskor a rendszert is ellenőrzik
+                self._errors[name] = str(e)
+                raise BackendUnavailable(name, str(e)) from e
+            self._load_times[name] = time.perf_counter() - start_time
+            self._modules[name] = module
+            return module
+
+    def loaded(self):
+        """A már betöltött hátterek nevei"""
+        return sorted(self._modules)
+
+    def capabilities(self):
+        """Háttérenkénti állapot jelentés"""
+        report = {}
+        for name, (package, purpose) in self.backends.items():
+            report[name] = {
+                'available': self.available(name),
+                'loaded': name in self._modules,
+                'load_seconds': self._load_times.get(name),
+                'error': self._errors.get(name),
+                'package': package,
+                'purpose': purpose,
+            }
+        return report
+
+
+class LazyModule:
+    """Modul helyettesítő, amely az első attribútum eléréskor tölti be a valódi modult"""
+
+    def __init__(self, name, registry):
+        self._name = name
+        self._registry = registry
+
+    def __getattr__(self, attribute):
+        return getattr(self._registry.load(self._name), attribute)
+
+    def __repr__(self):
+        state = 'betöltve' if self._name in self._registry.loaded() else 'nincs betöltve'
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+registry = BackendRegistry()
+
+bleak = LazyModule('bleak', registry)
+bluetooth = LazyModule('bluetooth', registry)
+lightblue = LazyModule('lightblue', registry)
+netifaces = LazyModule('netifaces', registry)
+nmap = LazyModule('nmap', registry)
+
+
+def print_capabilities():
+    """A hátterek állapotának kiírása"""
+    for name, info in registry.capabilities().items():
+        state = "elérhető" if info['available'] else f"hiányzik (pip install {info['package']})"
+        print(f"{name:10} {state:40} {info['purpose']}")
@@ -0,0 +1,509 @@
+"""Teljesítménymérés szimulált Bluetooth hátterekkel
+
+Valódi rádió nélkül méri a keresés, a csatorna-feloldás, a BLE kapcsolódás és
+a monitorozás idejét. A bluetooth/bleak (és a többi külső) modult folyamaton
+belüli szimulációval helyettesíti, mielőtt a fő programot betöltené; az
+eszközök száma, a késleltetések és a hibaarány paraméterezhető. Az eredmény
+JSON, így a futások összehasonlíthatók.
+
+Használat: python bluetooth_bench.py --ble-devices 200 --failure-rate 0.1 -o eredmeny.json
+"""
+import argparse
+import asyncio
+import contextlib
+import heapq
+import importlib.util
+import io
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+from bluetooth_fakes import RFCOMM, BluetoothError, make_fake_bluetooth_module
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import bluetooth.py")
+# Csak BLE keresés esetén a program betöltése ennyi időn belül kell maradjon (másodperc)
+STARTUP_TARGET = 0.25
+
+
+class SimConfig:
+    """A szimulált környezet paraméterei (idők másodpercben)"""
+
+    def __init__(self, ble_devices=20, classic_devices=5, adv_interval=0.1, inquiry_time=1.0,
+                 connect_latency=0.05, connect_jitter=0.02, rfcomm_latency=0.02, sdp_latency=0.05,
+                 sdp=True, open_channels=(5,), failure_rate=0.0, seed=1):
+        self.ble_devices = ble_devices
+        self.classic_devices = classic_devices
+        self.adv_interval = adv_interval
+        self.inquiry_time = inquiry_time
+        self.connect_latency = connect_latency
+        self.connect_jitter = connect_jitter
+        self.rfcomm_latency = rfcomm_latency
+        self.sdp_latency = sdp_latency
+        self.sdp = sdp
+        self.open_channels = set(open_channels)
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.ble_addresses = ["11:22:33:%02X:%02X:%02X" % (i >> 16 & 0xFF, i >> 8 & 0xFF, i & 0xFF)
+                              for i in range(ble_devices)]
+        self.classic_addresses = ["AA:BB:CC:%02X:%02X:%02X" % (i >> 16 & 0xFF, i >> 8 & 0xFF, i & 0xFF)
+                                  for i in range(classic_devices)]
+
+    def latency(self, mean, jitter=0.0):
+        return max(0.0, self.random.gauss(mean, jitter)) if jitter else mean
+
+    def fails(self):
+        return self.random.random() < self.failure_rate
+
+    def as_dict(self):
+        return {k: (sorted(v) if isinstance(v, set) else v) for k, v in vars(self).items()
+                if not k.startswith(('random', 'ble_addresses', 'classic_addresses'))}
+
+
+# --- Szimulált modulok ---
+
+def make_bluetooth_module(config):
+    """PyBluez helyettesítő: inquiry, SDP, RFCOMM socket és RSSI-t jelentő DeviceDiscoverer"""
+
+    class BluetoothSocket:
+        def __init__(self, proto=RFCOMM):
+            self.timeout = None
+            self.peer = None
+
+        def settimeout(self, timeout):
+            self.timeout = timeout
+
+        def bind(self, address):
+            # A helyi adapter címe nem számít
+            pass
+
+        def setblocking(self, flag):
+            pass
+
+        def connect(self, address):
+            time.sleep(config.latency(config.rfcomm_latency))
+            if address[1] not in config.open_channels:
+                raise BluetoothError("Host is down")
+            if config.fails():
+                raise BluetoothError("Connection timed out")
+            self.peer = address
+
+        def getpeername(self):
+            return self.peer
+
+        def close(self):
+            self.peer = None
+
+    def discover_devices(duration=8, lookup_names=False, **kwargs):
+        time.sleep(min(duration * 1.28, config.inquiry_time))
+        if lookup_names:
+            return [(a, f"classic{i}") for i, a in enumerate(config.classic_addresses)]
+        return list(config.classic_addresses)
+
+    def inquiry(duration, cancel):
+        end_time = time.monotonic() + min(duration * 1.28, config.inquiry_time)
+        addresses = config.classic_addresses or config.ble_addresses
+        while addresses and not cancel.is_set() and time.monotonic() < end_time:
+            index = config.random.randrange(len(addresses))
+            name = f"classic{index}" if config.classic_addresses else None
+            yield addresses[index], 0x5A020C, config.random.randint(-90, -40), name
+            time.sleep(config.adv_interval / max(1, len(addresses)))
+
+    def service_channels(address):
+        time.sleep(config.sdp_latency)
+        return sorted(config.open_channels) if config.sdp else []
+
+    def lookup_name(address, timeout=10):
+        return f"classic-{address[-2:]}"
+
+    return make_fake_bluetooth_module(BluetoothSocket, discover_devices, inquiry, service_channels, lookup_name)
+
+
+def make_bleak_module(config):
+    """bleak helyettesítő: hirdetésütemező szkenner és késleltetett, hibázó kliens"""
+    module = types.ModuleType('bleak')
+
+    class BLEDevice:
+        def __init__(self, address, name, rssi):
+            self.address = address
+            self.name = name
+            self.rssi = rssi
+            self.metadata = {}
+            self.details = None
+
+    class AdvertisementData:
+        def __init__(self, rssi, local_name=None):
+            self.rssi = rssi
+            self.local_name = local_name
+            self.manufacturer_data = {}
+            self.service_data = {}
+            self.service_uuids = []
+            self.tx_power = None
+
+    class BleakScanner:
+        def __init__(self, detection_callback=None, **kwargs):
+            self._callback = detection_callback
+            self._task = None
+            self.advertisements = 0
+
+        async def _advertise(self):
+            # Minden eszköz adv_interval időközönként hirdet, véletlen kezdőfázissal
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            schedule = [(start + config.random.uniform(0, config.adv_interval), i)
+                        for i in range(len(config.ble_addresses))]
+            heapq.heapify(schedule)
+            while schedule:
+                due, index = schedule[0]
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                now = loop.time()
+                while schedule and schedule[0][0] <= now:
+                    due, index = heapq.heappop(schedule)
+                    address = config.ble_addresses[index]
+                    rssi = config.random.randint(-90, -40)
+                    self.advertisements += 1
+                    if self._callback is not None:
+                        self._callback(BLEDevice(address, f"ble{index}", rssi),
+                                       AdvertisementData(rssi, f"ble{index}"))
+                    heapq.heappush(schedule, (due + config.adv_interval, index))
+
+        async def start(self):
+            self._task = asyncio.ensure_future(self._advertise())
+
+        async def stop(self):
+            if self._task is not None:
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+                self._task = None
+
+        @classmethod
+        async def discover(cls, timeout=5.0, **kwargs):
+            devices = {}
+            scanner = cls(detection_callback=lambda d, a: devices.__setitem__(d.address, d))
+            await scanner.start()
+            await asyncio.sleep(timeout)
+            await scanner.stop()
+            return list(devices.values())
+
+    class BleakClient:
+        def __init__(self, address, timeout=10.0, disconnected_callback=None, **kwargs):
+            self.address = address
+            self.is_connected = False
+            self.services = []
+            self._disconnected_callback = disconnected_callback
+
+        async def connect(self, timeout=10.0):
+            latency = config.latency(config.connect_latency, config.connect_jitter)
+            if latency > timeout:
+                await asyncio.sleep(timeout)
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(latency)
+            if config.fails():
+                raise OSError("Device busy")
+            self.is_connected = True
+            return True
+
+        async def disconnect(self):
+            self.is_connected = False
+            return True
+
+        async def get_services(self):
+            return self.services
+
+        async def __aenter__(self):
+            await self.connect()
+            return self
+
+        async def __aexit__(self, *exc_info):
+            await self.disconnect()
+
+    module.BLEDevice = BLEDevice
+    module.AdvertisementData = AdvertisementData
+    module.BleakScanner = BleakScanner
+    module.BleakClient = BleakClient
+    return module
+
+
+def make_stub_modules():
+    """A méréshez nem használt külső függőségek (lightblue, nmap, netifaces) csonkjai"""
+    lightblue = types.ModuleType('lightblue')
+
+    class LightblueError(OSError):
+        pass
+
+    lightblue.BluetoothError = LightblueError
+    lightblue.gethostaddress = lambda: '00:00:00:00:00:00'
+    lightblue.finddevices = lambda *args, **kwargs: []
+    lightblue.findservices = lambda *args, **kwargs: []
+    lightblue.socket = lambda *args, **kwargs: None
+
+    nmap = types.ModuleType('nmap')
+
+    class PortScanner:
+        def scan(self, *args, **kwargs):
+            return {}
+
+        def all_hosts(self):
+            return []
+
+    nmap.PortScanner = PortScanner
+
+    netifaces = types.ModuleType('netifaces')
+    netifaces.AF_INET = 2
+    netifaces.gateways = lambda: {'default': {}}
+    netifaces.interfaces = lambda: ['lo']
+    netifaces.ifaddresses = lambda iface: {2: [{'addr': '127.0.0.1'}]}
+    return {'lightblue': lightblue, 'nmap': nmap, 'netifaces': netifaces}
+
+
+def install_simulation(config):
+    """A szimulált modulok betöltése a sys.modules-ba (a fő program importja előtt kell hívni)"""
+    modules = make_stub_modules()
+    modules['bluetooth'] = make_bluetooth_module(config)
+    modules['bleak'] = make_bleak_module(config)
+    sys.modules.update(modules)
+    # Szimulációban a gép valódi adapterei (sysfs, rfkill) nem számítanak
+    from bluetooth_transports import default_health
+    default_health.assume(True)
+    return modules
+
+
+def load_cli(path=SCRIPT_PATH):
+    """A fő program betöltése modulként (a fájlnév szóközt tartalmaz, ezért importlib-bel)"""
+    spec = importlib.util.spec_from_file_location('bluetooth_cli', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- Mérések ---
+
+def summarize(values):
+    """Darabszám, átlag, min/max és percentilisek (p50/p90/p99)"""
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+
+    def pick(fraction):
+        position = (len(values) - 1) * fraction
+        lower, upper = math.floor(position), math.ceil(position)
+        return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values),
+        'min': values[0],
+        'max': values[-1],
+        'p50': pick(0.50),
+        'p90': pick(0.90),
+        'p99': pick(0.99),
+    }
+
+
+async def bench_discovery(cli, config, runs=3, scan_timeout=2.0):
+    """Keresés indításától a kész eszközlistáig eltelt idő (korai leállással, ha minden eszköz megvan)"""
+    total = len(config.ble_addresses) + len(config.classic_addresses)
+    times = []
+    found = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        devices = await cli.discover_all_devices(scan_timeout, target_count=total)
+        times.append(time.perf_counter() - start_time)
+        found.append(len(devices))
+    return {'expected_devices': total, 'found': found, 'seconds': summarize(times)}
+
+
+def bench_channel_resolution(cli, config, runs=3):
+    """RFCOMM csatorna feloldási idő forrásonként (SDP/próbálgatás, majd gyorsítótár)"""
+    from bluetooth_cache import DeviceCache
+
+    address = config.classic_addresses[0] if config.classic_addresses else "AA:BB:CC:00:00:00"
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DeviceCache(os.path.join(tmp, 'cache.json'))
+        for phase, use_cache in (('cold', None), ('cached', cache)):
+            times = []
+            sources = []
+            if use_cache is not None:
+                # Egy feloldás a gyorsítótár feltöltéséhez
+                warm = cli.resolve_rfcomm_channel(address, cache=cache)
+                if warm:
+                    warm['socket'].close()
+            for _ in range(runs):
+                result = cli.resolve_rfcomm_channel(address, cache=use_cache)
+                if result:
+                    times.append(result['elapsed'])
+                    sources.append(result['source'])
+                    result['socket'].close()
+            results[phase] = {'sources': sources, 'seconds': summarize(times)}
+        cache.close()
+    return results
+
+
+async def bench_connect(cli, config, attempts=50, max_attempts=3, base_delay=0.05):
+    """BLE kapcsolódás sikeres késleltetése (újrapróbálkozásokkal együtt) és sikerességi arány"""
+    from bluetooth_retry import RetryPolicy, RetryScheduler
+
+    scheduler = RetryScheduler(RetryPolicy(max_attempts=max_attempts, base_delay=base_delay))
+    addresses = config.ble_addresses or ["11:22:33:00:00:00"]
+    times = []
+    failures = 0
+    for i in range(attempts):
+        start_time = time.perf_counter()
+        client = await cli.ble_connect_with_retry(addresses[i % len(addresses)], max_attempts=max_attempts,
+                                                  scheduler=scheduler)
+        if client is None:
+            failures += 1
+            continue
+        times.append(time.perf_counter() - start_time)
+        await client.disconnect()
+    return {
+        'attempts': attempts,
+        'success_rate': (attempts - failures) / attempts if attempts else None,
+        'seconds': summarize(times)
+    }
+
+
+async def bench_monitor(cli, config, duration=2.0, sample_rate=5.0, mode='ble'):
+    """Monitorozás többletideje és processzoridő-igénye a mért időtartamhoz képest"""
+    addresses = config.ble_addresses if mode == 'ble' else config.classic_addresses
+    address = addresses[0] if addresses else "11:22:33:00:00:00"
+    cpu_start = time.process_time()
+    start_time = time.perf_counter()
+    stats = await cli.monitor_device_connection(address, duration=duration, sample_rate=sample_rate, mode=mode)
+    elapsed = time.perf_counter() - start_time
+    cpu = time.process_time() - cpu_start
+    return {
+        'mode': mode,
+        'duration': duration,
+        'elapsed': elapsed,
+        'overhead': elapsed - duration,
+        'cpu_seconds': cpu,
+        'cpu_percent': cpu / elapsed * 100 if elapsed else None,
+        'samples': stats['samples'],
+        'detection_rate': stats['detection_rate']
+    }
+
+
+async def startup_probe(config, scan_timeout):
+    """Friss folyamatban fut: betöltési idő és a csak BLE keresés során betöltött hátterek"""
+    process_start = time.perf_counter()
+    install_simulation(config)
+    cli = load_cli()
+    loaded = time.perf_counter()
+    from bluetooth_backends import registry
+
+    loaded_at_startup = registry.loaded()
+    with contextlib.redirect_stdout(io.StringIO()):
+        devices = await cli.discover_all_devices(scan_timeout, target_count=1, transports=('ble',))
+    return {
+        'load_seconds': loaded - process_start,
+        'first_device_seconds': time.perf_counter() - loaded,
+        'devices': len(devices),
+        'loaded_at_startup': loaded_at_startup,
+        'loaded_after_scan': registry.loaded(),
+    }
+
+
+def bench_startup(argv, target=STARTUP_TARGET):
+    """Csak BLE keresés indulási ideje külön folyamatban (tiszta modul gyorsítótárral)"""
+    start_time = time.perf_counter()
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--startup-probe'] + list(argv),
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output)
+    result['process_seconds'] = time.perf_counter() - start_time
+    result['target_seconds'] = target
+    result['within_target'] = result['load_seconds'] <= target
+    # A keresés csak a bleak hátteret töltheti be
+    result['only_ble_backend'] = result['loaded_after_scan'] == ['bleak']
+    return result
+
+
+async def run_benchmarks(cli, config, args):
+    results = {}
+    # A fő program kimenete nem keveredhet a JSON eredménnyel
+    if 'startup' in args.only:
+        loop = asyncio.get_running_loop()
+        results['startup'] = await loop.run_in_executor(None, bench_startup, args.sim_argv, args.startup_target)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if 'discovery' in args.only:
+            results['discovery'] = await bench_discovery(cli, config, args.runs, args.scan_timeout)
+        if 'channel' in args.only:
+            loop = asyncio.get_running_loop()
+            results['channel_resolution'] = await loop.run_in_executor(
+                None, bench_channel_resolution, cli, config, args.runs)
+        if 'connect' in args.only:
+            results['connect'] = await bench_connect(cli, config, args.connect_attempts)
+        if 'monitor' in args.only:
+            results['monitor'] = await bench_monitor(cli, config, args.monitor_duration)
+    return results
+
+
+BENCHMARKS = ('startup', 'discovery', 'channel', 'connect', 'monitor')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bluetooth teljesítménymérés szimulált hátterekkel")
+    parser.add_argument("--ble-devices", type=int, default=20, help="Szimulált BLE eszközök száma")
+    parser.add_argument("--classic-devices", type=int, default=5, help="Szimulált klasszikus eszközök száma")
+    parser.add_argument("--adv-interval", type=float, default=0.1, help="BLE hirdetési időköz (s)")
+    parser.add_argument("--inquiry-time", type=float, default=1.0, help="Klasszikus keresés ideje (s)")
+    parser.add_argument("--connect-latency", type=float, default=0.05, help="BLE kapcsolódás átlagos ideje (s)")
+    parser.add_argument("--connect-jitter", type=float, default=0.02, help="BLE kapcsolódási idő szórása (s)")
+    parser.add_argument("--rfcomm-latency", type=float, default=0.02, help="RFCOMM kapcsolódás ideje (s)")
+    parser.add_argument("--no-sdp", action="store_true", help="Az SDP nem ad csatornát (próbálgatás mérése)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Kapcsolódási hibák aránya (0-1)")
+    parser.add_argument("--seed", type=int, default=1, help="Véletlen mag az ismételhető futásokhoz")
+    parser.add_argument("--runs", type=int, default=3, help="Ismétlések száma keresésnél és feloldásnál")
+    parser.add_argument("--scan-timeout", type=float, default=2.0, help="Keresési ablak (s)")
+    parser.add_argument("--connect-attempts", type=int, default=50, help="Mért BLE kapcsolódások száma")
+    parser.add_argument("--monitor-duration", type=float, default=2.0, help="Monitorozás hossza (s)")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help="Csak a megadott mérések futtatása")
+    parser.add_argument("--startup-target", type=float, default=STARTUP_TARGET,
+                        help="Elvárt betöltési idő csak BLE keresésnél (s)")
+    parser.add_argument("--startup-probe", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("-o", "--output", help="Eredmény JSON fájl (alapértelmezett: standard kimenet)")
+    args = parser.parse_args(argv)
+    # A szimuláció paraméterei a külön folyamatban futó indulási méréshez
+    args.sim_argv = ['--ble-devices', str(args.ble_devices), '--classic-devices', str(args.classic_devices),
+                     '--adv-interval', str(args.adv_interval), '--seed', str(args.seed)]
+
+    config = SimConfig(ble_devices=args.ble_devices, classic_devices=args.classic_devices,
+                       adv_interval=args.adv_interval, inquiry_time=args.inquiry_time,
+                       connect_latency=args.connect_latency, connect_jitter=args.connect_jitter,
+                       rfcomm_latency=args.rfcomm_latency, sdp=not args.no_sdp,
+                       failure_rate=args.failure_rate, seed=args.seed)
+    if args.startup_probe:
+        print(json.dumps(asyncio.run(startup_probe(config, args.scan_timeout))))
+        return
+    install_simulation(config)
+    load_start = time.perf_counter()
+    cli = load_cli()
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': config.as_dict(),
+        'load_seconds': time.perf_counter() - load_start,
+        'results': asyncio.run(run_benchmarks(cli, config, args))
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Lemezen tárolt eszköz- és szolgáltatás-gyorsítótár
+
+MAC cím szerint tárolja a feloldott nevet, az RFCOMM csatornát, az SDP rekordokat
+és a GATT szolgáltatás/karakterisztika táblát, így újrakapcsolódáskor nem kell
+mindent elölről felderíteni.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".bluetooth_cache.json")
+CACHE_VERSION = 1
+
+
+def normalize_address(address):
+    """MAC cím egységes alakra hozása (nagybetű, kettőspont elválasztó)"""
+    return address.strip().upper().replace('-', ':')
+
+
+def serialize_gatt_services(services):
+    """Bleak szolgáltatás gyűjtemény átalakítása JSON-ba menthető táblává"""
+    table = []
+    for service in services:
+        table.append({
+            'uuid': str(service.uuid),
+            'handle': getattr(service, 'handle', None),
+            'description': getattr(service, 'description', None),
+            'characteristics': [{
+                'uuid': str(char.uuid),
+                'handle': getattr(char, 'handle', None),
+                'properties': list(char.properties),
+                'description': getattr(char, 'description', None)
+            } for char in service.characteristics]
+        })
+    return table
+
+
+class DeviceCache:
+    """Eszköz gyorsítótár TTL alapú érvénytelenítéssel és LRU kiszorítással
+
+    Minden mező saját időbélyeget kap, így egy elavult mező frissítése
+    a bejegyzés többi részét érintetlenül hagyja. A módosítások nem íródnak
+    ki azonnal: a gyorsítótár piszkosnak jelölődik, és flush_interval
+    másodperc múlva, vagy a flush()/close() hívásakor kerül lemezre.
+    """
+
+    FIELDS = ('name', 'rfcomm_channel', 'sdp_records', 'gatt_services')
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=24 * 3600, max_entries=256, flush_interval=5.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer = None
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        """Gyorsítótár beolvasása a lemezről (sérült fájl esetén üres gyorsítótár)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != CACHE_VERSION:
+                return
+            with self._lock:
+                # A fájlban a legrégebben használt bejegyzés áll elöl
+                self._entries = OrderedDict((address, entry) for address, entry in data.get('entries', []))
+        except (OSError, ValueError) as e:
+            print(f"A gyorsítótár nem olvasható, újat kezdünk: {str(e)}")
+
+    def save(self):
+        """Gyorsítótár kiírása a lemezre (atomikus csere ideiglenes fájlon keresztül)"""
+        if not self.path:
+            return
+        with self._lock:
+            # A mezőket csak cseréljük, sosem módosítjuk, így elég a bejegyzések sekély másolata
+            data = {'version': CACHE_VERSION,
+                    'entries': [(address, dict(entry)) for address, entry in self._entries.items()]}
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = None
+        try:
+            # Egyedi ideiglenes fájl ugyanabban a könyvtárban, hogy az os.replace atomikus legyen
+            fd, tmp_path = tempfile.mkstemp(prefix='.bluetooth_cache.', suffix='.tmp', dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.path)
+            tmp_path = None
+        except OSError as e:
+            with self._lock:
+                self._dirty = True
+            print(f"A gyorsítótár nem menthető: {str(e)}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def flush(self):
+        """Kiírás, ha a legutóbbi mentés óta változott a tartalom"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def close(self):
+        """Függőben lévő módosítások kiírása; kilépés előtt kötelező meghívni"""
+        self.flush()
+
+    def _mark_dirty(self):
+        # A hívó tartja a zárat; egyszerre legfeljebb egy időzített mentés vár
+        self._dirty = True
+        if not self.path or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_interval, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def get(self, address, field, allow_stale=False):
+        """Egy mező értéke, vagy None ha nincs meg vagy elavult"""
+        address = normalize_address(address)
+        with self._lock:
+            entry = self._entries.get(address)
+            item = entry.get(field) if entry else None
+            if item is None or (not allow_stale and self._is_expired(item)):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(address)
+            self.hits += 1
+            return item['value']
+
+    def update(self, address, save=True, **fields):
+        """Mezők frissítése helyben; a bejegyzés a legutóbb használt helyre kerül
+
+        save=True esetén a változás a következő időzített vagy kilépéskori mentéssel kerül lemezre.
+        """
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Ismeretlen gyorsítótár mező: {', '.join(sorted(unknown))}")
+        address = normalize_address(address)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.setdefault(address, {})
+            for field, value in fields.items():
+                entry[field] = {'value': value, 'updated': now}
+            self._entries.move_to_end(address)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if save:
+                self._mark_dirty()
+
+    def invalidate(self, address, field=None, save=True):
+        """Egy mező vagy a teljes bejegyzés törlése"""
+        address = normalize_address(address)
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None:
+                return
+            if field is None:
+                del self._entries[address]
+            else:
+                entry.pop(field, None)
+            if save:
+                self._mark_dirty()
+
+    def _is_expired(self, item):
+        return self.ttl is not None and time.time() - item['updated'] > self.ttl
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, address):
+        return normalize_address(address) in self._entries
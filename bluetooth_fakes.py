@@ -0,0 +1,131 @@
+"""Hamis PyBluez modul közös váza a szimulációhoz és a visszajátszáshoz
+
+A bluetooth_bench szimulált és a traffic_log visszajátszó háttere ugyanazt a
+modulfelületet adja: BluetoothError, SDP rekordok és a csövön jelző,
+eseményalapú DeviceDiscoverer. Ezek itt vannak egy helyen; a hívók csak a
+socket osztályt és az eseményforrásokat (inquiry találatok, csatornák,
+nevek) adják meg.
+"""
+import os
+import threading
+import types
+import weakref
+
+RFCOMM = 3
+
+
+class BluetoothError(OSError):
+    pass
+
+
+def rfcomm_service_record(address, channel):
+    """Soros port (SPP) SDP rekord a PyBluez find_service alakjában"""
+    return {'name': 'Serial Port', 'protocol': 'RFCOMM', 'port': channel, 'host': address,
+            'service-classes': ['1101'], 'profiles': [], 'provider': None, 'description': None,
+            'service-id': None}
+
+
+def _close_fds(*fds):
+    for fd in fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+class FakeDeviceDiscoverer:
+    """Esemény alapú inquiry: az eszközök egy csövön keresztül jeleznek, mint a valódi HCI socket
+
+    Az inquiry(duration, cancel) függvény külön szálban fut, és (cím,
+    eszközosztály, RSSI, név) négyeseket ad; a cancel (threading.Event)
+    beállásakor ki kell lépnie. A csővégek a close() hívásakor vagy a
+    példány felszabadulásakor záródnak.
+    """
+
+    def __init__(self, device_id=-1):
+        self.device_id = device_id
+        self._read_fd, self._write_fd = os.pipe()
+        self._events = []
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._finalizer = weakref.finalize(self, _close_fds, self._read_fd, self._write_fd)
+
+    def inquiry(self, duration, cancel):
+        return iter(())
+
+    def fileno(self):
+        return self._read_fd
+
+    def close(self):
+        self._cancel.set()
+        self._finalizer()
+
+    def _push(self, event):
+        with self._lock:
+            self._events.append(event)
+        os.write(self._write_fd, b'x')
+
+    def find_devices(self, lookup_names=False, duration=8, flush_cache=True):
+        self.pre_inquiry()
+        self._cancel.clear()
+
+        def run():
+            try:
+                for found in self.inquiry(duration, self._cancel):
+                    self._push(('device',) + tuple(found))
+                self._push(('done',))
+            except OSError:
+                # A close() közben lezárta a csövet
+                pass
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def process_event(self):
+        os.read(self._read_fd, 1)
+        with self._lock:
+            event = self._events.pop(0)
+        if event[0] == 'device':
+            self.device_discovered(*event[1:])
+        else:
+            self.inquiry_complete()
+
+    def cancel_inquiry(self):
+        self._cancel.set()
+
+    def pre_inquiry(self):
+        pass
+
+    def device_discovered(self, address, device_class, rssi, name):
+        pass
+
+    def inquiry_complete(self):
+        pass
+
+
+def make_fake_bluetooth_module(socket_class, discover_devices, inquiry, service_channels, lookup_name):
+    """PyBluez helyettesítő modul összeállítása
+
+    socket_class: a BluetoothSocket megvalósítás
+    discover_devices: a blokkoló discover_devices függvény
+    inquiry: a DeviceDiscoverer eseményforrása (lásd FakeDeviceDiscoverer)
+    service_channels(address): az SDP-ben hirdetett RFCOMM csatornák
+    lookup_name(address, timeout=10): névfeloldás
+    """
+    module = types.ModuleType('bluetooth')
+    module.RFCOMM = RFCOMM
+    module.BluetoothError = BluetoothError
+    module.btcommon = types.SimpleNamespace(BluetoothError=BluetoothError)
+    module.BluetoothSocket = socket_class
+
+    def find_service(address=None, **kwargs):
+        return [rfcomm_service_record(address, channel) for channel in service_channels(address)]
+
+    class DeviceDiscoverer(FakeDeviceDiscoverer):
+        def inquiry(self, duration, cancel):
+            return inquiry(duration, cancel)
+
+    module.discover_devices = discover_devices
+    module.find_service = find_service
+    module.lookup_name = lookup_name
+    module.DeviceDiscoverer = DeviceDiscoverer
+    return module
@@ -1,32 +1,374 @@
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QPushButton, QListWidget, QLabel, QWidget
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from bleak import BleakScanner, BleakClient
-import bluetooth  # Klasszikus Bluetooth támogatáshoz
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QWidget,
+                             QCheckBox, QTableView, QLineEdit, QComboBox, QSpinBox, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import (Qt, QObject, pyqtSignal, QAbstractTableModel, QSortFilterProxyModel, QModelIndex,
+                          QTimer)
 import asyncio
 import logging
 import sys
-import re
+import threading
+import time
+from bluetooth_metrics import metrics, format_operation
+from advertisement import AdvertisementPipeline, format_advertisement
+from traffic_log import capture
+from bluetooth_adapters import default_adapters
+from bluetooth_transports import BLE, CLASSIC, DISCOVER, CONNECT, default_transports, is_valid_address
+# A bleak és a PyBluez csak az első kereséskor/kapcsolódáskor töltődik be
+from bluetooth_backends import bleak
 
 logging.basicConfig(level=logging.DEBUG)
 
-class DeviceScanner(QThread):
-    devices_found = pyqtSignal(list)
+class AsyncLoopThread(threading.Thread):
+    """Hosszú életű asyncio eseményhurok egy háttérszálban
+
+    Minden BLE/klasszikus művelet ide kerül beküldésre, így a Qt főszál sosem blokkol.
+    """
+
+    def __init__(self):
+        super().__init__(name="asyncio-loop", daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
 
     def run(self):
-        asyncio.run(self.scan_devices())
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def start(self):
+        super().start()
+        self._ready.wait()
+
+    def submit(self, coro):
+        """Korutin beküldése a hurokba, concurrent.futures.Future-t ad vissza"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def shutdown(self, timeout=5.0):
+        """Futó feladatok megszakítása és a hurok leállítása"""
+        async def cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.loop.shutdown_default_executor()
+
+        if not self.loop.is_running():
+            return
+        try:
+            self.submit(cancel_all()).result(timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(timeout)
+
+class AsyncBridge(QObject):
+    """Az eseményhurok eredményeinek visszajuttatása a Qt főszálba jelzéseken keresztül"""
+    _finished = pyqtSignal(object, object)
+    pending_changed = pyqtSignal(int)
+
+    def __init__(self, loop_thread):
+        super().__init__()
+        self.loop_thread = loop_thread
+        self.pending = set()
+        self._finished.connect(self._dispatch)
+
+    def submit(self, coro, on_result=None, on_error=None):
+        """Korutin futtatása a háttérhurokban; a visszahívások a főszálban futnak"""
+        future = self.loop_thread.submit(coro)
+        self.pending.add(future)
+        self.pending_changed.emit(len(self.pending))
+
+        def done(f):
+            # Ez a hurok szálában fut, ezért csak jelzést küldünk
+            self.pending.discard(f)
+            self.pending_changed.emit(len(self.pending))
+            if f.cancelled():
+                return
+            error = f.exception()
+            if error is not None:
+                self._finished.emit(on_error, error)
+            else:
+                self._finished.emit(on_result, f.result())
+
+        future.add_done_callback(done)
+        return future
+
+    def _dispatch(self, callback, value):
+        if callback is not None:
+            callback(value)
+
+class DeviceScanner(QObject):
+    # Új vagy megváltozott eszközök kis kötegekben, ahogy a hirdetések beérkeznek
+    devices_updated = pyqtSignal(list)
+    scan_finished = pyqtSignal()
+
+    def __init__(self, timeout=5.0, continuous=False, batch_interval=0.2, batch_size=20):
+        super().__init__()
+        self.timeout = timeout
+        self.continuous = continuous
+        self.batch_interval = batch_interval
+        self.batch_size = batch_size
+        self._running = True
+
+    def stop(self):
+        """A keresés leállítása (bármely szálból hívható)"""
+        self._running = False
 
     async def scan_devices(self):
-        devices = await BleakScanner.discover(timeout=5.0)
-        device_list = [f"{d.name} ({d.address})" for d in devices ]
-        self.devices_found.emit(device_list)
+        """Keresés a leállításig vagy a timeout lejártáig; a scan_finished hiba esetén is elmegy"""
+        try:
+            await self._scan()
+        finally:
+            # Hiba esetén is vissza kell állnia a gombnak, és ki kell ürülnie a modell sorának
+            self.scan_finished.emit()
+
+    async def _scan(self):
+        loop = asyncio.get_running_loop()
+        use_ble = default_transports.get('bleak').usable(DISCOVER, BLE)
+        classic_transport = default_transports.select(DISCOVER, CLASSIC)
+        # Címenként a legutóbb küldött rekord; a két átvitelen is látott eszköz 'BLE + Classic' (mint a nyilvántartásban)
+        latest = {}
+
+        def merge(record, kind):
+            previous = latest.get(record['address'])
+            kinds = {kind}
+            if previous is not None:
+                kinds.update(previous['type'].split(' + '))
+                record = {**previous, **{k: v for k, v in record.items() if v is not None}}
+            record['type'] = ' + '.join(sorted(kinds))
+            latest[record['address']] = record
+            return record
+
+        def on_adverts(adverts):
+            # Csak az új vagy megváltozott (tartalom, RSSI) eszközök jutnak a GUI-ba
+            metrics.inc('bluetooth_detections_total', sum(a.raw_count or 1 for a in adverts), transport='ble')
+            self.devices_updated.emit([merge({
+                'name': advert.local_name,
+                'address': advert.address,
+                'rssi': advert.rssi,
+                'tx_power': advert.tx_power,
+                'details': format_advertisement(advert)
+            }, 'BLE') for advert in adverts])
+
+        def on_classic(address, name):
+            metrics.inc('bluetooth_detections_total', transport='classic')
+            capture.inquiry(address, name)
+            self.devices_updated.emit([merge({'name': name, 'address': address, 'rssi': None,
+                                              'tx_power': None, 'details': None}, 'Classic')])
+
+        pipeline = AdvertisementPipeline(on_adverts, batch_size=self.batch_size)
+
+        def on_detection(device, advertisement_data):
+            capture.advert(device, advertisement_data)
+            pipeline.feed(device, advertisement_data)
+
+        # Kereső adapterenként egy scanner, közös feldolgozó sorral; az inquiry külön adapteren fut
+        ble_adapters, classic_adapter = default_adapters.scan_plan(use_ble, classic_transport is not None)
+        classic_stop = threading.Event()
+
+        def classic_inquiry():
+            # Folyamatos módban az inquiry-k egymás után futnak, amíg a keresés tart
+            while True:
+                classic_transport.inquiry_sync(
+                    self.timeout, lambda address, name: loop.call_soon_threadsafe(on_classic, address, name),
+                    classic_stop, classic_adapter)
+                if not self.continuous or classic_stop.is_set():
+                    return
+
+        with metrics.operation('scan', continuous=self.continuous) as operation:
+            scanners = []
+            classic_future = None
+            try:
+                for adapter in ble_adapters:
+                    scanner = bleak.BleakScanner(detection_callback=on_detection, **adapter.bleak_kwargs())
+                    await scanner.start()
+                    scanners.append(scanner)
+                if classic_transport is not None:
+                    classic_future = loop.run_in_executor(None, classic_inquiry)
+                deadline = None if self.continuous else time.monotonic() + self.timeout
+                while self._running:
+                    if not scanners and classic_future is not None and classic_future.done():
+                        break
+                    wait = self.batch_interval
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.monotonic())
+                        if wait <= 0:
+                            break
+                    await asyncio.sleep(wait)
+                    pipeline.flush()
+            finally:
+                for scanner in scanners:
+                    await scanner.stop()
+                if classic_future is not None:
+                    # Az inquiry megszakítása és megvárása, hogy a rádió szabad legyen
+                    classic_stop.set()
+                    try:
+                        await classic_future
+                    except Exception as e:
+                        print(f"Hiba a klasszikus keresés során: {str(e)}")
+                pipeline.flush(final=True)
+                operation.set_label('devices', len(latest))
+
+class DeviceTableModel(QAbstractTableModel):
+    """Eszközrekordok táblázatos modellje
+
+    A beérkező frissítések egy függő szótárba gyűlnek, és egy időzítő legfeljebb
+    flush_interval ms-onként egyszerre alkalmazza őket: az új eszközök egyetlen
+    beginInsertRows blokkban kerülnek be, a megváltozottakról egy dataChanged
+    jelzés megy, így több ezer eszköz mellett sem épül újra a lista.
+    """
+    COLUMNS = ("Név", "Cím", "Típus", "RSSI")
+    NAME, ADDRESS, TYPE, RSSI = range(4)
+    # A teljes rekord (szótár) és a rendezéshez használt nyers érték szerepe
+    RecordRole = Qt.UserRole
+    SortRole = Qt.UserRole + 1
+
+    def __init__(self, flush_interval=250, parent=None):
+        super().__init__(parent)
+        self._records = []
+        self._rows = {}  # cím -> sor
+        self._pending = {}
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(flush_interval)
+        self._timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._records)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self._records[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == self.NAME:
+                return record['name'] or "Ismeretlen"
+            if column == self.ADDRESS:
+                return record['address']
+            if column == self.TYPE:
+                return record['type']
+            return "-" if record['rssi'] is None else f"{record['rssi']} dBm"
+        if role == self.SortRole:
+            if column == self.NAME:
+                return (record['name'] or "").lower()
+            if column == self.RSSI:
+                # Az ismeretlen jelerősség a leggyengébbek közé kerül
+                return -1000 if record['rssi'] is None else record['rssi']
+            return record['address'] if column == self.ADDRESS else record['type']
+        if role == self.RecordRole:
+            return record
+        if role == Qt.ToolTipRole and record.get('details'):
+            return '\n'.join(record['details'])
+        if role == Qt.TextAlignmentRole and column == self.RSSI:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def record(self, row):
+        return self._records[row]
+
+    def queue_updates(self, devices):
+        """Új vagy megváltozott eszközök sorba állítása a következő frissítéshez"""
+        for device in devices:
+            self._pending[device['address']] = device
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """A függő frissítések alkalmazása"""
+        pending, self._pending = self._pending, {}
+        new = []
+        changed = []
+        for address, device in pending.items():
+            row = self._rows.get(address)
+            if row is None:
+                new.append(device)
+            elif self._records[row] != device:
+                self._records[row] = device
+                changed.append(row)
+        if changed:
+            self.dataChanged.emit(self.index(min(changed), 0),
+                                  self.index(max(changed), len(self.COLUMNS) - 1))
+        if new:
+            first = len(self._records)
+            self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+            for device in new:
+                self._rows[device['address']] = len(self._records)
+                self._records.append(device)
+            self.endInsertRows()
+
+    def clear(self):
+        self._timer.stop()
+        self._pending = {}
+        self.beginResetModel()
+        self._records = []
+        self._rows = {}
+        self.endResetModel()
+
+
+class DeviceFilterProxyModel(QSortFilterProxyModel):
+    """Szűrés név/cím szövegre, típusra és minimális RSSI-re"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._text = ""
+        self._type = None
+        self._min_rssi = None
+        self.setSortRole(DeviceTableModel.SortRole)
+        # A rendezés és szűrés a modell változásaira magától frissül
+        self.setDynamicSortFilter(True)
+
+    def set_text_filter(self, text):
+        self._text = text.strip().lower()
+        self.invalidateFilter()
+
+    def set_type_filter(self, transport):
+        """transport: None (mind), 'BLE' vagy 'Classic'"""
+        self._type = transport
+        self.invalidateFilter()
+
+    def set_min_rssi(self, min_rssi):
+        self._min_rssi = min_rssi
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        record = self.sourceModel().record(source_row)
+        if self._text and self._text not in (record['name'] or "").lower() \
+                and self._text not in record['address'].lower():
+            return False
+        if self._type and self._type not in record['type']:
+            return False
+        if self._min_rssi is not None and (record['rssi'] is None or record['rssi'] < self._min_rssi):
+            return False
+        return True
 
 class BluetoothApp(QMainWindow):
+    # Állapotüzenet (szöveg, szín) a háttérhurokból
+    status_changed = pyqtSignal(str, str)
+    # Lezárt művelet időmérése a háttérhurokból
+    operation_timed = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Bluetooth Manager")
         self.setGeometry(200, 200, 800, 800)
         self.initUI()
         self.client = None  # BLE client inicializálása
+        self.scanner = None
+        self.scan_future = None
+        self.loop_thread = AsyncLoopThread()
+        self.loop_thread.start()
+        self.bridge = AsyncBridge(self.loop_thread)
+        self.bridge.pending_changed.connect(self.update_pending_count)
+        self.status_changed.connect(self.set_status)
+        self.operation_timed.connect(self.show_operation_timings)
+        metrics.add_listener(self.on_metric_record)
 
     def initUI(self):
         # Main layout
@@ -35,12 +377,51 @@ class BluetoothApp(QMainWindow):
         
         # Bluetooth scanning button
         self.scan_button = QPushButton("Keresés")
-        self.scan_button.clicked.connect(self.start_device_scan)
+        self.scan_button.clicked.connect(self.toggle_device_scan)
         layout.addWidget(self.scan_button)
+
+        # Continuous scan option
+        self.continuous_checkbox = QCheckBox("Folyamatos keresés")
+        layout.addWidget(self.continuous_checkbox)
         
+        # Device filters
+        filter_layout = QHBoxLayout()
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Szűrés név vagy cím alapján")
+        filter_layout.addWidget(self.filter_edit)
+        self.type_combo = QComboBox()
+        self.type_combo.addItem("Minden típus", None)
+        self.type_combo.addItem("BLE", 'BLE')
+        self.type_combo.addItem("Klasszikus", 'Classic')
+        filter_layout.addWidget(self.type_combo)
+        self.min_rssi_spin = QSpinBox()
+        self.min_rssi_spin.setRange(-127, 0)
+        self.min_rssi_spin.setValue(-127)
+        self.min_rssi_spin.setPrefix("Min. RSSI: ")
+        self.min_rssi_spin.setSuffix(" dBm")
+        filter_layout.addWidget(self.min_rssi_spin)
+        layout.addLayout(filter_layout)
+
         # Device list
-        self.device_list = QListWidget()
-        layout.addWidget(self.device_list)
+        self.device_model = DeviceTableModel(parent=self)
+        self.device_proxy = DeviceFilterProxyModel(self)
+        self.device_proxy.setSourceModel(self.device_model)
+        self.device_view = QTableView()
+        self.device_view.setModel(self.device_proxy)
+        self.device_view.setSortingEnabled(True)
+        self.device_view.sortByColumn(DeviceTableModel.RSSI, Qt.DescendingOrder)
+        self.device_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.device_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.device_view.verticalHeader().setVisible(False)
+        self.device_view.horizontalHeader().setSectionResizeMode(DeviceTableModel.NAME, QHeaderView.Stretch)
+        self.device_view.doubleClicked.connect(self.connect_device)
+        layout.addWidget(self.device_view)
+
+        self.filter_edit.textChanged.connect(self.device_proxy.set_text_filter)
+        self.type_combo.currentIndexChanged.connect(
+            lambda index: self.device_proxy.set_type_filter(self.type_combo.itemData(index)))
+        self.min_rssi_spin.valueChanged.connect(
+            lambda value: self.device_proxy.set_min_rssi(None if value <= -127 else value))
         
         # Connect button
         self.connect_button = QPushButton("Kapcsolódás a választott eszközhöz")
@@ -58,74 +439,159 @@ class BluetoothApp(QMainWindow):
         self.status_indicator.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.status_indicator)
 
+        # Running operations
+        self.pending_label = QLabel("Futó műveletek: 0")
+        layout.addWidget(self.pending_label)
+
+        # Last operation timings
+        self.timings_label = QLabel("Utolsó művelet: -")
+        self.timings_label.setWordWrap(True)
+        layout.addWidget(self.timings_label)
+
         central_widget.setLayout(layout)
         self.setCentralWidget(central_widget)
 
+    def set_status(self, text, color=None):
+        self.status_label.setText(text)
+        if color:
+            self.status_indicator.setStyleSheet(f"background-color: {color};")
+
+    def update_pending_count(self, count):
+        self.pending_label.setText(f"Futó műveletek: {count}")
+
+    def on_metric_record(self, record):
+        # A mérés a háttérhurok szálában zárul le, ezért jelzéssel adjuk át
+        if record['type'] == 'operation':
+            self.operation_timed.emit(record)
+
+    def show_operation_timings(self, record):
+        self.timings_label.setText(f"Utolsó művelet: {format_operation(record)}")
+
+    def toggle_device_scan(self):
+        if self.scan_future is not None and not self.scan_future.done():
+            self.scanner.stop()
+            self.scan_button.setEnabled(False)
+            self.status_label.setText("Keresés leállítása...")
+        else:
+            self.start_device_scan()
+
     def start_device_scan(self):
-        self.device_list.clear()
+        if not default_transports.get('bleak').usable(DISCOVER, BLE) \
+                and default_transports.select(DISCOVER, CLASSIC) is None:
+            self.set_status(f"{default_transports.unavailable_reason(DISCOVER, BLE)}; "
+                            f"{default_transports.unavailable_reason(DISCOVER, CLASSIC)}", "red")
+            return
+        self.device_model.clear()
         self.status_label.setText("Eszközök keresése...")
         self.status_indicator.setStyleSheet("background-color: yellow;")  # Kapcsolódás alatt
-        self.thread = DeviceScanner()
-        self.thread.devices_found.connect(self.update_device_list)
-        self.thread.start()
+        self.scan_button.setText("Leállítás")
+        self.scanner = DeviceScanner(continuous=self.continuous_checkbox.isChecked())
+        self.scanner.devices_updated.connect(self.update_device_list)
+        self.scanner.scan_finished.connect(self.scan_finished)
+        self.scan_future = self.bridge.submit(self.scanner.scan_devices(), on_error=self.operation_failed)
 
     def update_device_list(self, devices):
-        if devices:
-            self.device_list.addItems(devices)
-            self.status_label.setText("Keresés kész")
+        # A modell kötegelve, időzítve alkalmazza a változásokat
+        self.device_model.queue_updates(devices)
+        self.status_label.setText(f"Eszközök keresése... ({self.device_model.rowCount()} eszköz)")
+        self.status_indicator.setStyleSheet("background-color: green;")  # Van találat
+
+    def scan_finished(self):
+        self.scan_button.setText("Keresés")
+        self.scan_button.setEnabled(True)
+        self.device_model.flush()
+        if self.device_model.rowCount():
+            self.status_label.setText(f"Keresés kész ({self.device_model.rowCount()} eszköz)")
             self.status_indicator.setStyleSheet("background-color: green;")  # Keresés kész
         else:
             self.status_label.setText("Nem található Bluetooth eszköz.")
             self.status_indicator.setStyleSheet("background-color: red;")  # Nincs eszköz
 
+    def selected_device(self):
+        """A kijelölt sor eszközrekordja (a szűrt/rendezett nézetből visszaképezve)"""
+        rows = self.device_view.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return self.device_model.record(self.device_proxy.mapToSource(rows[0]).row())
+
     def connect_device(self):
-        selected_item = self.device_list.currentItem()
-        if selected_item:
-            device_address = selected_item.text().split("(")[1].strip(")")
-            self.status_label.setText(f"Kapcsolódás a {selected_item.text()}...")
+        device = self.selected_device()
+        if device:
+            device_address = device['address']
+            self.status_label.setText(f"Kapcsolódás a {device['name'] or 'Ismeretlen'} ({device_address})...")
             self.status_indicator.setStyleSheet("background-color: yellow;")  # Kapcsolódás alatt
-            if "BLE" in selected_item.text():  # BLE eszköz
-                asyncio.run(self.connect_to_device(device_address))
+            if 'BLE' in device['type']:  # BLE eszköz
+                self.bridge.submit(self.connect_to_device(device_address), on_error=self.operation_failed)
             else:  # Klasszikus Bluetooth eszköz
-                self.connect_classic_bluetooth(device_address)
+                self.bridge.submit(self.connect_classic_bluetooth(device_address), on_error=self.operation_failed)
         else:
             self.status_label.setText("Nincs kiválasztott eszköz!")
             self.status_indicator.setStyleSheet("background-color: red;")  # Nincs eszköz
 
+    def operation_failed(self, error):
+        self.set_status(f"Hiba: {str(error)}", "red")
+
     async def connect_to_device(self, address):
+        adapter = None
         try:
-            async with BleakClient(address) as client:
+            transport = default_transports.select(CONNECT, BLE)
+            if transport is None:
+                self.status_changed.emit(default_transports.unavailable_reason(CONNECT, BLE), "red")
+                return
+            adapter = await default_adapters.acquire(address)
+            client = await transport.connect(address, adapter=adapter)
+            if client is None:
+                self.status_changed.emit(f"Nem sikerült csatlakozni: {address}", "red")  # Hiba
+                return
+            try:
                 self.client = client
-                self.status_label.setText(f"Sikeresen csatlakozva: {address}")
-                self.status_indicator.setStyleSheet("background-color: green;")  # Sikeres kapcsolat
+                self.status_changed.emit(f"Sikeresen csatlakozva: {address}", "green")  # Sikeres kapcsolat
                 await asyncio.sleep(5)  # Példa: várakozás 5 másodpercig
                 await self.run_commands()
+            finally:
+                await client.disconnect()
         except Exception as e:
-            self.status_label.setText(f"Hiba a csatlakozás során: {str(e)}")
-            self.status_indicator.setStyleSheet("background-color: red;")  # Hiba
+            self.status_changed.emit(f"Hiba a csatlakozás során: {str(e)}", "red")  # Hiba
+        finally:
+            default_adapters.release(adapter)
 
-    def connect_classic_bluetooth(self, address):
+    async def connect_classic_bluetooth(self, address):
+        adapter = None
         try:
             print(f"Klasszikus Bluetooth kapcsolódás megkezdése: {address}")
-            if not re.match(r"^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$", address):
+            if not is_valid_address(address):
                 print("Érvénytelen MAC cím formátum!")
                 return
-            
-            # Bluetooth adapter ellenőrzése
-            socket = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
-            socket.connect((address, 1))  # Csatlakozás az első RFCOMM porthoz
-            self.status_label.setText(f"Sikeresen csatlakozva klasszikus Bluetooth eszközhöz: {address}")
-            self.status_indicator.setStyleSheet("background-color: green;")  # Sikeres kapcsolat
+
+            # A leggyorsabb működő klasszikus háttér (PyBluez, különben lightblue), executorban futtatva
+            transport = default_transports.select(CONNECT, CLASSIC)
+            if transport is None:
+                self.status_changed.emit(default_transports.unavailable_reason(CONNECT, CLASSIC), "red")
+                return
+            adapter = await default_adapters.acquire(address)
+            socket = await transport.connect(address, adapter=adapter)
+            if socket is None:
+                self.status_changed.emit(f"Nem sikerült csatlakozni: {address}", "red")  # Hiba
+                return
+            self.status_changed.emit(f"Sikeresen csatlakozva klasszikus Bluetooth eszközhöz: {address}", "green")  # Sikeres kapcsolat
             socket.close()  # Kapcsolat lezárása
         except Exception as e:
-            self.status_label.setText(f"Hiba a klasszikus Bluetooth csatlakozás során: {str(e)}")
-            self.status_indicator.setStyleSheet("background-color: red;")  # Hiba
+            self.status_changed.emit(f"Hiba a klasszikus Bluetooth csatlakozás során: {str(e)}", "red")  # Hiba
+        finally:
+            default_adapters.release(adapter)
 
     async def run_commands(self):
         # Itt implementálhatod a további parancsokat
-        self.status_label.setText("Parancsok futtatása...")
+        self.status_changed.emit("Parancsok futtatása...", "")
         await asyncio.sleep(2)  # Példa: várakozás 2 másodpercig
-        self.status_label.setText("Parancsok befejezve.")
+        self.status_changed.emit("Parancsok befejezve.", "")
+
+    def closeEvent(self, event):
+        metrics.remove_listener(self.on_metric_record)
+        if self.scanner is not None:
+            self.scanner.stop()
+        self.loop_thread.shutdown()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,256 @@
+"""Fázisonkénti időmérés és metrikák (számlálók, hisztogramok)
+
+A span() egy műveleti fázis (keresés, SDP, csatorna-próbálgatás, kapcsolódás,
+GATT felderítés, újrapróbálkozási várakozás) idejét méri eszköz és kimenet
+címkékkel. Az operation() több fázist fog össze egy felhasználói művelet alá,
+így utólag látszik, melyik fázis volt lassú. Az eredmény Prometheus szöveges
+formátumban vagy JSON sorokként exportálható.
+"""
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+
+# Másodperc alapú hisztogram határok (Bluetooth műveletekhez: ms-tól egy percig)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PHASE_HISTOGRAM = 'bluetooth_phase_seconds'
+
+_current_operation = contextvars.ContextVar('bluetooth_operation', default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _format_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ''
+    escaped = ('%s="%s"' % (k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for k, v in items)
+    return '{' + ','.join(escaped) + '}'
+
+
+class Histogram:
+    """Kumulatív határokkal számoló hisztogram"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Span:
+    """Egy időzített fázis; kontextuskezelőként használandó
+
+    A kimenet alapértelmezés szerint 'ok', kivétel esetén 'error' (megszakításnál
+    'cancelled'); a hívó a set_outcome()-mal pontosíthatja.
+    """
+
+    def __init__(self, registry, name, labels, operation=False):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.outcome = None
+        self.error = None
+        self.start = None
+        self._perf_start = None
+        self.duration = None
+        self.phases = [] if operation else None
+        self._is_operation = operation
+        self._token = None
+
+    def set_outcome(self, outcome):
+        self.outcome = outcome
+
+    def set_label(self, key, value):
+        self.labels[key] = value
+
+    def __enter__(self):
+        self.start = time.time()
+        self._perf_start = time.perf_counter()
+        if self._is_operation:
+            self._token = _current_operation.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.duration = time.perf_counter() - self._perf_start
+        if self._token is not None:
+            _current_operation.reset(self._token)
+        if self.outcome is None:
+            if exc_type is None:
+                self.outcome = 'ok'
+            elif not issubclass(exc_type, Exception):
+                self.outcome = 'cancelled'
+            else:
+                self.outcome = 'error'
+        if exc is not None and self.error is None:
+            self.error = str(exc) or type(exc).__name__
+        self.registry._finish(self)
+        return False
+
+    def record(self):
+        result = {
+            'type': 'operation' if self._is_operation else 'span',
+            'name': self.name,
+            'labels': dict(self.labels),
+            'outcome': self.outcome,
+            'start': self.start,
+            'duration': self.duration,
+        }
+        if self.error is not None:
+            result['error'] = self.error
+        if self.phases is not None:
+            result['phases'] = self.phases
+        return result
+
+
+class MetricsRegistry:
+    """Számlálók, hisztogramok és a legutóbbi spanok szálbiztos tárolója"""
+
+    def __init__(self, max_spans=1000, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.spans = deque(maxlen=max_spans)
+        self.last_operation = None
+        self._counters = {}
+        self._histograms = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def span(self, name, **labels):
+        """Egy fázis időmérése; az aktuális művelethez is hozzáadódik"""
+        return Span(self, name, labels)
+
+    def operation(self, name, **labels):
+        """Felhasználói művelet (pl. kapcsolódás), amely összegyűjti a benne futó fázisokat"""
+        return Span(self, name, labels, operation=True)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def add_listener(self, listener):
+        """listener(record) minden lezárt span és művelet után hívódik (a mérő szálában)"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def _finish(self, span):
+        # Az eszköz cím nem kerül a hisztogram címkéi közé, hogy ne nőjön korlátlanul a sorozatok száma
+        self.observe(PHASE_HISTOGRAM, span.duration, phase=span.name, outcome=span.outcome)
+        record = span.record()
+        if not span._is_operation:
+            operation = _current_operation.get()
+            if operation is not None:
+                operation.phases.append({'name': span.name, 'duration': span.duration,
+                                         'outcome': span.outcome})
+        with self._lock:
+            self.spans.append(record)
+            if span._is_operation:
+                self.last_operation = record
+        for listener in list(self._listeners):
+            try:
+                listener(record)
+            except Exception as e:
+                print(f"Hiba a metrika figyelőben: {str(e)}")
+
+    # --- Export ---
+
+    def to_prometheus(self):
+        """Számlálók és hisztogramok Prometheus szöveges formátumban"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (h.cumulative(), h.sum, h.count)) for key, h in self._histograms.items())
+        lines = []
+        last_name = None
+        for (name, key), value in counters:
+            if name != last_name:
+                lines.append(f"# TYPE {name} counter")
+                last_name = name
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        last_name = None
+        for (name, key), (cumulative, total, count) in histograms:
+            if name != last_name:
+                lines.append(f"# TYPE {name} histogram")
+                last_name = name
+            for bound, bucket_count in cumulative:
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', repr(bound))])} {bucket_count}")
+            lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def iter_records(self):
+        """Spanok, majd a számlálók és hisztogramok JSON-képes rekordjai"""
+        with self._lock:
+            spans = list(self.spans)
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (h.buckets, list(h.counts), h.sum, h.count))
+                                for key, h in self._histograms.items())
+        for record in spans:
+            yield record
+        for (name, key), value in counters:
+            yield {'type': 'counter', 'name': name, 'labels': dict(key), 'value': value}
+        for (name, key), (buckets, counts, total, count) in histograms:
+            yield {'type': 'histogram', 'name': name, 'labels': dict(key), 'buckets': list(buckets),
+                   'counts': counts, 'sum': total, 'count': count}
+
+    def write_jsonl(self, file):
+        """JSON sorok írása egy megnyitott szöveges fájlba"""
+        for record in self.iter_records():
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def export(self, path, fmt='jsonl'):
+        """Mentés fájlba 'jsonl' vagy 'prometheus' formátumban"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if fmt == 'prometheus':
+                f.write(self.to_prometheus())
+            else:
+                self.write_jsonl(f)
+
+
+def format_operation(record):
+    """Egy művelet fázisidőinek rövid, egysoros összefoglalója"""
+    if record is None:
+        return "Nincs mért művelet"
+    phases = ', '.join(f"{p['name']} {p['duration'] * 1000:.0f} ms" + ('' if p['outcome'] == 'ok' else f" ({p['outcome']})")
+                       for p in record.get('phases') or [])
+    text = f"{record['name']}: {record['duration'] * 1000:.0f} ms ({record['outcome']})"
+    return f"{text} - {phases}" if phases else text
+
+
+# Folyamatszintű alapértelmezett regiszter, a CLI és a GUI is ezt használja
+metrics = MetricsRegistry()
@@ -0,0 +1,227 @@
+"""Újrapróbálkozási szabályok a kapcsolódásokhoz
+
+Exponenciális várakozás véletlen szórással (jitter), eszközönkénti hibatörténet
+és áramkör-megszakító, amely átmenetileg kihagyja a többször egymás után
+elérhetetlen eszközöket. Az újrapróbálkozás a hiba osztályától függ.
+"""
+import asyncio
+import errno
+import random
+import threading
+import time
+from collections import deque
+
+from bluetooth_cache import normalize_address
+from bluetooth_metrics import metrics
+
+# Hibaosztályok
+FATAL = 'fatal'          # Újrapróbálkozásnak nincs értelme (rossz cím, hiányzó adapter, elutasítás)
+BUSY = 'busy'            # A rádió/adapter foglalt, rövid várakozás után újra
+TIMEOUT = 'timeout'      # Az eszköz nem válaszolt, hosszabb várakozás
+TRANSIENT = 'transient'  # Egyéb átmeneti hiba
+
+_ERRNO_CLASSES = {
+    errno.EHOSTDOWN: TIMEOUT,
+    errno.EHOSTUNREACH: TIMEOUT,
+    errno.ETIMEDOUT: TIMEOUT,
+    errno.EBUSY: BUSY,
+    errno.EAGAIN: BUSY,
+    errno.EALREADY: BUSY,
+    errno.EINPROGRESS: BUSY,
+    errno.ECONNREFUSED: FATAL,
+    errno.ENODEV: FATAL,
+    errno.EACCES: FATAL,
+    errno.EPERM: FATAL,
+}
+
+# Szöveges hibaüzenetek (PyBluez, bleak és lightblue nem mindig ad errno-t)
+_MESSAGE_CLASSES = (
+    ('in progress', BUSY),
+    ('busy', BUSY),
+    ('timed out', TIMEOUT),
+    ('timeout', TIMEOUT),
+    ('host is down', TIMEOUT),
+    ('not found', TIMEOUT),
+    ('page timeout', TIMEOUT),
+    ('refused', FATAL),
+    ('no such device', FATAL),
+    ('no bluetooth adapter', FATAL),
+    ('invalid', FATAL),
+)
+
+
+def classify_error(error):
+    """Kivétel besorolása hibaosztályba"""
+    if isinstance(error, (ValueError, TypeError, NotImplementedError, PermissionError, ImportError)):
+        return FATAL
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return TIMEOUT
+    code = getattr(error, 'errno', None)
+    if code in _ERRNO_CLASSES:
+        return _ERRNO_CLASSES[code]
+    message = str(error).lower()
+    for text, error_class in _MESSAGE_CLASSES:
+        if text in message:
+            return error_class
+    return TRANSIENT
+
+
+class CircuitOpenError(Exception):
+    """Az eszköz áramkör-megszakítója nyitva van, a kapcsolódás kimarad"""
+
+    def __init__(self, address, retry_after):
+        super().__init__(f"Az eszköz ideiglenesen kihagyva ({address}), újra {retry_after:.0f} s múlva")
+        self.address = address
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """Exponenciális várakozás jitterrel, hibaosztályonkénti szorzóval"""
+
+    CLASS_FACTORS = {BUSY: 0.5, TRANSIENT: 1.0, TIMEOUT: 2.0}
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=10.0, multiplier=2.0, jitter=0.5):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def should_retry(self, error_class, attempt, max_attempts=None):
+        """Igaz, ha az attempt-edik (1-től számolt) sikertelen kísérlet után van még értelme próbálkozni"""
+        return error_class != FATAL and attempt < (max_attempts or self.max_attempts)
+
+    def delay(self, attempt, error_class=TRANSIENT):
+        """Várakozási idő az attempt-edik sikertelen kísérlet után"""
+        delay = self.base_delay * self.multiplier ** (attempt - 1) * self.CLASS_FACTORS.get(error_class, 1.0)
+        delay = min(self.max_delay, delay)
+        # A jitter szétteríti az egyszerre hibázó kapcsolódásokat
+        return delay * (1 - self.jitter * random.random())
+
+
+class CircuitBreaker:
+    """Eszközönkénti hibatörténet és áramkör-megszakító
+
+    Ha egy eszköz a window időablakban failure_threshold-szor hibázott, reset_timeout
+    másodpercig kimarad; utána egy próbakapcsolódás dönt a visszazárásról.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60.0, window=120.0, history_size=20):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.window = window
+        self.history_size = history_size
+        self._history = {}
+        self._open_until = {}
+        self._lock = threading.Lock()
+
+    def history(self, address):
+        """Az eszköz legutóbbi kísérletei (időbélyeg, hibaosztály vagy None siker esetén)"""
+        with self._lock:
+            return list(self._history.get(normalize_address(address), ()))
+
+    def retry_after(self, address):
+        """Hány másodperc múlva próbálható újra az eszköz (0, ha most is)"""
+        with self._lock:
+            until = self._open_until.get(normalize_address(address))
+        return max(0.0, until - time.monotonic()) if until else 0.0
+
+    def allow(self, address):
+        return self.retry_after(address) == 0.0
+
+    def record_success(self, address):
+        address = normalize_address(address)
+        with self._lock:
+            self._entry(address).append((time.monotonic(), None))
+            self._open_until.pop(address, None)
+
+    def record_failure(self, address, error_class):
+        address = normalize_address(address)
+        now = time.monotonic()
+        with self._lock:
+            history = self._entry(address)
+            history.append((now, error_class))
+            # A végzetes hibák (pl. rossz cím) nem az eszköz elérhetőségéről szólnak
+            recent = 0
+            for timestamp, failure in reversed(history):
+                if failure is None or now - timestamp > self.window:
+                    break
+                if failure != FATAL:
+                    recent += 1
+            if recent >= self.failure_threshold:
+                self._open_until[address] = now + self.reset_timeout
+
+    def _entry(self, address):
+        history = self._history.get(address)
+        if history is None:
+            history = self._history[address] = deque(maxlen=self.history_size)
+        return history
+
+
+class RetryScheduler:
+    """Újrapróbálkozási szabály és áramkör-megszakító együttes alkalmazása"""
+
+    def __init__(self, policy=None, breaker=None):
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+
+    async def run_async(self, address, attempt_fn, max_attempts=None, label="Csatlakozási"):
+        """attempt_fn() korutin futtatása újrapróbálkozással; a végső hibát továbbdobja"""
+        attempt = 0
+        while True:
+            self._check_breaker(address)
+            attempt += 1
+            print(f"\n{label} kísérlet {attempt}/{max_attempts or self.policy.max_attempts}")
+            try:
+                result = await attempt_fn()
+            except Exception as e:
+                delay = self._on_failure(address, e, attempt, max_attempts, label)
+                if delay is None:
+                    raise
+                with metrics.span('retry_wait', device=address):
+                    await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success(address)
+                return result
+
+    def run_sync(self, address, attempt_fn, max_attempts=None, label="Csatlakozási"):
+        """attempt_fn() szinkron futtatása újrapróbálkozással; a végső hibát továbbdobja"""
+        attempt = 0
+        while True:
+            self._check_breaker(address)
+            attempt += 1
+            print(f"\n{label} kísérlet {attempt}/{max_attempts or self.policy.max_attempts}")
+            try:
+                result = attempt_fn()
+            except Exception as e:
+                delay = self._on_failure(address, e, attempt, max_attempts, label)
+                if delay is None:
+                    raise
+                with metrics.span('retry_wait', device=address):
+                    time.sleep(delay)
+            else:
+                self.breaker.record_success(address)
+                return result
+
+    def _check_breaker(self, address):
+        retry_after = self.breaker.retry_after(address)
+        if retry_after:
+            metrics.inc('bluetooth_circuit_open_total')
+            raise CircuitOpenError(address, retry_after)
+
+    def _on_failure(self, address, error, attempt, max_attempts, label):
+        """Hiba rögzítése; a várakozási időt adja vissza, vagy None-t, ha nincs több kísérlet"""
+        error_class = classify_error(error)
+        self.breaker.record_failure(address, error_class)
+        metrics.inc('bluetooth_attempt_failures_total', error_class=error_class)
+        print(f"{label} kísérlet {attempt} sikertelen ({error_class}): {str(error)}")
+        if not self.policy.should_retry(error_class, attempt, max_attempts) or not self.breaker.allow(address):
+            return None
+        delay = self.policy.delay(attempt, error_class)
+        metrics.inc('bluetooth_retries_total', error_class=error_class)
+        print(f"Újrapróbálkozás {delay:.1f} másodperc múlva...")
+        return delay
+
+
+# A három kapcsolódási út (BLE, klasszikus, lightblue) közös ütemezője
+default_scheduler = RetryScheduler()
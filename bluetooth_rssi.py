@@ -0,0 +1,256 @@
+"""Passzív RSSI mintavétel és gördülő statisztika
+
+A mintákat a BLE hirdetésfolyamból vagy egyetlen hosszan futó, RSSI-t is
+jelentő inquiry-ből gyűjti, így nem kell másodpercenként új keresést indítani.
+"""
+import asyncio
+import math
+import select
+import threading
+import time
+from collections import deque
+
+from bluetooth_backends import bleak, bluetooth
+from bluetooth_cache import normalize_address
+from traffic_log import capture
+
+# Egy inquiry legfeljebb 48 * 1.28 másodpercig futhat
+MAX_INQUIRY_UNITS = 48
+
+
+def percentile(sorted_values, fraction):
+    """Lineárisan interpolált percentilis rendezett listából"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class RssiMonitor:
+    """Eszközönkénti RSSI gyűrűpufferek és gördülő ablakos statisztika
+
+    Az észlelési arány a window ablak 1/sample_rate hosszú időszeleteinek azon
+    hányada, amelyekben legalább egy minta érkezett.
+    """
+
+    def __init__(self, window=10.0, sample_rate=1.0, buffer_size=256, addresses=None, listener=None):
+        self.window = window
+        self.sample_rate = sample_rate
+        self.buffer_size = buffer_size
+        self.addresses = {normalize_address(a) for a in addresses} if addresses else None
+        self.listener = listener
+        self.started = time.monotonic()
+        self.info = {}
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def add_sample(self, address, rssi, timestamp=None):
+        """Minta rögzítése (bármely szálból hívható)"""
+        if rssi is None:
+            return
+        address = normalize_address(address)
+        if self.addresses is not None and address not in self.addresses:
+            return
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            buffer = self._buffers.get(address)
+            if buffer is None:
+                buffer = self._buffers[address] = deque(maxlen=self.buffer_size)
+            buffer.append((timestamp, rssi))
+        if self.listener is not None:
+            self.listener(address, rssi, timestamp)
+
+    def set_info(self, address, **info):
+        """Mintavétel közben megismert eszközadatok (név, osztály) rögzítése"""
+        address = normalize_address(address)
+        if self.addresses is not None and address not in self.addresses:
+            return
+        with self._lock:
+            self.info.setdefault(address, {}).update((k, v) for k, v in info.items() if v is not None)
+
+    def samples(self, address):
+        """Az eszköz összes pufferelt mintája időrendben"""
+        with self._lock:
+            return list(self._buffers.get(normalize_address(address), ()))
+
+    def devices(self):
+        with self._lock:
+            return list(self._buffers)
+
+    def stats(self, address, now=None):
+        """Gördülő ablak statisztika: észlelési arány, RSSI átlag, szórásnégyzet, percentilisek"""
+        address = normalize_address(address)
+        now = time.monotonic() if now is None else now
+        window_start = max(now - self.window, self.started)
+        with self._lock:
+            samples = [(t, rssi) for t, rssi in self._buffers.get(address, ()) if t >= window_start]
+
+        # A folyamatban lévő időszelet csak akkor számít, ha már van benne minta
+        period = 1.0 / self.sample_rate
+        full_periods = int((now - window_start) / period)
+        hit_periods = {int((t - window_start) / period) for t, _ in samples}
+        total_periods = max(1, full_periods + (1 if full_periods in hit_periods else 0))
+        values = sorted(rssi for _, rssi in samples)
+        mean = sum(values) / len(values) if values else None
+        variance = sum((v - mean) ** 2 for v in values) / len(values) if values else None
+        return {
+            'address': address,
+            'samples': len(values),
+            'periods': total_periods,
+            'detected_periods': len(hit_periods),
+            'detection_rate': len(hit_periods) / total_periods * 100,
+            'rssi_mean': mean,
+            'rssi_variance': variance,
+            'rssi_min': values[0] if values else None,
+            'rssi_max': values[-1] if values else None,
+            'p10': percentile(values, 0.10),
+            'p50': percentile(values, 0.50),
+            'p90': percentile(values, 0.90),
+        }
+
+
+async def ble_rssi_source(monitor, stop_event, adapter=None):
+    """BLE hirdetések passzív hallgatása, amíg stop_event be nem áll"""
+    def on_detection(device, advertisement_data):
+        capture.advert(device, advertisement_data)
+        monitor.set_info(device.address, name=device.name or advertisement_data.local_name)
+        monitor.add_sample(device.address, advertisement_data.rssi)
+
+    scanner = bleak.BleakScanner(detection_callback=on_detection,
+                                 **(adapter.bleak_kwargs() if adapter is not None else {}))
+    await scanner.start()
+    try:
+        await stop_event.wait()
+    finally:
+        await scanner.stop()
+
+
+def inquiry_rssi_source(monitor, duration, stop_flag, adapter=None, max_units=MAX_INQUIRY_UNITS):
+    """Egyetlen hosszú, RSSI-t jelentő klasszikus inquiry (blokkoló, külön szálban futtatandó)"""
+
+    class RssiDiscoverer(bluetooth.DeviceDiscoverer):
+        def pre_inquiry(self):
+            self.done = False
+
+        def device_discovered(self, address, device_class, rssi, name):
+            capture.inquiry(address, name, rssi, device_class)
+            monitor.set_info(address, name=name or None, device_class=device_class)
+            monitor.add_sample(address, rssi)
+
+        def inquiry_complete(self):
+            self.done = True
+
+    discoverer = RssiDiscoverer(**(adapter.pybluez_kwargs() if adapter is not None else {}))
+    deadline = time.monotonic() + duration
+    while not stop_flag.is_set() and time.monotonic() < deadline:
+        units = min(max_units, max(1, math.ceil((deadline - time.monotonic()) / 1.28)))
+        discoverer.find_devices(lookup_names=False, duration=units, flush_cache=True)
+        while not discoverer.done and not stop_flag.is_set():
+            readable = select.select([discoverer], [], [], 0.2)[0]
+            if discoverer in readable:
+                discoverer.process_event()
+        if not discoverer.done:
+            discoverer.cancel_inquiry()
+            break
+
+
+async def run_passive_monitor(monitor, duration, mode='ble', on_report=None, adapter=None):
+    """Passzív monitorozás futtatása; on_report(stats_list) sample_rate gyakorisággal hívódik
+
+    adapter: a hallgatáshoz használt Adapter (None: a háttér alapértelmezett adaptere)
+    """
+    loop = asyncio.get_running_loop()
+    stop_event = asyncio.Event()
+    stop_flag = threading.Event()
+    if mode == 'inquiry':
+        source = loop.run_in_executor(None, inquiry_rssi_source, monitor, duration, stop_flag, adapter)
+    else:
+        source = asyncio.ensure_future(ble_rssi_source(monitor, stop_event, adapter))
+
+    deadline = time.monotonic() + duration
+    try:
+        while time.monotonic() < deadline:
+            await asyncio.sleep(min(1.0 / monitor.sample_rate, max(0.0, deadline - time.monotonic())))
+            if source.done():
+                # A forrás hibája itt derül ki
+                source.result()
+                break
+            if on_report is not None:
+                addresses = sorted(monitor.addresses) if monitor.addresses else monitor.devices()
+                on_report([monitor.stats(a) for a in addresses])
+    finally:
+        stop_event.set()
+        stop_flag.set()
+        await asyncio.gather(source, return_exceptions=True)
+
+
+def smooth_rssi(values, alpha=0.3):
+    """Exponenciálisan simított RSSI (EWMA) időrendi mintákból"""
+    smoothed = None
+    for value in values:
+        smoothed = value if smoothed is None else alpha * value + (1 - alpha) * smoothed
+    return smoothed
+
+
+async def measure_rssi(address, samples=5, timeout=8.0, mode='ble', alpha=0.3):
+    """Valódi RSSI mérés: samples darab mintát gyűjt, és amint megvan, leáll
+
+    Az eredmény a simított dBm érték, egy 0-1 közötti megbízhatóság (a mintaszám
+    és a szórás alapján) és a mérés késleltetése.
+    """
+    loop = asyncio.get_running_loop()
+    enough = asyncio.Event()
+    start_time = time.monotonic()
+    first_sample = []
+
+    def on_sample(sample_address, rssi, timestamp):
+        # Inquiry módban ez egy másik szálból hívódik
+        if not first_sample:
+            first_sample.append(timestamp)
+        if len(monitor.samples(address)) >= samples:
+            loop.call_soon_threadsafe(enough.set)
+
+    monitor = RssiMonitor(window=timeout, sample_rate=1.0, buffer_size=max(samples, 1),
+                          addresses=[address], listener=on_sample)
+    stop_event = asyncio.Event()
+    stop_flag = threading.Event()
+    if mode == 'inquiry':
+        source = loop.run_in_executor(None, inquiry_rssi_source, monitor, timeout, stop_flag)
+    else:
+        source = asyncio.ensure_future(ble_rssi_source(monitor, stop_event))
+    waiter = asyncio.ensure_future(enough.wait())
+    try:
+        await asyncio.wait({waiter, source}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+        stop_event.set()
+        stop_flag.set()
+        results = await asyncio.gather(source, return_exceptions=True)
+
+    latency = time.monotonic() - start_time
+    values = [rssi for _, rssi in monitor.samples(address)]
+    if not values and isinstance(results[0], Exception):
+        raise results[0]
+    info = monitor.info.get(normalize_address(address), {})
+    result = {
+        'address': normalize_address(address),
+        'name': info.get('name'),
+        'device_class': info.get('device_class'),
+        'samples': len(values),
+        'rssi': None,
+        'rssi_raw': values,
+        'confidence': 0.0,
+        'latency': latency,
+        'first_sample_latency': first_sample[0] - start_time if first_sample else None
+    }
+    if values:
+        mean = sum(values) / len(values)
+        std = math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+        result['rssi'] = smooth_rssi(values, alpha)
+        # Kevés vagy erősen szóró minta esetén kisebb a megbízhatóság
+        result['confidence'] = min(1.0, len(values) / samples) * max(0.0, 1.0 - std / 10.0)
+    return result
@@ -0,0 +1,240 @@
+"""BLE kapcsolatok kezelése korlátozott méretű kapcsolat-készlettel
+
+Élő BleakClient kapcsolatokat tart meg cím szerint, így az ismételt műveletek
+nem fizetik meg újra a teljes kapcsolódási költséget.
+"""
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from bluetooth_backends import bleak
+from bluetooth_cache import normalize_address
+
+
+async def default_connect(address, disconnected_callback=None, timeout=10.0, adapter=None):
+    """Egyszerű BLE kapcsolódás újrapróbálkozás nélkül"""
+    adapter_kwargs = adapter.bleak_kwargs() if adapter is not None else {}
+    client = bleak.BleakClient(address, timeout=timeout, disconnected_callback=disconnected_callback,
+                               **adapter_kwargs)
+    await client.connect(timeout=timeout)
+    return client
+
+
+class BleSession:
+    """Egy eszköz élő kapcsolata és használati adatai"""
+
+    def __init__(self, address, client, adapter=None):
+        self.address = address
+        self.client = client
+        self.adapter = adapter
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.operations = 0
+
+    @property
+    def is_connected(self):
+        return self.client.is_connected
+
+
+class BleSessionManager:
+    """Korlátozott méretű BLE kapcsolat-készlet
+
+    - élő kapcsolatok újrahasznosítása cím szerint
+    - LRU és tétlenségi idő alapú kiszorítás
+    - bontás-visszahívás kezelése
+    - eszközönként sorosított, eszközök között párhuzamos műveletek
+    - adapters (AdapterScheduler) megadásakor a kapcsolatok adapterenkénti helyet foglalnak
+    """
+
+    def __init__(self, max_connections=8, idle_timeout=60.0, connect=default_connect, adapters=None):
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self._connect = connect
+        self.adapters = adapters
+        self._sessions = OrderedDict()
+        self._locks = {}
+        self._connecting = 0
+        self._condition = asyncio.Condition()
+        self._reaper = None
+        self.stats = {'connects': 0, 'reused': 0, 'evicted': 0, 'disconnects': 0, 'failures': 0}
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def start(self):
+        """Tétlen kapcsolatokat bontó háttérfeladat indítása"""
+        if self._reaper is None and self.idle_timeout:
+            self._reaper = asyncio.ensure_future(self._reap_idle())
+        if self.adapters is not None:
+            self.adapters.add_reclaimer(self._reclaim)
+
+    async def close(self):
+        """Minden kapcsolat bontása"""
+        if self.adapters is not None:
+            self.adapters.remove_reclaimer(self._reclaim)
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        await asyncio.gather(*(self._disconnect(s) for s in sessions), return_exceptions=True)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, address):
+        return normalize_address(address) in self._sessions
+
+    @asynccontextmanager
+    async def session(self, address):
+        """Kapcsolat kölcsönzése; ugyanarra az eszközre egyszerre csak egy művelet fut"""
+        address = normalize_address(address)
+        lock = self._locks.setdefault(address, asyncio.Lock())
+        async with lock:
+            session = await self._acquire(address)
+            try:
+                yield session.client
+            finally:
+                session.last_used = time.monotonic()
+                session.operations += 1
+                async with self._condition:
+                    self._condition.notify_all()
+
+    async def run(self, address, operation):
+        """Egy művelet (operation(client)) futtatása az eszköz kapcsolatán"""
+        async with self.session(address) as client:
+            return await operation(client)
+
+    async def run_many(self, addresses, operation, concurrency=None):
+        """Művelet futtatása sok eszközön párhuzamosan
+
+        Az eredmény cím -> visszatérési érték vagy kivétel szótár.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def run_one(address):
+            async with semaphore:
+                return await self.run(address, operation)
+
+        addresses = list(addresses)
+        results = await asyncio.gather(*(run_one(a) for a in addresses), return_exceptions=True)
+        return dict(zip(addresses, results))
+
+    async def _acquire(self, address):
+        session = self._sessions.get(address)
+        if session is not None:
+            if session.is_connected:
+                self._sessions.move_to_end(address)
+                self.stats['reused'] += 1
+                return session
+            # Bontás-visszahívás nélkül megszakadt kapcsolat: az adapter helye itt szabadul fel
+            self._release_adapter(session)
+            del self._sessions[address]
+
+        # Szabad hely keresése a készletben, szükség esetén a legrégebben használt tétlen kapcsolat bontásával
+        victims = []
+        async with self._condition:
+            while len(self._sessions) + self._connecting >= self.max_connections:
+                victim = self._pop_lru_idle()
+                if victim is not None:
+                    victims.append(victim)
+                    continue
+                await self._condition.wait()
+            self._connecting += 1
+        for victim in victims:
+            self.stats['evicted'] += 1
+            await self._disconnect(victim)
+
+        adapter = None
+        try:
+            callback = functools.partial(self._on_disconnected, address)
+            if self.adapters is not None:
+                adapter = await self.adapters.acquire(address)
+                client = await self._connect(address, disconnected_callback=callback, adapter=adapter)
+            else:
+                client = await self._connect(address, disconnected_callback=callback)
+            if client is None or not client.is_connected:
+                raise ConnectionError(f"Nem sikerült kapcsolódni: {address}")
+            session = BleSession(address, client, adapter)
+            self._sessions[address] = session
+            self.stats['connects'] += 1
+            return session
+        except BaseException:
+            if adapter is not None:
+                self.adapters.release(adapter)
+            self.stats['failures'] += 1
+            raise
+        finally:
+            async with self._condition:
+                self._connecting -= 1
+                self._condition.notify_all()
+
+    def _pop_lru_idle(self, older_than=None, adapters=None):
+        """A legrégebben használt, éppen nem foglalt kapcsolat kivétele a készletből"""
+        now = time.monotonic()
+        for address, session in self._sessions.items():
+            lock = self._locks.get(address)
+            if lock is not None and lock.locked():
+                continue
+            if older_than is not None and now - session.last_used < older_than:
+                continue
+            if adapters is not None and session.adapter not in adapters:
+                continue
+            return self._sessions.pop(address)
+        return None
+
+    async def _reclaim(self, adapters):
+        """Az ütemező kérésére egy tétlen kapcsolat bontása a megadott adapterek egyikén"""
+        session = self._pop_lru_idle(adapters=adapters)
+        if session is None:
+            return False
+        self.stats['evicted'] += 1
+        await self._disconnect(session)
+        return True
+
+    async def _disconnect(self, session):
+        try:
+            if session.is_connected:
+                await session.client.disconnect()
+        except Exception as e:
+            print(f"Hiba a kapcsolat bontása közben ({session.address}): {str(e)}")
+        finally:
+            self._release_adapter(session)
+
+    def _release_adapter(self, session):
+        # Egy kapcsolat helye csak egyszer szabadul fel (bontás és bontás-visszahívás is jöhet)
+        if session.adapter is not None:
+            self.adapters.release(session.adapter)
+            session.adapter = None
+
+    def _on_disconnected(self, address, client):
+        """Bleak bontás-visszahívás: a halott kapcsolat kikerül a készletből"""
+        session = self._sessions.get(address)
+        if session is not None and session.client is client:
+            del self._sessions[address]
+            self._release_adapter(session)
+            self.stats['disconnects'] += 1
+            print(f"BLE kapcsolat megszakadt: {address}")
+            asyncio.ensure_future(self._notify())
+
+    async def _notify(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def _reap_idle(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 2))
+            while True:
+                session = self._pop_lru_idle(older_than=self.idle_timeout)
+                if session is None:
+                    break
+                self.stats['evicted'] += 1
+                await self._disconnect(session)
+            await self._notify()
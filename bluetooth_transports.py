@@ -0,0 +1,661 @@
+"""Egységes átviteli réteg a bleak, PyBluez és lightblue hátterek fölött
+
+Mindhárom háttér ugyanazt a discover/connect/services felületet kapja, és
+egy képesség-mátrix írja le, melyik háttér melyik műveletet melyik
+átvitellel (BLE/klasszikus) tudja, és mennyire gyors. Művelet előtt a
+select() a leggyorsabb telepített és működő hátteret választja. Az adapter
+állapotát egy gyorsítótárazott ellenőrzés adja: a rendszer (sysfs, rfkill)
+és a háttér saját próbája ttl másodpercenként legfeljebb egyszer fut, így a
+hívásonkénti költség egy szótár keresés.
+"""
+import abc
+import asyncio
+import functools
+import os
+import re
+import select
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from bluetooth_backends import bleak, bluetooth, lightblue, registry, BackendUnavailable
+from bluetooth_adapters import SYSFS_BLUETOOTH, discover_adapters
+from bluetooth_cache import serialize_gatt_services
+from bluetooth_metrics import metrics
+from bluetooth_retry import CircuitOpenError, default_scheduler
+from traffic_log import capture
+
+SYSFS_RFKILL = '/sys/class/rfkill'
+
+# A GUI, a CLI és a kötegelt mód közös MAC cím formátuma
+MAC_ADDRESS = re.compile(r"^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$")
+
+BLE = 'ble'
+CLASSIC = 'classic'
+DISCOVER = 'discover'
+CONNECT = 'connect'
+SERVICES = 'services'
+OPERATIONS = (DISCOVER, CONNECT, SERVICES)
+
+
+def is_valid_address(address):
+    """Érvényes MAC cím-e (kettőspont vagy kötőjel elválasztóval)"""
+    return bool(address) and MAC_ADDRESS.match(address) is not None
+
+
+class AdapterHealth:
+    """Gyorsítótárazott adapter állapot ellenőrzés
+
+    A rendszerszintű ellenőrzés (van-e HCI adapter, nincs-e rfkill-lel letiltva)
+    és a háttérenkénti próba eredménye ttl másodpercig érvényes. Ahol nincs
+    sysfs (nem Linux), a rendszer nem ellenőrizhető, ott csak a háttér próbája dönt.
+    """
+
+    def __init__(self, ttl=30.0, sysfs_root=SYSFS_BLUETOOTH, rfkill_root=SYSFS_RFKILL):
+        self.ttl = ttl
+        self.sysfs_root = sysfs_root
+        self.rfkill_root = rfkill_root
+        self._results = {}  # kulcs -> (időbélyeg, ok, ok szövege)
+        self._assumed = None
+        # Újrabelépő: a háttér próbája előtt a rendszerszintű eredmény is ebből a gyorsítótárból jön
+        self._lock = threading.RLock()
+
+    def assume(self, ok=True, reason=None):
+        """Rögzített eredmény valódi rádió nélküli futáshoz (szimuláció, visszajátszás)"""
+        self._assumed = (ok, reason)
+
+    def invalidate(self, key=None):
+        """Az eltárolt eredmény(ek) eldobása, a következő check() újra ellenőriz"""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def check(self, key=None, probe=None):
+        """(ok, ok szövege); key=None a rendszerszintű, egyébként a háttér próbájával együtt"""
+        if self._assumed is not None:
+            return self._assumed
+        now = time.monotonic()
+        cached = self._results.get(key)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1], cached[2]
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and now - cached[0] < self.ttl:
+                return cached[1], cached[2]
+            ok, reason = self.check(None) if key is not None else self._system_check()
+            if ok and probe is not None:
+                try:
+                    probe()
+                except Exception as e:
+                    ok, reason = False, f"Nem található aktív Bluetooth adapter! ({str(e)})"
+            self._results[key] = (now, ok, reason)
+        metrics.inc('bluetooth_health_probes_total', backend=key or 'system', outcome='ok' if ok else 'failed')
+        return ok, reason
+
+    def _system_check(self):
+        if not os.path.isdir(self.sysfs_root):
+            return True, None
+        if not discover_adapters(self.sysfs_root):
+            return False, "Nem található aktív Bluetooth adapter!"
+        if _rfkill_blocked(self.rfkill_root):
+            return False, "A Bluetooth rádió le van tiltva (rfkill)!"
+        return True, None
+
+    def status(self):
+        return {key or 'system': {'ok': ok, 'reason': reason, 'age': time.monotonic() - timestamp}
+                for key, (timestamp, ok, reason) in self._results.items()}
+
+
+def _rfkill_blocked(root):
+    """Igaz, ha van Bluetooth rfkill kapcsoló, és mind tiltott (soft vagy hard)"""
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return False
+    states = []
+    for name in names:
+        try:
+            with open(os.path.join(root, name, 'type')) as f:
+                if f.read().strip() != 'bluetooth':
+                    continue
+            blocked = False
+            for flag in ('soft', 'hard'):
+                with open(os.path.join(root, name, flag)) as f:
+                    blocked = blocked or f.read().strip() == '1'
+            states.append(blocked)
+        except OSError:
+            continue
+    return bool(states) and all(states)
+
+
+default_health = AdapterHealth()
+
+
+def lightblue_connect(address, max_attempts=2, scheduler=default_scheduler):
+    """Lightblue kapcsolódás fázisonkénti időméréssel; a socketet vagy None-t adja vissza"""
+    with metrics.operation('lightblue_connect', device=address) as operation:
+        socket = _lightblue_connect(address, max_attempts, scheduler)
+        operation.set_outcome('ok' if socket else 'failed')
+    metrics.inc('bluetooth_connects_total', transport='lightblue', outcome=operation.outcome)
+    return socket
+
+
+def _lightblue_connect(address, max_attempts, scheduler):
+    try:
+        print(f"\nLightblue kapcsolódás megkezdése: {address}")
+        if not registry.available('lightblue'):
+            print(str(BackendUnavailable('lightblue')))
+            return None
+        
+        # MAC cím formátum ellenőrzése
+        if not is_valid_address(address):
+            print("Érvénytelen MAC cím formátum!")
+            return None
+            
+        # Bluetooth adapter ellenőrzése (gyorsítótárazott, nem indít keresést)
+        ok, reason = default_health.check('lightblue', lightblue.gethostaddress)
+        if not ok:
+            print(reason)
+            return None
+            
+        def attempt():
+            print("Szolgáltatások keresése...")
+            services = lightblue.findservices(address)
+            if not services:
+                raise LookupError("Nem található szolgáltatás az eszközön!")
+            # Kapcsolódás az első szolgáltatáshoz
+            socket = lightblue.socket()
+            socket.settimeout(15)  # 15 másodperces timeout
+            try:
+                socket.connect((address, services[0][0]))
+            except Exception:
+                socket.close()
+                raise
+            return socket, services[0][0]
+
+        try:
+            socket, port = scheduler.run_sync(address, attempt, max_attempts=max_attempts, label="Lightblue")
+            print(f"Lightblue kapcsolat létrejött a {port} porton!")
+            return socket
+            
+        except CircuitOpenError as ce:
+            print(str(ce))
+            return None
+        except (lightblue.BluetoothError, LookupError, OSError) as be:
+            print(f"Lightblue kapcsolódási hiba: {str(be)}")
+            print("\nKérem ellenőrizze:")
+            print("1. Az eszköz be van kapcsolva")
+            print("2. Az eszköz párosítási módban van")
+            print("3. A Bluetooth adapter be van kapcsolva")
+            print("4. A MAC cím helyes")
+            
+            return None
+
+    except Exception as e:
+        print(f"Váratlan hiba történt: {str(e)}")
+        print(f"Hiba típusa: {type(e).__name__}")
+        return None
+
+
+def classic_bluetooth_connect(address, cache=None, max_attempts=2, scheduler=default_scheduler, adapter=None):
+    """Klasszikus kapcsolódás fázisonkénti időméréssel; a socketet vagy None-t adja vissza
+
+    Ha adapter meg van adva, a socket annak a vezérlőnek a címéhez kötődik.
+    """
+    with metrics.operation('classic_connect', device=address) as operation:
+        socket = _classic_bluetooth_connect(address, cache, max_attempts, scheduler, adapter)
+        operation.set_outcome('ok' if socket else 'failed')
+    metrics.inc('bluetooth_connects_total', transport='classic', outcome=operation.outcome)
+    return socket
+
+
+def _classic_bluetooth_connect(address, cache, max_attempts, scheduler, adapter):
+    try:
+        print(f"\nKlasszikus Bluetooth kapcsolódás megkezdése: {address}")
+        if not registry.available('bluetooth'):
+            print(str(BackendUnavailable('bluetooth')))
+            return None
+        
+        # MAC cím formátum ellenőrzése
+        if not is_valid_address(address):
+            print("Érvénytelen MAC cím formátum!")
+            return None
+            
+        # Bluetooth adapter ellenőrzése (gyorsítótárazott)
+        ok, reason = default_health.check('pybluez', _pybluez_probe)
+        if not ok:
+            print(reason)
+            return None
+            
+        def attempt():
+            print("Elérhető portok keresése...")
+            result = resolve_rfcomm_channel(address, cache=cache, adapter=adapter)
+            if not result:
+                raise TimeoutError("Nem található elérhető port az eszközön!")
+            return result
+
+        try:
+            result = scheduler.run_sync(address, attempt, max_attempts=max_attempts, label="Klasszikus Bluetooth")
+        except CircuitOpenError as ce:
+            print(str(ce))
+            return None
+        except (bluetooth.BluetoothError, OSError) as be:
+            print(f"Bluetooth kapcsolódási hiba: {str(be)}")
+            print("\nKérem ellenőrizze:")
+            print("1. Az eszköz be van kapcsolva")
+            print("2. Az eszköz párosítási módban van")
+            print("3. A Bluetooth adapter be van kapcsolva")
+            print("4. A MAC cím helyes")
+            return None
+            
+        # A feloldás során megnyitott socketet használjuk tovább, nem tárcsázunk újra
+        socket = result['socket']
+        socket.settimeout(15)  # 15 másodperces timeout
+        print(f"Klasszikus Bluetooth kapcsolat létrejött a {result['channel']} porton!")
+        return socket
+            
+    except Exception as e:
+        print(f"Váratlan hiba történt: {str(e)}")
+        print(f"Hiba típusa: {type(e).__name__}")
+        return None
+
+
+def _pybluez_probe():
+    socket = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
+    socket.close()
+
+
+def find_service_records(address, cache=None):
+    """SDP rekordok lekérdezése, friss gyorsítótár bejegyzés esetén SDP nélkül"""
+    if cache is not None:
+        records = cache.get(address, 'sdp_records')
+        if records is not None:
+            return records
+    try:
+        with metrics.span('sdp', device=address):
+            records = bluetooth.find_service(address=address)
+    except (bluetooth.BluetoothError, OSError) as e:
+        print(f"SDP lekérdezés sikertelen: {str(e)}")
+        return None
+    if cache is not None:
+        cache.update(address, sdp_records=records)
+    return records
+
+
+def find_rfcomm_channels_sdp(address, cache=None):
+    """RFCOMM csatornák lekérdezése SDP-n keresztül"""
+    services = find_service_records(address, cache)
+
+    channels = []
+    for svc in services or []:
+        port = svc.get('port')
+        if svc.get('protocol') == 'RFCOMM' and port and port not in channels:
+            channels.append(port)
+    return channels
+
+
+def try_rfcomm_channel(address, channel, timeout, stop_event=None, adapter=None):
+    """Egy RFCOMM csatorna kipróbálása, siker esetén a nyitott socketet adja vissza"""
+    if stop_event is not None and stop_event.is_set():
+        return None
+    sock = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
+    start_time = time.monotonic()
+    try:
+        sock.settimeout(timeout)
+        if adapter is not None and adapter.bind_address():
+            # A kimenő kapcsolat a megadott vezérlőn keresztül megy
+            sock.bind((adapter.bind_address(), 0))
+        sock.connect((address, channel))
+        capture.connect(address, 'classic', True, time.monotonic() - start_time, channel)
+        if adapter is not None:
+            adapter.record_connect(True, time.monotonic() - start_time, 'classic')
+        return sock
+    except (bluetooth.BluetoothError, OSError):
+        capture.connect(address, 'classic', False, time.monotonic() - start_time, channel)
+        if adapter is not None:
+            adapter.record_connect(False, time.monotonic() - start_time, 'classic')
+        sock.close()
+        return None
+
+
+def resolve_rfcomm_channel(address, max_parallel=4, attempt_timeout=5.0, channels=range(1, 30), cache=None,
+                           adapter=None):
+    """RFCOMM csatorna feloldása: gyorsítótár, SDP, végül korlátozottan párhuzamos próbálkozás
+
+    Sikeres feloldás esetén a nyitott socketet is visszaadja, így nem kell újra kapcsolódni.
+    """
+    start_time = time.monotonic()
+
+    # 0. Gyorsítótár: korábban működő csatorna közvetlen kipróbálása
+    if cache is not None:
+        channel = cache.get(address, 'rfcomm_channel')
+        if channel is not None:
+            with metrics.span('channel_cache', device=address) as span:
+                sock = try_rfcomm_channel(address, channel, attempt_timeout, adapter=adapter)
+                span.set_outcome('ok' if sock else 'stale')
+            if sock:
+                elapsed = time.monotonic() - start_time
+                print(f"RFCOMM csatorna gyorsítótárból: {channel} ({elapsed:.2f} s)")
+                return {'channel': channel, 'socket': sock, 'source': 'cache', 'elapsed': elapsed}
+            # A tárolt csatorna már nem működik, újra feloldjuk
+            cache.invalidate(address, 'rfcomm_channel')
+
+    # 1. SDP lekérdezés: ha az eszköz hirdeti a szolgáltatást, nem kell próbálgatni
+    for channel in find_rfcomm_channels_sdp(address, cache):
+        with metrics.span('channel_connect', device=address, channel=channel) as span:
+            sock = try_rfcomm_channel(address, channel, attempt_timeout, adapter=adapter)
+            span.set_outcome('ok' if sock else 'failed')
+        if sock:
+            elapsed = time.monotonic() - start_time
+            print(f"RFCOMM csatorna SDP alapján: {channel} ({elapsed:.2f} s)")
+            if cache is not None:
+                cache.update(address, rfcomm_channel=channel)
+            return {'channel': channel, 'socket': sock, 'source': 'SDP', 'elapsed': elapsed}
+
+    # 2. Csatornák próbálgatása, legfeljebb max_parallel egyidejű kapcsolódással
+    print(f"SDP nem adott használható csatornát, próbálkozás {max_parallel} párhuzamos kapcsolattal...")
+    stop_event = threading.Event()
+    result = None
+    executor = ThreadPoolExecutor(max_workers=max_parallel)
+    futures = {executor.submit(try_rfcomm_channel, address, channel, attempt_timeout, stop_event, adapter): channel
+               for channel in channels}
+    winner = None
+    with metrics.span('channel_probe', device=address) as span:
+        try:
+            for future in as_completed(futures):
+                sock = future.result()
+                if sock is not None:
+                    winner = future
+                    result = {'channel': futures[future], 'socket': sock, 'source': 'probe'}
+                    break
+        finally:
+            stop_event.set()
+            # A még futó próbálkozások esetleges sikeres socketjeit lezárjuk
+            for future in futures:
+                if future is not winner:
+                    future.add_done_callback(close_future_socket)
+            executor.shutdown(wait=False, cancel_futures=True)
+        span.set_outcome('ok' if result else 'not_found')
+
+    elapsed = time.monotonic() - start_time
+    if not result:
+        print(f"Nem található nyitott RFCOMM csatorna ({elapsed:.2f} s)")
+        return None
+    result['elapsed'] = elapsed
+    print(f"RFCOMM csatorna próbálgatással: {result['channel']} ({elapsed:.2f} s)")
+    if cache is not None:
+        cache.update(address, rfcomm_channel=result['channel'])
+    return result
+
+
+def close_future_socket(future):
+    """Egy lezáratlan próbálkozás socketjének lezárása"""
+    if future.cancelled() or future.exception():
+        return
+    sock = future.result()
+    if sock:
+        sock.close()
+
+
+async def ble_connect_with_retry(address, max_attempts=3, disconnected_callback=None, timeout=10.0,
+                                 scheduler=default_scheduler, adapter=None):
+    ok, reason = default_health.check('bleak')
+    if not ok:
+        print(f"BLE kapcsolódás sikertelen: {reason}")
+        return None
+    adapter_kwargs = adapter.bleak_kwargs() if adapter is not None else {}
+
+    async def attempt():
+        start_time = time.monotonic()
+        connected = False
+        with metrics.span('connect', device=address):
+            try:
+                client = bleak.BleakClient(address, timeout=timeout, disconnected_callback=disconnected_callback,
+                                           **adapter_kwargs)
+                await client.connect(timeout=timeout)
+                connected = True
+            finally:
+                capture.connect(address, 'ble', connected, time.monotonic() - start_time)
+                if adapter is not None:
+                    adapter.record_connect(connected, time.monotonic() - start_time)
+        return client
+
+    with metrics.operation('ble_connect', device=address) as operation:
+        try:
+            client = await scheduler.run_async(address, attempt, max_attempts=max_attempts, label="BLE Csatlakozási")
+        except Exception as e:
+            print(f"BLE kapcsolódás sikertelen: {str(e)}")
+            client = None
+        operation.set_outcome('ok' if client else 'failed')
+    metrics.inc('bluetooth_connects_total', transport='ble', outcome=operation.outcome)
+    return client
+
+
+class Transport(abc.ABC):
+    """Egy háttér közös felülete
+
+    capabilities: művelet -> az átvitelek halmaza, amelyekre a háttér képes
+    cost: művelet -> relatív költség (kisebb: gyorsabb), a select() ez alapján választ
+    A leszármazottaknak a discover_sync, connect és services metódust kötelező megvalósítani.
+    """
+    name = None
+    backend = None
+    capabilities = {}
+    cost = {}
+
+    def __init__(self, health=default_health):
+        self.health = health
+
+    def supports(self, operation, kind):
+        return kind in self.capabilities.get(operation, ())
+
+    def available(self):
+        """Telepítve van-e a háttér (betöltés nélkül)"""
+        return registry.available(self.backend)
+
+    def probe(self):
+        """A háttér saját, olcsó adapter ellenőrzése; hibát dob, ha nincs használható adapter"""
+
+    def healthy(self):
+        return self.health.check(self.name, self.probe)
+
+    def usable(self, operation, kind):
+        return self.supports(operation, kind) and self.available() and self.healthy()[0]
+
+    @abc.abstractmethod
+    def discover_sync(self, duration, adapter=None):
+        """Blokkoló keresés, (cím, név) párok listája"""
+
+    async def discover(self, duration, adapter=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.discover_sync, duration, adapter)
+
+    def inquiry_sync(self, duration, on_found, stop_flag, adapter=None):
+        """Blokkoló keresés, amely minden címet egyszer, on_found(cím, név) hívással jelent
+
+        A stop_flag (threading.Event) beállása a keresést megszakítja, ahol a háttér
+        ezt lehetővé teszi; alapesetben a teljes discover_sync eredményét adja tovább.
+        """
+        for address, name in self.discover_sync(duration, adapter):
+            if stop_flag.is_set():
+                return
+            on_found(address, name)
+
+    @abc.abstractmethod
+    async def connect(self, address, cache=None, adapter=None, **kwargs):
+        """Kapcsolódás; a kapcsolat objektuma (BleakClient vagy socket), sikertelenség esetén None"""
+
+    @abc.abstractmethod
+    async def services(self, address, cache=None):
+        """A szolgáltatások listája szótárakként, hiba esetén None"""
+
+    def as_dict(self):
+        ok, reason = self.healthy() if self.available() else (False, None)
+        return {'available': self.available(), 'healthy': ok, 'reason': reason,
+                'operations': {operation: sorted(kinds) for operation, kinds in self.capabilities.items()},
+                'cost': dict(self.cost)}
+
+
+class BleakTransport(Transport):
+    name = 'bleak'
+    backend = 'bleak'
+    capabilities = {DISCOVER: {BLE}, CONNECT: {BLE}, SERVICES: {BLE}}
+    cost = {DISCOVER: 1, CONNECT: 1, SERVICES: 1}
+
+    def discover_sync(self, duration, adapter=None):
+        # A bleak csak aszinkron API-t ad: a hívó (végrehajtó) szálában saját eseményhurkon fut
+        return asyncio.run(self.discover(duration, adapter))
+
+    async def discover(self, duration, adapter=None):
+        kwargs = adapter.bleak_kwargs() if adapter is not None else {}
+        devices = await bleak.BleakScanner.discover(timeout=duration, **kwargs)
+        return [(device.address, device.name) for device in devices]
+
+    async def connect(self, address, cache=None, adapter=None, **kwargs):
+        return await ble_connect_with_retry(address, adapter=adapter, **kwargs)
+
+    async def services(self, address, cache=None):
+        gatt_table = cache.get(address, 'gatt_services') if cache else None
+        if gatt_table is not None:
+            return gatt_table
+        client = await self.connect(address)
+        if client is None:
+            return None
+        try:
+            with metrics.span('gatt_discovery', device=address):
+                gatt_table = serialize_gatt_services(await client.get_services())
+        finally:
+            await client.disconnect()
+        if cache is not None:
+            cache.update(address, gatt_services=gatt_table)
+        return gatt_table
+
+
+class PyBluezTransport(Transport):
+    name = 'pybluez'
+    backend = 'bluetooth'
+    capabilities = {DISCOVER: {CLASSIC}, CONNECT: {CLASSIC}, SERVICES: {CLASSIC}}
+    # Csatorna gyorsítótár és párhuzamos feloldás, közvetlen SDP
+    cost = {DISCOVER: 1, CONNECT: 1, SERVICES: 1}
+
+    def probe(self):
+        _pybluez_probe()
+
+    def discover_sync(self, duration, adapter=None):
+        # Az inquiry időtartama 1.28 másodperces egységekben értendő
+        kwargs = adapter.pybluez_kwargs() if adapter is not None else {}
+        return list(bluetooth.discover_devices(duration=max(1, round(duration / 1.28)), lookup_names=True, **kwargs))
+
+    def inquiry_sync(self, duration, on_found, stop_flag, adapter=None):
+        # DeviceDiscoverer: a találatok azonnal jönnek, és a rádió a cancel_inquiry()-vel kiléptethető
+        done = threading.Event()
+        seen = set()
+
+        class Discoverer(bluetooth.DeviceDiscoverer):
+            def device_discovered(self, address, device_class, rssi, name):
+                if address not in seen:
+                    seen.add(address)
+                    on_found(address, name or None)
+
+            def inquiry_complete(self):
+                done.set()
+
+        discoverer = Discoverer(**(adapter.pybluez_kwargs() if adapter is not None else {}))
+        discoverer.find_devices(lookup_names=True, duration=max(1, round(duration / 1.28)), flush_cache=True)
+        while not done.is_set():
+            if stop_flag.is_set():
+                discoverer.cancel_inquiry()
+                return
+            if discoverer in select.select([discoverer], [], [], 0.2)[0]:
+                discoverer.process_event()
+
+    async def connect(self, address, cache=None, adapter=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(
+            classic_bluetooth_connect, address, cache=cache, adapter=adapter, **kwargs))
+
+    async def services(self, address, cache=None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, find_service_records, address, cache)
+
+
+class LightblueTransport(Transport):
+    name = 'lightblue'
+    backend = 'lightblue'
+    capabilities = {DISCOVER: {CLASSIC}, CONNECT: {CLASSIC}, SERVICES: {CLASSIC}}
+    # Minden kapcsolódás előtt SDP keresés, nincs adapter választás
+    cost = {DISCOVER: 2, CONNECT: 2, SERVICES: 2}
+
+    def probe(self):
+        lightblue.gethostaddress()
+
+    def discover_sync(self, duration, adapter=None):
+        return [(found[0], found[1]) for found in lightblue.finddevices(getnames=True, length=duration)]
+
+    async def connect(self, address, cache=None, adapter=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(lightblue_connect, address, **kwargs))
+
+    async def services(self, address, cache=None):
+        loop = asyncio.get_running_loop()
+        try:
+            found = await loop.run_in_executor(None, lightblue.findservices, address)
+        except (lightblue.BluetoothError, OSError) as e:
+            print(f"Szolgáltatás keresés sikertelen: {str(e)}")
+            return None
+        return [{'host': host, 'port': port, 'name': name, 'protocol': 'RFCOMM'} for host, port, name in found]
+
+
+class TransportSelector:
+    """A hátterek képesség-mátrixa és műveletenkénti választás"""
+
+    def __init__(self, transports):
+        self.transports = list(transports)
+
+    def get(self, name):
+        for transport in self.transports:
+            if transport.name == name:
+                return transport
+        return None
+
+    def candidates(self, operation, kind):
+        """A műveletre képes hátterek a költség szerint növekvő sorrendben"""
+        capable = [t for t in self.transports if t.supports(operation, kind)]
+        return sorted(capable, key=lambda t: t.cost.get(operation, 0))
+
+    def select(self, operation, kind):
+        """A leggyorsabb telepített és működő háttér, vagy None"""
+        for transport in self.candidates(operation, kind):
+            if transport.usable(operation, kind):
+                return transport
+        return None
+
+    def unavailable_reason(self, operation, kind):
+        """Szöveges magyarázat, ha a select() nem talált hátteret"""
+        reasons = []
+        for transport in self.candidates(operation, kind):
+            if not transport.available():
+                reasons.append(str(BackendUnavailable(transport.backend)))
+            else:
+                reasons.append(f"{transport.name}: {transport.healthy()[1]}")
+        return '; '.join(reasons) or f"Nincs {kind} {operation} képességű háttér"
+
+    def matrix(self):
+        return {transport.name: transport.as_dict() for transport in self.transports}
+
+
+default_transports = TransportSelector([BleakTransport(), PyBluezTransport(), LightblueTransport()])
+
+
+def print_transports(selector=default_transports):
+    """A képesség-mátrix és a műveletenként választott háttér kiírása"""
+    for name, info in selector.matrix().items():
+        operations = ', '.join(f"{operation}:{'/'.join(kinds)}" for operation, kinds in info['operations'].items())
+        state = "működik" if info['healthy'] else (info['reason'] or "nem elérhető")
+        print(f"{name:10} {state:30} {operations}")
+    for operation in OPERATIONS:
+        for kind in (BLE, CLASSIC):
+            transport = selector.select(operation, kind)
+            print(f"{operation:9} {kind:8} -> {transport.name if transport else '-'}")
@@ -0,0 +1,201 @@
+"""Cím szerint indexelt eszköznyilvántartás BLE és klasszikus észlelésekhez
+
+Ugyanaz a fizikai eszköz (azonos cím) BLE és klasszikus keresésből egyetlen
+bejegyzéssé olvad össze. A bejegyzések __slots__ alapú rekordok, mert
+percenként több ezer hirdetés érkezhet; a cím szerinti keresés O(1), az RSSI
+szerinti rendezett lekérdezések egy bisect-tel karbantartott listából O(log n)
+kereséssel mennek.
+"""
+import bisect
+import math
+import threading
+import time
+
+from bluetooth_cache import normalize_address
+
+BLE = 'ble'
+CLASSIC = 'classic'
+
+# Ennyi dB alatti RSSI változás nem rendezi át az indexet (a hirdetések RSSI-je folyamatosan ingadozik)
+RSSI_INDEX_HYSTERESIS = 2
+
+
+class DeviceRecord:
+    """Egy eszköz összesített adatai"""
+
+    __slots__ = ('address', 'ble_name', 'classic_name', 'transports', 'first_seen', 'last_seen',
+                 'rssi', 'rssi_avg', 'sightings', 'device_class', 'ble_device', 'advertisement',
+                 '_indexed_rssi')
+
+    def __init__(self, address, timestamp):
+        self.address = address
+        self.ble_name = None
+        self.classic_name = None
+        self.transports = 0
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.rssi = None
+        self.rssi_avg = None
+        self.sightings = 0
+        self.device_class = None
+        self.ble_device = None
+        self.advertisement = None
+        self._indexed_rssi = None
+
+    @property
+    def name(self):
+        # A klasszikus név általában a teljes eszköznév, a BLE név gyakran rövidített
+        return self.classic_name or self.ble_name
+
+    @property
+    def is_ble(self):
+        return bool(self.transports & 1)
+
+    @property
+    def is_classic(self):
+        return bool(self.transports & 2)
+
+    @property
+    def type(self):
+        if self.is_ble and self.is_classic:
+            return 'BLE + Classic'
+        return 'BLE' if self.is_ble else 'Classic'
+
+    def as_dict(self):
+        return {
+            'address': self.address,
+            'name': self.name,
+            'type': self.type,
+            'rssi': self.rssi,
+            'rssi_avg': self.rssi_avg,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'sightings': self.sightings,
+            'device_class': self.device_class,
+            'advertisement': self.advertisement.as_dict() if self.advertisement is not None else None,
+        }
+
+    def __repr__(self):
+        return f"<DeviceRecord {self.address} {self.name!r} {self.type} rssi={self.rssi}>"
+
+
+class DeviceRegistry:
+    """Eszközök cím szerinti nyilvántartása RSSI szerinti indexszel
+
+    Az observe_* metódusok bármely szálból hívhatók (a klasszikus inquiry külön szálban fut).
+    """
+
+    def __init__(self, rssi_alpha=0.3):
+        self.rssi_alpha = rssi_alpha
+        self._records = {}
+        # (-rssi, cím) párok növekvő sorrendben, így az első elem a legerősebb jel
+        self._by_rssi = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, address):
+        return normalize_address(address) in self._records
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._records.values()))
+
+    def get(self, address):
+        return self._records.get(normalize_address(address))
+
+    def observe_ble(self, device, advertisement_data=None, timestamp=None):
+        """BLE hirdetés rögzítése; igaz, ha az eszköz új vagy a neve megváltozott"""
+        rssi = getattr(advertisement_data, 'rssi', None)
+        if rssi is None:
+            rssi = getattr(device, 'rssi', None)
+        name = device.name or getattr(advertisement_data, 'local_name', None)
+        with self._lock:
+            record, changed = self._observe(device.address, 1, rssi, timestamp)
+            record.ble_device = device
+            if name and name != record.ble_name:
+                record.ble_name = name
+                changed = True
+        return changed
+
+    def observe_advertisement(self, advert):
+        """Az AdvertisementPipeline által továbbadott (megváltozott) hirdetés rögzítése"""
+        with self._lock:
+            record, changed = self._observe(advert.address, 1, advert.rssi if 'rssi' in advert.changes else None,
+                                            advert.last_seen, sightings=advert.raw_count or 1)
+            record.ble_device = advert.device
+            record.advertisement = advert
+            if advert.local_name and advert.local_name != record.ble_name:
+                record.ble_name = advert.local_name
+                changed = True
+        return changed or 'payload' in advert.changes
+
+    def observe_classic(self, address, name=None, rssi=None, device_class=None, timestamp=None):
+        """Klasszikus keresési találat rögzítése; igaz, ha az eszköz új vagy a neve megváltozott"""
+        with self._lock:
+            record, changed = self._observe(address, 2, rssi, timestamp)
+            if device_class is not None:
+                record.device_class = device_class
+            if name and name != record.classic_name:
+                record.classic_name = name
+                changed = True
+        return changed
+
+    def _observe(self, address, transport, rssi, timestamp, sightings=1):
+        address = normalize_address(address)
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        record = self._records.get(address)
+        changed = record is None
+        if record is None:
+            record = self._records[address] = DeviceRecord(address, timestamp)
+        if not record.transports & transport:
+            record.transports |= transport
+            changed = True
+        record.last_seen = timestamp
+        record.sightings += sightings
+        if rssi is not None:
+            record.rssi = rssi
+            record.rssi_avg = rssi if record.rssi_avg is None else \
+                self.rssi_alpha * rssi + (1 - self.rssi_alpha) * record.rssi_avg
+            self._reindex(record)
+        return record, changed
+
+    def _reindex(self, record):
+        indexed = record._indexed_rssi
+        rssi = round(record.rssi_avg)
+        if indexed is not None and abs(indexed - rssi) < RSSI_INDEX_HYSTERESIS:
+            return
+        if indexed is not None:
+            index = bisect.bisect_left(self._by_rssi, (-indexed, record.address))
+            del self._by_rssi[index]
+        bisect.insort(self._by_rssi, (-rssi, record.address))
+        record._indexed_rssi = rssi
+
+    def strongest(self, limit=None, min_rssi=None):
+        """Eszközök a (simított) jelerősség szerint csökkenő sorrendben"""
+        with self._lock:
+            end = len(self._by_rssi)
+            if min_rssi is not None:
+                # A kulcsok egész számok: a (k,) határ előtt pontosan a k-nál kisebb kulcsú elemek állnak
+                end = bisect.bisect_left(self._by_rssi, (math.floor(-min_rssi) + 1,))
+            if limit is not None:
+                end = min(end, limit)
+            return [self._records[address] for _, address in self._by_rssi[:end]]
+
+    def devices(self, transport=None, since=None):
+        """Eszközök az első észlelés sorrendjében, opcionálisan típus és utolsó észlelés szerint szűrve"""
+        mask = {BLE: 1, CLASSIC: 2}.get(transport, 3)
+        with self._lock:
+            return [record for record in self._records.values()
+                    if record.transports & mask and (since is None or record.last_seen >= since)]
+
+    def counts(self):
+        """Eszközszám típusonként (a kettős módú eszközök mindkettőben számítanak)"""
+        with self._lock:
+            records = list(self._records.values())
+        return {
+            BLE: sum(1 for r in records if r.is_ble),
+            CLASSIC: sum(1 for r in records if r.is_classic),
+            'total': len(records),
+        }
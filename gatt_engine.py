@@ -0,0 +1,221 @@
+"""Párhuzamos GATT olvasás és értesítés-folyam BLE kapcsolatokhoz
+
+A karakterisztikákat kapcsolatonként korlátozott párhuzamossággal olvassa,
+a beérkező értesítéseket előre lefoglalt gyűrűpufferbe másolja, és kötegekben,
+aszinkron iterátoron keresztül adja tovább. Karakterisztikánként méri az
+olvasási késleltetést és az értesítési gyakoriságot.
+"""
+import asyncio
+import time
+
+from bluetooth_cache import serialize_gatt_services
+from traffic_log import capture
+
+# A GATT attribútum érték legfeljebb 512 bájt lehet
+MAX_ATTRIBUTE_SIZE = 512
+
+
+class NotificationRing:
+    """Előre lefoglalt gyűrűpuffer értesítésekhez
+
+    A pop_batch által visszaadott memoryview-k a következő pop_batch hívásig
+    érvényesek: a köteg helyei addig foglaltak, és csak a következő köteg
+    kérésekor szabadulnak fel. Betelt puffer esetén a legrégebbi olvasatlan
+    értesítés vész el; ha minden hely a fogyasztónál lévő kötegé, akkor az új
+    (mindkét esetet a dropped számláló mutatja).
+    """
+
+    def __init__(self, slots=1024, slot_size=MAX_ATTRIBUTE_SIZE):
+        self.slots = slots
+        self.slot_size = slot_size
+        self._data = bytearray(slots * slot_size)
+        self._view = memoryview(self._data)
+        self._lengths = [0] * slots
+        self._keys = [None] * slots
+        self._times = [0.0] * slots
+        self._head = 0
+        self._count = 0
+        # Az utolsó köteg helyei (az olvasatlanok előtt), a következő pop_batch-ig foglaltak
+        self._held = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, key, data, timestamp):
+        if self._count + self._held == self.slots:
+            self.dropped += 1
+            if self._held:
+                # A legrégebbi olvasatlan a kiadott köteg mögött van, nem írható felül
+                return
+            self._count -= 1
+        index = self._head
+        length = min(len(data), self.slot_size)
+        offset = index * self.slot_size
+        self._view[offset:offset + length] = data[:length]
+        self._lengths[index] = length
+        self._keys[index] = key
+        self._times[index] = timestamp
+        self._head = (index + 1) % self.slots
+        self._count += 1
+
+    def pop_batch(self, max_items):
+        # Az előző köteg memoryview-i innentől érvénytelenek
+        self._held = 0
+        count = min(max_items, self._count)
+        tail = (self._head - self._count) % self.slots
+        batch = []
+        for i in range(count):
+            index = (tail + i) % self.slots
+            offset = index * self.slot_size
+            batch.append((self._keys[index], self._times[index],
+                          self._view[offset:offset + self._lengths[index]]))
+        self._count -= count
+        self._held = count
+        return batch
+
+
+class CharacteristicStats:
+    """Egy karakterisztika olvasási és értesítési mérőszámai"""
+
+    def __init__(self, uuid):
+        self.uuid = uuid
+        self.read_latency = None
+        self.read_error = None
+        self.notifications = 0
+        self.first_notification = None
+        self.last_notification = None
+
+    def notification_rate(self, now=None):
+        """Értesítések másodpercenként a feliratkozás óta"""
+        if not self.notifications or self.first_notification is None:
+            return 0.0
+        elapsed = (now or time.monotonic()) - self.first_notification
+        return self.notifications / elapsed if elapsed > 0 else 0.0
+
+
+class GattEngine:
+    """GATT adatmotor egy BLE kapcsolathoz
+
+    A karakterisztikákat handle alapján éri el, így a gyorsítótárból kapott
+    GATT tábla esetén nincs szükség újabb szolgáltatás-felderítésre.
+    """
+
+    def __init__(self, client, gatt_table=None, max_concurrent_reads=4, ring_slots=1024,
+                 batch_size=32, batch_interval=0.05):
+        self.client = client
+        self.address = getattr(client, 'address', None)
+        self.gatt_table = gatt_table
+        self.max_concurrent_reads = max_concurrent_reads
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.ring = NotificationRing(ring_slots)
+        self.stats = {}
+        self._subscribed = []
+        self._ready = asyncio.Event()
+
+    async def load(self):
+        """GATT tábla betöltése a kapcsolatból, ha nem kaptunk gyorsítótárból"""
+        if self.gatt_table is None:
+            services = getattr(self.client, 'services', None)
+            if not services:
+                services = await self.client.get_services()
+            self.gatt_table = serialize_gatt_services(services)
+        if not self.stats:
+            # Csak az első betöltéskor (a read_all és a subscribe is betölt)
+            capture.gatt_table(self.address, self.gatt_table)
+        for service in self.gatt_table:
+            for char in service['characteristics']:
+                self.stats.setdefault(char['handle'], CharacteristicStats(char['uuid']))
+        return self.gatt_table
+
+    def characteristics(self, *properties):
+        """A megadott tulajdonságok valamelyikével rendelkező karakterisztikák"""
+        return [char for service in self.gatt_table for char in service['characteristics']
+                if any(p in char['properties'] for p in properties)]
+
+    async def read_all(self):
+        """Minden olvasható karakterisztika párhuzamos olvasása
+
+        Az eredmény handle -> {'uuid', 'value', 'latency', 'error'} szótár.
+        """
+        await self.load()
+        semaphore = asyncio.Semaphore(self.max_concurrent_reads)
+
+        async def read_one(char):
+            stats = self.stats[char['handle']]
+            async with semaphore:
+                start_time = time.monotonic()
+                try:
+                    value = await self.client.read_gatt_char(char['handle'])
+                    error = None
+                    capture.gatt_read(self.address, char['handle'], value)
+                except Exception as e:
+                    value, error = None, str(e)
+                stats.read_latency = time.monotonic() - start_time
+                stats.read_error = error
+                return char['handle'], {'uuid': char['uuid'], 'value': value,
+                                        'latency': stats.read_latency, 'error': error}
+
+        results = await asyncio.gather(*(read_one(char) for char in self.characteristics('read')))
+        return dict(results)
+
+    async def subscribe(self):
+        """Feliratkozás minden notify/indicate karakterisztikára"""
+        await self.load()
+        for char in self.characteristics('notify', 'indicate'):
+            try:
+                await self.client.start_notify(char['handle'], self._on_notification)
+                self._subscribed.append(char['handle'])
+            except Exception as e:
+                print(f"Nem sikerült feliratkozni ({char['uuid']}): {str(e)}")
+        return list(self._subscribed)
+
+    async def unsubscribe(self):
+        for handle in self._subscribed:
+            try:
+                await self.client.stop_notify(handle)
+            except Exception:
+                pass
+        self._subscribed = []
+        self._ready.set()
+
+    def _on_notification(self, sender, data):
+        handle = sender.handle if hasattr(sender, 'handle') else int(sender)
+        now = time.monotonic()
+        self.ring.push(handle, data, now)
+        capture.gatt_notify(self.address, handle, data)
+        stats = self.stats.get(handle)
+        if stats is not None:
+            stats.notifications += 1
+            if stats.first_notification is None:
+                stats.first_notification = now
+            stats.last_notification = now
+        if len(self.ring) >= self.batch_size:
+            self._ready.set()
+
+    async def notifications(self):
+        """Aszinkron iterátor: (handle, időbélyeg, memoryview) kötegek
+
+        Egy köteg akkor érkezik, ha batch_size értesítés összegyűlt vagy letelt
+        batch_interval; a leiratkozás után az iteráció véget ér.
+        """
+        while self._subscribed or len(self.ring):
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.batch_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._ready.clear()
+            while len(self.ring):
+                yield self.ring.pop_batch(self.batch_size)
+
+    def report(self):
+        """Karakterisztikánkénti mérőszámok (késleltetés, értesítési gyakoriság)"""
+        now = time.monotonic()
+        return {handle: {
+            'uuid': stats.uuid,
+            'read_latency': stats.read_latency,
+            'read_error': stats.read_error,
+            'notifications': stats.notifications,
+            'notification_rate': stats.notification_rate(now)
+        } for handle, stats in self.stats.items()}
@@ -0,0 +1,237 @@
+"""Aszinkron, szeletelt és inkrementális hosztszkennelés
+
+A porttartományt szeletekre bontja, a szeletek párhuzamosan futnak (nmap
+háttér esetén külön folyamatokban), és minden nyitott port azonnal
+továbbításra kerül. Az eredmények hosztonként gyorsítótárba kerülnek, így
+egy ismételt szkennelés csak a lejárt vagy korábban nyitott portokat nézi
+újra. A 'connect' háttér egyszerű TCP kapcsolódással dolgozik, így egy
+helyi csonk TCP szerverrel is kipróbálható.
+"""
+import asyncio
+import re
+import shutil
+import time
+
+_DISCOVERED_RE = re.compile(r"Discovered open port (\d+)/tcp on ")
+_PORT_LINE_RE = re.compile(r"^(\d+)/tcp\s+open\s+(\S+)\s*(.*)$")
+
+
+def parse_ports(ports):
+    """Porttartomány értelmezése: '1-1024,8080' szöveg vagy egészek sorozata"""
+    if not isinstance(ports, str):
+        return sorted(set(int(p) for p in ports))
+    result = set()
+    for part in ports.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            result.update(range(int(first), int(last) + 1))
+        else:
+            result.add(int(part))
+    return sorted(result)
+
+
+def split_shards(ports, shards):
+    """Portok szétosztása shards darab szeletre (váltakozva, hogy a gyakori alacsony portok eloszoljanak)"""
+    shards = max(1, min(shards, len(ports)))
+    return [ports[i::shards] for i in range(shards)]
+
+
+class PortCache:
+    """Hosztonkénti port állapot gyorsítótár
+
+    A zárt portok a TTL lejártáig kimaradnak az újraszkennelésből; a nyitott
+    portokat mindig újraellenőrizzük, mert ezek változása a fontos.
+    """
+
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self._hosts = {}
+
+    def record(self, host, port, state, service=None, version=None):
+        self._hosts.setdefault(host, {})[port] = {
+            'state': state, 'service': service, 'version': version, 'checked': time.monotonic()
+        }
+
+    def open_ports(self, host):
+        entries = self._hosts.get(host, {})
+        return sorted(p for p, e in entries.items() if e['state'] == 'open')
+
+    def entry(self, host, port):
+        return self._hosts.get(host, {}).get(port)
+
+    def ports_to_scan(self, host, ports):
+        """A ténylegesen ellenőrizendő portok: új, lejárt vagy korábban nyitott"""
+        entries = self._hosts.get(host, {})
+        now = time.monotonic()
+        return [p for p in ports
+                if p not in entries or entries[p]['state'] == 'open' or now - entries[p]['checked'] > self.ttl]
+
+    def invalidate(self, host=None):
+        if host is None:
+            self._hosts.clear()
+        else:
+            self._hosts.pop(host, None)
+
+
+class HostScanner:
+    """Szeletelt, párhuzamos port szkenner folyamatos eredménytovábbítással
+
+    backend='nmap': szeletenként egy 'nmap -v' folyamat, a "Discovered open port"
+    sorok azonnal továbbítódnak; backend='connect': aszinkron TCP kapcsolódás.
+    """
+
+    def __init__(self, backend='auto', shards=4, connect_timeout=1.0, connect_concurrency=64,
+                 nmap_arguments='-sS -sV --version-intensity 5', cache_ttl=300.0):
+        if backend == 'auto':
+            backend = 'nmap' if shutil.which('nmap') else 'connect'
+        self.backend = backend
+        self.shards = shards
+        self.connect_timeout = connect_timeout
+        self.connect_concurrency = connect_concurrency
+        self.nmap_arguments = nmap_arguments
+        self.cache = PortCache(cache_ttl)
+
+    async def scan(self, host, ports=range(1, 1025), deadline=None):
+        """Aszinkron generátor: minden nyitott portot azonnal visszaad, amint kiderül"""
+        summary = {}
+        async for item in self._scan(host, ports, deadline, summary):
+            yield item
+
+    async def scan_all(self, host, ports=range(1, 1025), deadline=None, on_port=None):
+        """Teljes szkennelés; határidő esetén részleges eredménnyel tér vissza"""
+        start_time = time.monotonic()
+        summary = {}
+        open_ports = {}
+        notified = set()
+        async for item in self._scan(host, ports, deadline, summary):
+            # A később érkező (pl. verzióval kiegészített) adat felülírja a korábbit
+            open_ports[item['port']] = item
+            # Az nmap ugyanazt a portot a "Discovered" és a táblázat sorban is jelenti; egyszer értesítünk
+            key = (host, item['port'])
+            if on_port is not None and key not in notified:
+                notified.add(key)
+                on_port(item)
+        return {
+            'host': host,
+            'open_ports': [open_ports[port] for port in sorted(open_ports)],
+            'complete': summary.get('complete', False),
+            'scanned': summary.get('scanned', 0),
+            'skipped': summary.get('skipped', 0),
+            'errors': summary.get('errors', []),
+            'elapsed': time.monotonic() - start_time
+        }
+
+    async def _scan(self, host, ports, deadline, summary):
+        all_ports = parse_ports(ports)
+        to_scan = self.cache.ports_to_scan(host, all_ports)
+        errors = []
+        summary.update({'scanned': len(to_scan), 'skipped': len(all_ports) - len(to_scan),
+                        'complete': False, 'errors': errors})
+
+        queue = asyncio.Queue()
+        shard_tasks = [asyncio.ensure_future(self._run_shard(host, shard, queue, errors))
+                       for shard in split_shards(to_scan, self.shards) if shard]
+        end_time = None if deadline is None else time.monotonic() + deadline
+        pending = len(shard_tasks)
+        try:
+            while pending:
+                timeout = None if end_time is None else end_time - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    pending -= 1
+                    continue
+                yield item
+            # Hibás szelet esetén az eredmény nem teljes, a portjai ismeretlenek maradnak
+            summary['complete'] = pending == 0 and not errors
+        finally:
+            for task in shard_tasks:
+                task.cancel()
+            await asyncio.gather(*shard_tasks, return_exceptions=True)
+
+    async def _run_shard(self, host, ports, queue, errors):
+        try:
+            if self.backend == 'nmap':
+                await self._nmap_shard(host, ports, queue)
+            else:
+                await self._connect_shard(host, ports, queue)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            errors.append(str(e))
+            print(f"Hiba a szkennelési szelet futtatása közben: {str(e)}")
+        finally:
+            queue.put_nowait(None)
+
+    async def _connect_shard(self, host, ports, queue):
+        semaphore = asyncio.Semaphore(self.connect_concurrency)
+
+        async def probe(port):
+            async with semaphore:
+                try:
+                    _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.connect_timeout)
+                except (OSError, asyncio.TimeoutError):
+                    self.cache.record(host, port, 'closed')
+                    return
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    pass
+                self.cache.record(host, port, 'open')
+                queue.put_nowait({'port': port, 'service': None, 'version': None})
+
+        await asyncio.gather(*(probe(port) for port in ports))
+
+    async def _nmap_shard(self, host, ports, queue):
+        port_list = ','.join(str(p) for p in ports)
+        process = await asyncio.create_subprocess_exec(
+            'nmap', '-v', '-Pn', *self.nmap_arguments.split(), '-p', port_list, host,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        # A stderr-t párhuzamosan olvassuk, hogy a teli cső ne akassza meg az nmap-et
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        reported = set()
+        try:
+            async for raw_line in process.stdout:
+                line = raw_line.decode('utf-8', 'replace').strip()
+                match = _DISCOVERED_RE.match(line)
+                if match:
+                    port = int(match.group(1))
+                    if port not in reported:
+                        reported.add(port)
+                        self.cache.record(host, port, 'open')
+                        queue.put_nowait({'port': port, 'service': None, 'version': None})
+                    continue
+                # A -sV eredménytáblája a szelet végén érkezik, a szolgáltatás adatokat ebből pótoljuk
+                match = _PORT_LINE_RE.match(line)
+                if match:
+                    port = int(match.group(1))
+                    service, version = match.group(2), match.group(3) or None
+                    self.cache.record(host, port, 'open', service, version)
+                    item = {'port': port, 'service': service, 'version': version}
+                    if port in reported:
+                        item['update'] = True
+                    reported.add(port)
+                    queue.put_nowait(item)
+            await process.wait()
+            stderr = await stderr_task
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            stderr_task.cancel()
+        if process.returncode != 0:
+            # Pl. jogosultság nélküli -sS futás: a portokról nem tudunk semmit, gyorsítótárba sem kerülnek
+            message = stderr.decode('utf-8', 'replace').strip().splitlines()
+            detail = message[-1] if message else 'nincs hibaüzenet'
+            raise RuntimeError(f"az nmap {process.returncode} kóddal lépett ki: {detail}")
+        for port in ports:
+            if port not in reported:
+                self.cache.record(host, port, 'closed')
@@ -1,241 +1,149 @@
-from bleak import BleakScanner, BleakClient
+import argparse
 import asyncio
+import contextlib
+import functools
+import json
 import logging
 import platform
+import signal
 import socket
-import bluetooth  # Klasszikus Bluetooth támogatáshoz
 import subprocess
-import re
+import sys
+import threading
 import time
-import netifaces  # pip install netifaces
-import nmap  # pip install python-nmap
-import lightblue
+# A külső hátterek (bleak, PyBluez, lightblue, nmap) első használatkor töltődnek be
+from bluetooth_backends import bleak, bluetooth, nmap, registry, print_capabilities
+from bluetooth_cache import DeviceCache, DEFAULT_CACHE_PATH, normalize_address, serialize_gatt_services
+from bluetooth_sessions import BleSessionManager
+from bluetooth_rssi import RssiMonitor, run_passive_monitor, measure_rssi
+from network_monitor import NetworkSnapshotCollector, monitor_link, select_sampler
+from host_scanner import HostScanner
+from rfcomm_stream import FRAMINGS, RfcommStream, make_framing
+from gatt_engine import GattEngine
+from bluetooth_metrics import metrics, format_operation
+from device_registry import DeviceRegistry
+from advertisement import AdvertisementPipeline, format_advertisement
+from traffic_log import capture, install_replay
+from bluetooth_adapters import default_adapters, parse_roles
+from presence import PresenceDaemon, PresenceSocketServer, PresenceTracker, read_watchlist
+from bluetooth_transports import (BLE, CLASSIC, DISCOVER, CONNECT, SERVICES, default_transports, is_valid_address,
+                                  print_transports, resolve_rfcomm_channel, ble_connect_with_retry,
+                                  close_future_socket)
 
 logging.basicConfig(level=logging.DEBUG)
 
-def lightblue_connect(address):
-    try:
-        print(f"\nLightblue kapcsolódás megkezdése: {address}")
-        
-        # MAC cím formátum ellenőrzése
-        if not re.match(r"^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$", address):
-            print("Érvénytelen MAC cím formátum!")
-            return None
-            
-        # Bluetooth adapter ellenőrzése
-        try:
-            lightblue.finddevices()
-        except lightblue.BluetoothError:
-            print("Nem található aktív Bluetooth adapter!")
-            return None
-            
-        print("Szolgáltatások keresése...")
-        services = lightblue.findservices(address)
-        
-        if not services:
-            print("Nem található szolgáltatás az eszközön!")
-            return None
-            
-        try:
-            # Kapcsolódás az első szolgáltatáshoz
-            socket = lightblue.socket()
-            socket.settimeout(15)  # 15 másodperces timeout
-            socket.connect((address, services[0][0]))
-            print(f"Lightblue kapcsolat létrejött a {services[0][0]} porton!")
-            return socket
-            
-        except lightblue.BluetoothError as be:
-            print(f"Lightblue kapcsolódási hiba: {str(be)}")
-            print("\nKérem ellenőrizze:")
-            print("1. Az eszköz be van kapcsolva")
-            print("2. Az eszköz párosítási módban van")
-            print("3. A Bluetooth adapter be van kapcsolva")
-            print("4. A MAC cím helyes")
-            
-            return None
-
+# Hálózati pillanatkép gyorsítótár, gyakori lekérdezéshez
+network_snapshots = NetworkSnapshotCollector(ttl=5.0)
 
+def get_android_hotspot_info(force=False):
+    """Hotspot/hálózati információk (SSID, jelerősség, IP, átjáró, DNS) lekérése
 
-def classic_bluetooth_connect(address):
+    Az eredmény rövid ideig gyorsítótárazott; force=True friss lekérdezést kér.
+    """
     try:
-        print(f"\nKlasszikus Bluetooth kapcsolódás megkezdése: {address}")
+        snapshot = network_snapshots.snapshot(force=force)
         
-        # MAC cím formátum ellenőrzése
-        if not re.match(r"^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$", address):
-            print("Érvénytelen MAC cím formátum!")
-            return None
-            
-        # Bluetooth adapter ellenőrzése
-        try:
-            socket = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
-        except bluetooth.BluetoothError:
-            print("Nem található aktív Bluetooth adapter!")
-            return None
-            
-        print("Elérhető portok keresése...")
-        available_ports = []
-        for port in range(1, 30):
-            try:
-                test_socket = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
-                test_socket.connect((address, port))
-                available_ports.append(port)
-                test_socket.close()
-            except:
-                continue
-                
-        if not available_ports:
-            print("Nem található elérhető port az eszközön!")
-            return None
-            
-        try:
-            # Kapcsolódás az első elérhető porton
-            socket = bluetooth.BluetoothSocket(bluetooth.RFCOMM)
-            socket.settimeout(15)  # 15 másodperces timeout
-            socket.connect((address, available_ports[0]))
-            print(f"Klasszikus Bluetooth kapcsolat létrejött a {available_ports[0]} porton!")
-            return socket
-            
-        except bluetooth.btcommon.BluetoothError as be:
-            print(f"Bluetooth kapcsolódási hiba: {str(be)}")
-            print("\nKérem ellenőrizze:")
-            print("1. Az eszköz be van kapcsolva")
-            print("2. Az eszköz párosítási módban van")
-            print("3. A Bluetooth adapter be van kapcsolva")
-            print("4. A MAC cím helyes")
-            return None
-            
-    except Exception as e:
-        print(f"Váratlan hiba történt: {str(e)}")
-        print(f"Hiba típusa: {type(e).__name__}")
-        return None
-    finally:
-        try:
-            if 'test_socket' in locals():
-                test_socket.close()
-        except:
-            pass
-
-async def ble_connect_with_retry(address, max_attempts=3):
-    for attempt in range(max_attempts):
-        try:
-            print(f"\nBLE Csatlakozási kísérlet {attempt + 1}/{max_attempts}")
-            client = BleakClient(address, timeout=10.0)
-            await client.connect(timeout=10.0)
-            return client
-        except Exception as e:
-            print(f"BLE Kísérlet {attempt + 1} sikertelen: {str(e)}")
-            if attempt < max_attempts - 1:
-                print("Újrapróbálkozás 5 másodperc múlva...")
-                await asyncio.sleep(5)
-    return None
-
-def get_android_hotspot_info():
-    try:
-        # Windows esetén
-        if platform.system() == "Windows":
-            result = subprocess.check_output(["netsh", "wlan", "show", "interfaces"], encoding='utf-8')
-            
-            # Részletes információk gyűjtése
-            connection_info = {
-                'ssid': None,
-                'signal': None,
-                'ip': None,
-                'gateway': None,
-                'dns': None,
-                'frequency': None,
-                'tx_rate': None,
-                'rx_rate': None
-            }
-            
-            # SSID és jelerősség kinyerése
-            for line in result.split('\n'):
-                if "SSID" in line and "BSSID" not in line:
-                    connection_info['ssid'] = line.split(":")[1].strip()
-                elif "Signal" in line:
-                    signal_str = line.split(":")[1].strip().rstrip('%')
-                    connection_info['signal'] = int(signal_str) if signal_str.isdigit() else None
-                elif "Receive rate" in line:
-                    connection_info['rx_rate'] = line.split(":")[1].strip()
-                elif "Transmit rate" in line:
-                    connection_info['tx_rate'] = line.split(":")[1].strip()
-
-            # IP információk beszerzése
-            for iface in netifaces.interfaces():
-                addrs = netifaces.ifaddresses(iface)
-                if netifaces.AF_INET in addrs:  # Ha van IPv4 cím
-                    for addr in addrs[netifaces.AF_INET]:
-                        if 'addr' in addr and addr['addr'] != '127.0.0.1':
-                            connection_info['ip'] = addr['addr']
-                            
-            # Gateway információ
-            gws = netifaces.gateways()
-            if 'default' in gws and netifaces.AF_INET in gws['default']:
-                connection_info['gateway'] = gws['default'][netifaces.AF_INET][0]
-
-            # DNS szerverek lekérése
-            try:
-                dns_output = subprocess.check_output(["ipconfig", "/all"], encoding='utf-8')
-                dns_servers = []
-                for line in dns_output.split('\n'):
-                    if "DNS Servers" in line:
-                        dns_line = next((l for l in dns_output.split('\n')[dns_output.split('\n').index(line)+1:] if l.strip()), '')
-                        if dns_line.strip():
-                            dns_servers.append(dns_line.strip())
-                connection_info['dns'] = dns_servers
-            except:
-                connection_info['dns'] = ["Nem elérhető"]
-
-            return connection_info
+        # Részletes információk gyűjtése
+        connection_info = {
+            'ssid': snapshot.get('ssid'),
+            'signal': snapshot.get('signal'),
+            'ip': snapshot.get('ip'),
+            'gateway': snapshot.get('gateway'),
+            'dns': snapshot.get('dns'),
+            'frequency': snapshot.get('frequency'),
+            'radio_type': snapshot.get('radio_type'),
+            'channel': snapshot.get('channel'),
+            'tx_rate': snapshot.get('tx_rate'),
+            'rx_rate': snapshot.get('rx_rate')
+        }
+        return connection_info
     except Exception as e:
         print(f"Hiba az Android hotspot információk lekérése közben: {str(e)}")
         return None
 
-def monitor_connection_quality(duration=5):
-    """Kapcsolat minőségének monitorozása megadott időtartamon keresztül"""
-    print(f"\nKapcsolat minőségének mérése ({duration} másodperc)...")
-    measurements = []
+def monitor_connection_quality(duration=5, rate=1.0, callback=None, sampler=None):
+    """Kapcsolat minőségének monitorozása megadott időtartamon keresztül
+
+    A mintavevő háttér Linuxon a /proc/net/wireless fájl, Windowson a netsh.
+    callback(minta, stats) minden mintánál meghívódik (élő kijelzéshez).
+    """
+    print(f"\nKapcsolat minőségének mérése ({duration} másodperc, {rate} minta/s)...")
     
     try:
-        start_time = time.time()
-        while time.time() - start_time < duration:
-            result = subprocess.check_output(["netsh", "wlan", "show", "interfaces"], encoding='utf-8')
-            for line in result.split('\n'):
-                if "Signal" in line:
-                    signal_str = line.split(":")[1].strip().rstrip('%')
-                    if signal_str.isdigit():
-                        measurements.append(int(signal_str))
-            time.sleep(1)
+        if sampler is None:
+            sampler = select_sampler()
+        if sampler is None:
+            print("Nincs elérhető Wi-Fi mintavevő ezen a rendszeren")
+            return None
+        try:
+            stats = monitor_link(sampler, rate=rate, duration=duration, callback=callback)
+        finally:
+            sampler.close()
         
-        if measurements:
-            avg_signal = sum(measurements) / len(measurements)
-            min_signal = min(measurements)
-            max_signal = max(measurements)
-            
+        if stats.count:
             print("\nKapcsolat minőség statisztika:")
-            print(f"  Átlagos jelerősség: {avg_signal:.1f}%")
-            print(f"  Minimum jelerősség: {min_signal}%")
-            print(f"  Maximum jelerősség: {max_signal}%")
-            print(f"  Jelerősség ingadozás: {max_signal - min_signal}%")
+            print(f"  Átlagos jelerősség: {stats.mean:.1f}%")
+            print(f"  Minimum jelerősség: {stats.min:.0f}%")
+            print(f"  Maximum jelerősség: {stats.max:.0f}%")
+            print(f"  Jelerősség ingadozás: {stats.max - stats.min:.0f}%")
+            print(f"  Jitter: {stats.jitter:.1f}%, szórás: {stats.stddev:.1f}%")
+            print(f"  Percentilisek: p10={stats.percentile(0.1)}%, p50={stats.percentile(0.5)}%, "
+                  f"p90={stats.percentile(0.9)}%")
             
             # Kapcsolat minőségének értékelése
-            if avg_signal >= 80:
+            if stats.mean >= 80:
                 print("  Minősítés: Kiváló kapcsolat")
-            elif avg_signal >= 60:
+            elif stats.mean >= 60:
                 print("  Minősítés: Jó kapcsolat")
-            elif avg_signal >= 40:
+            elif stats.mean >= 40:
                 print("  Minősítés: Közepes kapcsolat")
             else:
                 print("  Minősítés: Gyenge kapcsolat")
+        return stats
     except Exception as e:
         print(f"Hiba a kapcsolat monitorozása közben: {str(e)}")
+        return None
+
+# Hosztonként gyorsítótárazott port szkenner, az ismételt szkennelés csak a változásokat nézi
+host_scanner = HostScanner()
+
+def get_host_details(target_ip):
+    """Hoszt állapot, MAC, gyártó és operációs rendszer lekérése nmap-pel (blokkoló)"""
+    if not registry.available('nmap'):
+        # A portszkennelés nmap modul nélkül is működik, csak a hoszt részletek maradnak el
+        return None
+    nm = nmap.PortScanner()
+    
+    # Alapvető szkennelés az eszközön
+    nm.scan(hosts=target_ip, arguments='-sn')
+    if target_ip not in nm.all_hosts():
+        return None
+    host = nm[target_ip]
+    details = {
+        'hostname': host.hostname() or 'Ismeretlen',
+        'mac': host['addresses'].get('mac', 'Ismeretlen') if 'addresses' in host else 'Ismeretlen',
+        'status': host.get('status', {}).get('state', 'Ismeretlen')
+    }
+    details['vendor'] = host.get('vendor', {}).get(details['mac'], 'Ismeretlen')
+    
+    # Operációs rendszer felismerés, portszkennelés nélkül
+    try:
+        nm.scan(target_ip, arguments='-O --osscan-limit -p 22,80,443')
+        details['os'] = nm[target_ip].get('osmatch', [{'name': 'Ismeretlen'}])[0]['name']
+    except Exception:
+        details['os'] = 'Ismeretlen'
+    return details
+
+async def get_connected_device_info(target_ip, ports='1-1024', deadline=120.0, scanner=None):
+    """Kapcsolódott eszköz adatai: a portszkennelés szeletekben, párhuzamosan fut
 
-def get_connected_device_info(target_ip):
+    A nyitott portok azonnal kiíródnak; a határidő lejártakor a részleges eredmény is visszajön.
+    """
     try:
-        print("\nKapcsolódott eszköz inform��cióinak lekérése...")
-        nm = nmap.PortScanner()
-        
-        # Alapvető szkennelés az eszközön
-        nm.scan(hosts=target_ip, arguments='-sn')
+        print("\nKapcsolódott eszköz információinak lekérése...")
+        scanner = scanner or host_scanner
+        loop = asyncio.get_running_loop()
+        start_time = time.monotonic()
         
         device_info = {
             'ip': target_ip,
@@ -243,31 +151,39 @@ def get_connected_device_info(target_ip):
             'mac': None,
             'vendor': None,
             'open_ports': [],
-            'status': None
+            'status': None,
+            'complete': False
         }
 
-        if target_ip in nm.all_hosts():
-            host = nm[target_ip]
-            
-            # Részletes szkennelés
-            nm.scan(target_ip, arguments='-sS -sV -O --version-intensity 5')
-            
-            device_info.update({
-                'hostname': nm[target_ip].hostname() if 'hostname' in dir(nm[target_ip]) else 'Ismeretlen',
-                'mac': host['addresses'].get('mac', 'Ismeretlen') if 'addresses' in host else 'Ismeretlen',
-                'vendor': host.get('vendor', {}).get(device_info['mac'], 'Ismeretlen'),
-                'status': host.get('status', {}).get('state', 'Ismeretlen'),
-                'os': nm[target_ip].get('osmatch', [{'name': 'Ismeretlen'}])[0]['name']
-            })
-
-            # Nyitott portok ellenőrzése
-            if 'tcp' in nm[target_ip]:
-                for port, port_info in nm[target_ip]['tcp'].items():
-                    if port_info['state'] == 'open':
-                        service_info = f"Port {port} ({port_info.get('name', 'ismeretlen')})"
-                        if port_info.get('version'):
-                            service_info += f" - Verzió: {port_info['version']}"
-                        device_info['open_ports'].append(service_info)
+        # A hoszt adatok lekérése a portszkenneléssel párhuzamosan fut
+        details_future = loop.run_in_executor(None, get_host_details, target_ip)
+
+        def on_port(item):
+            service = f" ({item['service']})" if item['service'] else ""
+            print(f"  Nyitott port: {item['port']}{service}")
+
+        result = await scanner.scan_all(target_ip, ports, deadline=deadline, on_port=on_port)
+
+        # Nyitott portok összesítése
+        for item in result['open_ports']:
+            service_info = f"Port {item['port']} ({item['service'] or 'ismeretlen'})"
+            if item.get('version'):
+                service_info += f" - Verzió: {item['version']}"
+            device_info['open_ports'].append(service_info)
+        device_info['complete'] = result['complete']
+        if result['errors']:
+            print("A szkennelés egyes szeletei hibával zárultak, részleges eredmény")
+        elif not result['complete']:
+            print("A szkennelés határideje lejárt, részleges eredmény")
+        print(f"Ellenőrzött portok: {result['scanned']}, gyorsítótárból: {result['skipped']}")
+
+        remaining = max(0.0, deadline - (time.monotonic() - start_time))
+        try:
+            details = await asyncio.wait_for(details_future, remaining)
+            if details:
+                device_info.update(details)
+        except asyncio.TimeoutError:
+            print("A hoszt adatok lekérése nem fejeződött be időben")
 
         return device_info
 
@@ -275,45 +191,44 @@ def get_connected_device_info(target_ip):
         print(f"Hiba az eszköz információk lekérése közben: {str(e)}")
         return None
 
-def get_device_signal_strength(mac_address):
+async def get_device_signal_strength(mac_address, samples=5, timeout=8.0, mode='inquiry'):
+    """Valódi RSSI mérés a megadott eszközre BLE hirdetésekből vagy RSSI-s inquiry-ből"""
     try:
         print(f"\nJelerősség mérése a következő eszközhöz: {mac_address}")
         
-        # Csak eszköz keresés és RSSI mérés
-        print("Eszköz keresése és jelerősség mérése...")
-        
-        nearby_devices = bluetooth.discover_devices(
-            duration=8,  # Hosszabb keresési idő
-            lookup_names=True,
-            lookup_class=True,
-            device_id=-1,
-            flush_cache=True
-        )
+        # Csak RSSI mintavétel, a keresés leáll, amint elég minta gyűlt össze
+        print(f"RSSI minták gyűjtése ({samples} minta, legfeljebb {timeout:g} másodperc)...")
+        with metrics.span('rssi_measure', device=mac_address, mode=mode):
+            measurement = await measure_rssi(mac_address, samples=samples, timeout=timeout, mode=mode)
         
-        for addr, name, device_class in nearby_devices:
-            if addr.upper() == mac_address.upper():
-                # Eszköz osztály alapján signal becslés
-                major_class = (device_class >> 8) & 0x1F
-                minor_class = (device_class >> 2) & 0x3F
-                
-                print(f"Eszköz megtalálva: {name}")
-                print(f"Eszköz típus: {get_device_class_name(major_class)}")
-                
-                # Közelség becslése az eszköz megtalálásának gyorsasága alapján
-                signal_quality = estimate_signal_quality(device_class)
-                
-                return {
-                    'device_name': name,
-                    'device_class': get_device_class_name(major_class),
-                    'quality': signal_quality['quality'],
-                    'strength': signal_quality['strength'],
-                    'status': 'Elérhető'
-                }
+        if measurement['rssi'] is not None:
+            device_class = measurement['device_class']
+            device_type = get_device_class_name((device_class >> 8) & 0x1F) if device_class is not None else 'Ismeretlen'
+            print(f"Eszköz megtalálva: {measurement['name'] or 'Ismeretlen'}")
+            print(f"Eszköz típus: {device_type}")
+            
+            signal_quality = estimate_signal_quality(measurement['rssi'])
+            
+            return {
+                'device_name': measurement['name'] or 'Ismeretlen',
+                'device_class': device_type,
+                'rssi': measurement['rssi'],
+                'samples': measurement['samples'],
+                'confidence': measurement['confidence'],
+                'response_time': measurement['latency'],
+                'quality': signal_quality['quality'],
+                'strength': signal_quality['strength'],
+                'status': 'Elérhető'
+            }
         
         print("Eszköz nem található a közelben")
         return {
             'device_name': 'Nem található',
             'device_class': 'Ismeretlen',
+            'rssi': None,
+            'samples': 0,
+            'confidence': 0.0,
+            'response_time': measurement['latency'],
             'quality': 'Nem mérhető',
             'strength': 'Nem elérhető',
             'status': 'Nem elérhető'
@@ -339,48 +254,47 @@ def get_device_class_name(major_class):
     }
     return class_names.get(major_class, "Ismeretlen")
 
-def estimate_signal_quality(device_class):
-    """Jelerősség becslése az eszköz osztálya alapján"""
-    # Telefon és számítógép esetén általában jobb minőségű a kapcsolat
-    major_class = (device_class >> 8) & 0x1F
+def estimate_signal_quality(rssi):
+    """Jelerősség minősítése a mért (simított) RSSI alapján"""
+    # Szokásos leképezés: -100 dBm -> 0%, -50 dBm -> 100%
+    percent = max(0, min(100, round(2 * (rssi + 100))))
     
-    if major_class in [1, 2]:  # Számítógép vagy telefon
-        return {
-            'quality': 'Jó',
-            'strength': 'Erős (75-100%)'
-        }
+    if rssi >= -60:
+        return {'quality': 'Kiváló', 'strength': f'Erős ({rssi:.0f} dBm, {percent}%)'}
+    elif rssi >= -70:
+        return {'quality': 'Jó', 'strength': f'Közepes ({rssi:.0f} dBm, {percent}%)'}
+    elif rssi >= -80:
+        return {'quality': 'Megfelelő', 'strength': f'Gyenge ({rssi:.0f} dBm, {percent}%)'}
     else:
-        return {
-            'quality': 'Megfelelő',
-            'strength': 'Közepes (50-74%)'
-        }
+        return {'quality': 'Gyenge', 'strength': f'Nagyon gyenge ({rssi:.0f} dBm, {percent}%)'}
 
-def monitor_device_connection(mac_address, duration=5):
-    """Egyszerűsített eszköz elérhetőség monitorozás"""
-    print(f"\nEszköz elérhetőség monitorozása ({duration} másodperc)...")
-    detections = 0
-    total_checks = duration
-    
-    for i in range(total_checks):
-        try:
-            print(f"Ellenőrzés {i+1}/{total_checks}...", end='\r')
-            nearby_devices = bluetooth.discover_devices(
-                duration=1,
-                lookup_names=True,
-                flush_cache=True
-            )
-            
-            if any(addr.upper() == mac_address.upper() for addr, name in nearby_devices):
-                detections += 1
-                
-        except Exception as e:
-            print(f"\nHiba az ellenőrzés során: {str(e)}")
-        time.sleep(1)
-    
-    detection_rate = (detections / total_checks) * 100
+async def monitor_device_connection(mac_address, duration=5, sample_rate=1.0, mode='ble'):
+    """Passzív eszköz elérhetőség és RSSI monitorozás
+
+    mode='ble' a BLE hirdetéseket hallgatja, mode='inquiry' egyetlen hosszú,
+    RSSI-t jelentő klasszikus keresést futtat; a keresés nem indul újra mintánként.
+    """
+    print(f"\nEszköz elérhetőség monitorozása ({duration} másodperc, {sample_rate} minta/s)...")
+    monitor = RssiMonitor(window=duration, sample_rate=sample_rate, addresses=[mac_address])
+
+    def report(stats_list):
+        stats = stats_list[0]
+        rssi = f"{stats['rssi_mean']:.1f} dBm" if stats['rssi_mean'] is not None else "-"
+        print(f"Észlelés: {stats['detection_rate']:.0f}%, RSSI átlag: {rssi}, minták: {stats['samples']}", end='\r')
+
+    try:
+        await run_passive_monitor(monitor, duration, mode=mode, on_report=report)
+    except Exception as e:
+        print(f"\nHiba a monitorozás során: {str(e)}")
+
+    stats = monitor.stats(mac_address)
+    detection_rate = stats['detection_rate']
     
     print("\nEszköz elérhetőség:")
-    print(f"Sikeres észlelések: {detections}/{total_checks} ({detection_rate:.1f}%)")
+    print(f"Sikeres észlelések: {stats['detected_periods']}/{stats['periods']} ({detection_rate:.1f}%)")
+    if stats['samples']:
+        print(f"RSSI átlag: {stats['rssi_mean']:.1f} dBm, szórásnégyzet: {stats['rssi_variance']:.1f}")
+        print(f"RSSI percentilisek: p10={stats['p10']:.1f}, p50={stats['p50']:.1f}, p90={stats['p90']:.1f} dBm")
     
     if detection_rate > 80:
         print("Minősítés: Stabil elérhetőség")
@@ -388,37 +302,430 @@ def monitor_device_connection(mac_address, duration=5):
         print("Minősítés: Változó elérhetőség")
     else:
         print("Minősítés: Gyenge elérhetőség")
+    return stats
+
+async def discover_all_devices(scan_timeout=15.0, target_count=None, deadline=None, transports=('ble', 'classic'),
+                               device_registry=None, adapters=default_adapters):
+    """BLE és klasszikus eszközkeresés egyidejű futtatása, egyesített eredménnyel
+
+    A klasszikus keresés egy executor szálban fut a BLE szkenneléssel párhuzamosan, a
+    találatok azonnal a nyilvántartásba kerülnek; korai leálláskor az inquiry megszakad
+    (a függvény csak a kilépése után tér vissza, így nem verseng a rádióért a kapcsolódással).
+    Több kereső adapter esetén minden BLE adapteren fut egy szkenner, az inquiry
+    pedig külön adapteren (lásd AdapterScheduler.scan_plan).
+    A keresés korábban leáll, ha megvan target_count eszköz vagy lejár a deadline (másodperc).
+    Csak a transports-ban kért és telepített háttér töltődik be; a hiányzó kimarad.
+    A klasszikus keresést a leggyorsabb működő háttér végzi (PyBluez, különben lightblue).
+    Az észlelések a device_registry nyilvántartásba kerülnek (azonos cím egy bejegyzés),
+    az eredmény a rekordok listája az első észlelés sorrendjében.
+    """
+    use_ble = 'ble' in transports and default_transports.get('bleak').usable(DISCOVER, BLE)
+    classic_transport = default_transports.select(DISCOVER, CLASSIC) if 'classic' in transports else None
+    use_classic = classic_transport is not None
+    for kind, used in ((BLE, use_ble), (CLASSIC, use_classic)):
+        if kind in transports and not used:
+            print(f"{default_transports.unavailable_reason(DISCOVER, kind)} - a keresés nélküle folytatódik")
+    if not use_ble and not use_classic:
+        return []
+
+    loop = asyncio.get_running_loop()
+    start_time = time.monotonic()
+    devices = DeviceRegistry() if device_registry is None else device_registry
+    enough = asyncio.Event()
+
+    def check_target():
+        if target_count and len(devices) >= target_count:
+            enough.set()
+
+    def on_adverts(adverts):
+        # Csak az új vagy megváltozott hirdetések jutnak el a nyilvántartásig
+        for advert in adverts:
+            metrics.inc('bluetooth_detections_total', advert.raw_count or 1, transport='ble')
+            devices.observe_advertisement(advert)
+        check_target()
+
+    pipeline = AdvertisementPipeline(on_adverts)
+    ble_adapters, classic_adapter = adapters.scan_plan(use_ble, use_classic)
+    adverts_by_adapter = {adapter.label: 0 for adapter in ble_adapters}
+
+    def detection_callback(adapter):
+        label = adapter.label
+
+        def on_detection(device, advertisement_data):
+            adverts_by_adapter[label] += 1
+            capture.advert(device, advertisement_data)
+            pipeline.feed(device, advertisement_data)
+        return on_detection
+
+    inquiries = 0
+    classic_stop = threading.Event()
+
+    def on_inquiry(addr, name):
+        nonlocal inquiries
+        metrics.inc('bluetooth_detections_total', transport='classic')
+        capture.inquiry(addr, name)
+        devices.observe_classic(addr, name=name)
+        inquiries += 1
+        check_target()
+
+    if use_classic:
+        classic_future = loop.run_in_executor(
+            None, classic_transport.inquiry_sync, scan_timeout,
+            lambda addr, name: loop.call_soon_threadsafe(on_inquiry, addr, name), classic_stop, classic_adapter)
+    else:
+        classic_future = loop.create_future()
+        classic_future.set_result(None)
+    ble_window = asyncio.ensure_future(asyncio.sleep(scan_timeout if use_ble else 0))
+    enough_waiter = asyncio.ensure_future(enough.wait())
+
+    with metrics.span('discovery', target_count=target_count) as span:
+        scanners = {}
+        pipeline_task = None
+
+        async def stop_scanners():
+            for adapter, scanner in scanners.items():
+                await scanner.stop()
+                adapter.record_scan(time.monotonic() - start_time, adverts=adverts_by_adapter[adapter.label])
+            scanners.clear()
+
+        try:
+            for adapter in ble_adapters:
+                scanner = bleak.BleakScanner(detection_callback=detection_callback(adapter), **adapter.bleak_kwargs())
+                await scanner.start()
+                scanners[adapter] = scanner
+            pipeline_task = asyncio.ensure_future(pipeline.run()) if use_ble else None
+            while not enough.is_set() and not (ble_window.done() and classic_future.done()):
+                remaining = None if deadline is None else deadline - (time.monotonic() - start_time)
+                if remaining is not None and remaining <= 0:
+                    print("A keresés határideje lejárt, részleges eredmény")
+                    break
+                waiting = {enough_waiter} | {f for f in (ble_window, classic_future) if not f.done()}
+                done, _ = await asyncio.wait(waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if ble_window.done() and not classic_future.done() and scanners:
+                    # A BLE ablak lejárt, a szkennereket nem kell tovább futtatni
+                    await stop_scanners()
+        finally:
+            await stop_scanners()
+            if pipeline_task is not None:
+                pipeline_task.cancel()
+                await asyncio.gather(pipeline_task, return_exceptions=True)
+            ble_window.cancel()
+            enough_waiter.cancel()
+            if use_classic:
+                # Az inquiry leállítása és megvárása: utána a rádió szabad a kapcsolódáshoz
+                classic_stop.set()
+                try:
+                    await classic_future
+                except Exception as e:
+                    print(f"Hiba a klasszikus keresés során: {str(e)}")
+                classic_adapter.record_scan(time.monotonic() - start_time, inquiries=inquiries)
+        span.set_label('devices', len(devices))
+        span.set_label('adverts', pipeline.received)
+
+    counts = devices.counts()
+    print(f"Keresés befejezve: {counts['ble']} BLE, {counts['classic']} klasszikus eszköz "
+          f"({time.monotonic() - start_time:.1f} s)")
+    return devices.devices()
+
+async def ainput(prompt):
+    """input() az eseményhurok blokkolása nélkül"""
+    return await asyncio.get_running_loop().run_in_executor(None, input, prompt)
+
+async def receive_messages(stream, inbox):
+    """Háttérben fogadja az eszköz üzeneteit, amíg a felhasználó parancsot ír be"""
+    try:
+        while True:
+            frame = await stream.recv_frame()
+            if frame is None:
+                print("\nA távoli eszköz lezárta a kapcsolatot.")
+                break
+            inbox.put_nowait(frame)
+            print(f"\n(Új üzenet érkezett, {inbox.qsize()} olvasatlan - 'receive' paranccsal olvasható)")
+    except OSError as e:
+        print(f"\nHiba az üzenet fogadása közben: {str(e)}")
+
+BATCH_STEPS = ('discover', 'signal', 'connect', 'services')
+
+def read_batch_targets(source):
+    """Célcímek beolvasása fájlból vagy '-' esetén a standard bemenetről
+
+    Soronként egy cím, opcionálisan utána a típus (ble/classic); a '#' utáni rész megjegyzés.
+    """
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    targets = {}
+    try:
+        for line_number, line in enumerate(stream, 1):
+            fields = line.split('#', 1)[0].replace(',', ' ').split()
+            if not fields:
+                continue
+            address = fields[0]
+            if not is_valid_address(address):
+                print(f"Érvénytelen MAC cím a {line_number}. sorban: {address}", file=sys.stderr)
+                continue
+            transport = fields[1].lower() if len(fields) > 1 else None
+            if transport not in (None, 'ble', 'classic'):
+                print(f"Ismeretlen típus a {line_number}. sorban: {fields[1]}", file=sys.stderr)
+                transport = None
+            targets[normalize_address(address)] = transport
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return targets
+
+async def survey_signal(targets, duration, transports, adapters=default_adapters):
+    """Közös passzív RSSI mintavétel minden célra egyszerre (BLE hirdetések és RSSI-s inquiry)"""
+    monitor = RssiMonitor(window=duration, sample_rate=1.0, addresses=list(targets))
+    ble_adapters, classic_adapter = adapters.scan_plan('ble' in transports and registry.available('bleak'),
+                                                       'classic' in transports and registry.available('bluetooth'))
+    sources = [run_passive_monitor(monitor, duration, mode='ble', adapter=adapter) for adapter in ble_adapters]
+    if classic_adapter is not None:
+        sources.append(run_passive_monitor(monitor, duration, mode='inquiry', adapter=classic_adapter))
+    results = await asyncio.gather(*sources, return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"Hiba a jelerősség mérése közben: {str(result)}")
+    return {address: monitor.stats(address) for address in targets}
+
+async def probe_ble_device(sessions, address, cache=None):
+    """BLE kapcsolódás és GATT szolgáltatás lista"""
+    start_time = time.monotonic()
+    async with sessions.session(address) as client:
+        connect_seconds = time.monotonic() - start_time
+        gatt_table = cache.get(address, 'gatt_services') if cache else None
+        if gatt_table is None:
+            with metrics.span('gatt_discovery', device=address):
+                gatt_table = serialize_gatt_services(await client.get_services())
+            if cache is not None:
+                cache.update(address, gatt_services=gatt_table)
+    services = [{'uuid': service['uuid'], 'characteristics': len(service['characteristics'])}
+                for service in gatt_table]
+    return connect_seconds, services
+
+async def probe_classic_device(address, cache=None, with_services=True, adapters=default_adapters):
+    """Klasszikus kapcsolódás és SDP szolgáltatás lista (a blokkoló hívások executorban futnak)"""
+    transport = default_transports.select(CONNECT, CLASSIC)
+    if transport is None:
+        raise ConnectionError(default_transports.unavailable_reason(CONNECT, CLASSIC))
+    start_time = time.monotonic()
+    adapter = await adapters.acquire(address)
+    future = asyncio.ensure_future(transport.connect(address, cache=cache, adapter=adapter))
+    try:
+        sock = await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # Időtúllépés esetén a később mégis létrejövő kapcsolatot lezárjuk
+        future.add_done_callback(close_future_socket)
+        future.add_done_callback(lambda f: adapters.release(adapter))
+        raise
+    except Exception:
+        adapters.release(adapter)
+        raise
+    if not sock:
+        adapters.release(adapter)
+        return None, None
+    connect_seconds = time.monotonic() - start_time
+    sock.close()
+    adapters.release(adapter)
+    if not with_services:
+        return connect_seconds, None
+    transport = default_transports.select(SERVICES, CLASSIC)
+    if transport is None:
+        print(default_transports.unavailable_reason(SERVICES, CLASSIC))
+        return connect_seconds, None
+    records = await transport.services(address, cache)
+    services = [{'name': record.get('name'), 'protocol': record.get('protocol'), 'port': record.get('port')}
+                for record in records or []]
+    return connect_seconds, services
+
+async def run_batch(targets, output, steps=BATCH_STEPS, concurrency=None, device_timeout=30.0,
+                    scan_timeout=10.0, signal_duration=5.0, cache=None, adapters=default_adapters):
+    """Nem interaktív felmérés: eszközönként egy JSON sor, amint az eszköz elkészült, végül összesítés
+
+    A párhuzamosság alapértéke az összes kapcsolódó adapter kapcsolódási helyeinek száma.
+    """
+    start_time = time.monotonic()
+    concurrency = concurrency or adapters.capacity()
+    seen = {}
+    if 'discover' in steps:
+        try:
+            for record in await discover_all_devices(scan_timeout, adapters=adapters):
+                if record.address in targets:
+                    seen[record.address] = record
+        except Exception as e:
+            print(f"Hiba a keresés során: {str(e)}")
+
+    def transport_of(address):
+        # A megadott típus az elsődleges, különben a keresés eredménye dönt
+        if targets[address]:
+            return targets[address]
+        if address in seen:
+            return 'ble' if seen[address].is_ble else 'classic'
+        return None
+
+    signal = {}
+    if 'signal' in steps:
+        known = {transport_of(address) for address in targets}
+        signal_transports = ('ble', 'classic') if None in known else tuple(known)
+        signal = await survey_signal(targets, signal_duration, signal_transports, adapters)
+
+    summary = {'type': 'summary', 'devices': len(targets), 'seen': 0, 'connected': 0,
+               'failed': 0, 'timeouts': 0, 'skipped': 0}
+    semaphore = asyncio.Semaphore(concurrency)
+    connect = functools.partial(ble_connect_with_retry, max_attempts=2)
+
+    async def probe(sessions, address):
+        record = {'type': 'device', 'address': address, 'transport': transport_of(address),
+                  'name': seen[address].name if address in seen else None,
+                  'seen': address in seen, 'status': 'ok'}
+        if address in seen and seen[address].advertisement is not None:
+            record['advertisement'] = seen[address].advertisement.as_dict()
+        stats = signal.get(address)
+        if stats is not None:
+            record['seen'] = record['seen'] or stats['samples'] > 0
+            record.update(rssi=stats['rssi_mean'], rssi_samples=stats['samples'],
+                          detection_rate=stats['detection_rate'])
+        if 'connect' not in steps and 'services' not in steps:
+            return record
+        if 'discover' in steps and not record['seen'] and record['transport'] is None:
+            record['status'] = 'not_found'
+            return record
+        record['transport'] = record['transport'] or 'ble'
+        async with semaphore:
+            probe_start = time.monotonic()
+            try:
+                with metrics.operation('batch_probe', device=address, transport=record['transport']):
+                    if record['transport'] == 'ble':
+                        connect_seconds, services = await asyncio.wait_for(
+                            probe_ble_device(sessions, address, cache), device_timeout)
+                    else:
+                        connect_seconds, services = await asyncio.wait_for(
+                            probe_classic_device(address, cache, 'services' in steps, adapters), device_timeout)
+                if connect_seconds is None:
+                    record['status'] = 'connect_failed'
+                else:
+                    record['connect_seconds'] = connect_seconds
+                    if 'services' in steps:
+                        record['services'] = services
+            except asyncio.TimeoutError:
+                record['status'] = 'timeout'
+            except ConnectionError:
+                record['status'] = 'connect_failed'
+            except Exception as e:
+                record['status'] = 'error'
+                record['error'] = str(e)
+            record['elapsed'] = time.monotonic() - probe_start
+        return record
 
-async def main():
+    async with BleSessionManager(max_connections=concurrency, connect=connect, adapters=adapters) as sessions:
+        tasks = [asyncio.ensure_future(probe(sessions, address)) for address in targets]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                record = await finished
+                summary['seen'] += record['seen']
+                if record['status'] == 'ok' and 'connect_seconds' in record:
+                    summary['connected'] += 1
+                elif record['status'] == 'timeout':
+                    summary['timeouts'] += 1
+                elif record['status'] in ('connect_failed', 'error'):
+                    summary['failed'] += 1
+                elif record['status'] == 'not_found':
+                    summary['skipped'] += 1
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output.flush()
+        finally:
+            for task in tasks:
+                task.cancel()
+    summary['elapsed'] = time.monotonic() - start_time
+    summary['adapters'] = adapters.stats()
+    output.write(json.dumps(summary, ensure_ascii=False) + '\n')
+    output.flush()
+    return summary
+
+async def run_presence(watchlist, output, socket_address=None, duration=None, adapters=default_adapters,
+                       **tracker_options):
+    """Jelenlét-figyelő mód: érkezés/távozás események JSON sorokként, a végén összesítés
+
+    A futás duration másodpercig, None esetén megszakításig (Ctrl+C, SIGTERM) tart.
+    """
+    tracker = PresenceTracker(watchlist, **tracker_options)
+
+    def write_event(event):
+        output.write(json.dumps(event, ensure_ascii=False) + '\n')
+        output.flush()
+
+    tracker.add_listener(write_event)
+    server = None
+    if socket_address:
+        server = await PresenceSocketServer(socket_address, tracker).start()
+        print(f"Jelenlét események a helyi socketen: {socket_address}")
+    daemon = PresenceDaemon(tracker, adapters)
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, daemon.stop)
+    except (NotImplementedError, AttributeError, RuntimeError):
+        # Windows: nincs jelkezelő az eseményhurokban
+        pass
+    print(f"Jelenlét-figyelés indul: {len(tracker)} figyelt eszköz")
+    try:
+        await daemon.run(duration)
+    finally:
+        if server is not None:
+            await server.close()
+    summary = {'type': 'summary', **tracker.stats()}
+    output.write(json.dumps(summary, ensure_ascii=False) + '\n')
+    output.flush()
+    return summary
+
+async def explore_gatt(client, gatt_table, notify_seconds=5.0):
+    """Olvasható karakterisztikák párhuzamos olvasása, majd értesítések fogadása notify_seconds ideig"""
+    engine = GattEngine(client, gatt_table)
+    with metrics.span('gatt_read', device=client.address):
+        values = await engine.read_all()
+    if values:
+        print("\nKarakterisztikák értékei:")
+    for handle, result in sorted(values.items()):
+        if result['error']:
+            print(f"  {result['uuid']} (handle: {handle}): hiba - {result['error']}")
+        else:
+            print(f"  {result['uuid']} (handle: {handle}): {bytes(result['value']).hex()} "
+                  f"({result['latency'] * 1000:.1f} ms)")
+
+    if notify_seconds <= 0 or not await engine.subscribe():
+        return engine.report()
+    print(f"\nÉrtesítések fogadása {notify_seconds:g} másodpercig...")
+
+    async def consume():
+        async for batch in engine.notifications():
+            for handle, timestamp, data in batch:
+                print(f"  Értesítés {engine.stats[handle].uuid}: {data.hex()}")
+
+    consumer = asyncio.ensure_future(consume())
+    try:
+        await asyncio.sleep(notify_seconds)
+    finally:
+        await engine.unsubscribe()
+        await consumer
+
+    report = engine.report()
+    for handle, item in sorted(report.items()):
+        if item['notifications']:
+            print(f"  {item['uuid']}: {item['notifications']} értesítés, "
+                  f"{item['notification_rate']:.1f}/s")
+    if engine.ring.dropped:
+        print(f"  Elvesztett értesítések (betelt puffer): {engine.ring.dropped}")
+    return report
+
+async def main(scan_timeout=15.0, target_count=None, deadline=None, cache=None, framing='raw',
+               notify_seconds=5.0, transports=('ble', 'classic')):
     print("Bluetooth eszközök keresése...")
     print(f"Operációs rendszer: {platform.system()} {platform.release()}")
+    missing = [name for name, info in registry.capabilities().items() if not info['available']]
+    if missing:
+        print(f"Nem elérhető hátterek (a hozzájuk tartozó funkciók kimaradnak): {', '.join(missing)}")
     
     try:
-        # BLE eszközök keresése
-        print("\nBLE eszközök keresése...")
-        ble_devices = await BleakScanner.discover(timeout=15.0)
-        
-        # Klasszikus Bluetooth eszközök keresése
-        print("\nKlasszikus Bluetooth eszközök keresése...")
-        classic_devices = bluetooth.discover_devices(lookup_names=True)
-        
-        all_devices = []
-        
-        # BLE eszközök hozzáadása a listához
-        for device in ble_devices:
-            all_devices.append({
-                'name': device.name,
-                'address': device.address,
-                'type': 'BLE'
-            })
-        
-        # Klasszikus Bluetooth eszközök hozzáadása a listához
-        for device in classic_devices:
-            all_devices.append({
-                'name': device[1],
-                'address': device[0],
-                'type': 'Classic'
-            })
+        # BLE és klasszikus eszközök keresése egyszerre
+        print("\nBLE és klasszikus Bluetooth eszközök keresése...")
+        all_devices = await discover_all_devices(scan_timeout, target_count, deadline, transports)
         
         if not all_devices:
             print("Nem található bluetooth eszköz a közelben")
@@ -426,15 +733,14 @@ async def main():
             
         print("\nTalált eszközök:")
         for i, device in enumerate(all_devices, 1):
-            print(f"{i}. {device['name'] or 'Ismeretlen eszköz'} ({device['address']})")
-            print(f"   Típus: {device['type']}")
-            # Az RSSI és metadata csak BLE eszközöknél érhető el
-            if device['type'] == 'BLE':
-                original_device = next(d for d in ble_devices if d.address == device['address'])
-                print(f"   RSSI: {original_device.rssi} dBm")
-                print(f"   Metadata: {original_device.metadata}")
-                if hasattr(original_device, 'details'):
-                    print(f"   Details: {original_device.details}")
+            print(f"{i}. {device.name or 'Ismeretlen eszköz'} ({device.address})")
+            print(f"   Típus: {device.type}")
+            if device.rssi is not None:
+                print(f"   RSSI: {device.rssi} dBm (átlag: {device.rssi_avg:.1f} dBm, {device.sightings} észlelés)")
+            # A dekódolt hirdetés csak BLE eszközöknél érhető el
+            if device.advertisement is not None:
+                for line in format_advertisement(device.advertisement):
+                    print(f"   {line}")
         
         választás = int(input("\nVálasszon egy eszközt (írja be a számát): ")) - 1
         if választás < 0 or választás >= len(all_devices):
@@ -442,138 +748,195 @@ async def main():
             return
                 
         kiválasztott_eszköz = all_devices[választás]
-        print(f"\nKiválasztott eszköz: {kiválasztott_eszköz['name'] or 'Ismeretlen eszköz'}")
-        print(f"Eszköz címe: {kiválasztott_eszköz['address']}")
+        print(f"\nKiválasztott eszköz: {kiválasztott_eszköz.name or 'Ismeretlen eszköz'}")
+        print(f"Eszköz címe: {kiválasztott_eszköz.address}")
+        use_ble = kiválasztott_eszköz.is_ble
+        if kiválasztott_eszköz.is_ble and kiválasztott_eszköz.is_classic:
+            mód = (await ainput("Az eszköz BLE és klasszikus módon is elérhető. Kapcsolódás módja (ble/classic): ")).strip().lower()
+            use_ble = mód != 'classic'
         
-        if kiválasztott_eszköz['type'] == 'BLE':
-            client = await ble_connect_with_retry(kiválasztott_eszköz['address'])
-            if client and client.is_connected:
-                print("\nSikeresen csatlakozva BLE eszközhöz!")
+        if use_ble:
+            # A kapcsolatot a session kezelő tartja, újrakapcsolódáskor a meglévő kapcsolatot kapjuk vissza
+            async with BleSessionManager(connect=ble_connect_with_retry, adapters=default_adapters) as sessions:
                 try:
-                    # BLE specifikus műveletek
-                    services = await client.get_services()
-                    print("\nElérhető szolgáltatások:")
-                    for service in services:
-                        print(f"\nService: {service.uuid}")
-                        for char in service.characteristics:
-                            print(f"  Characteristic: {char.uuid}")
-                            print(f"  Properties: {char.properties}")
-                finally:
-                    if client.is_connected:
-                        await client.disconnect()
+                    async with sessions.session(kiválasztott_eszköz.address) as client:
+                        print("\nSikeresen csatlakozva BLE eszközhöz!")
+                        print(f"Időzítés: {format_operation(metrics.last_operation)}")
+                        # BLE specifikus műveletek
+                        gatt_table = cache.get(kiválasztott_eszköz.address, 'gatt_services') if cache else None
+                        if gatt_table is not None:
+                            print("\nElérhető szolgáltatások (gyorsítótárból):")
+                        else:
+                            with metrics.span('gatt_discovery', device=kiválasztott_eszköz.address):
+                                services = await client.get_services()
+                            gatt_table = serialize_gatt_services(services)
+                            if cache is not None:
+                                cache.update(kiválasztott_eszköz.address, gatt_services=gatt_table)
+                            print("\nElérhető szolgáltatások:")
+                        for service in gatt_table:
+                            print(f"\nService: {service['uuid']}")
+                            for char in service['characteristics']:
+                                print(f"  Characteristic: {char['uuid']} (handle: {char['handle']})")
+                                print(f"  Properties: {char['properties']}")
+                        await explore_gatt(client, gatt_table, notify_seconds)
+                except ConnectionError:
+                    print("Nem sikerült kapcsolódni az eszközhöz.")
         else:
-            socket = classic_bluetooth_connect(kiválasztott_eszköz['address'])
-            if socket:
-                print("\nSikeresen csatlakozva klasszikus Bluetooth eszközhöz!")
-                print("\nElérhető parancsok:")
-                print("1. 'send': Üzenet küldése az eszköznek")
-                print("2. 'receive': Üzenet fogadása az eszköztől")
-                print("3. 'status': Kapcsolat állapotának lekérdezése")
-                print("4. 'info': Részletes eszközinformációk")
-                print("5. 'signal': Jelerősség információk")
-                print("6. 'services': Elérhető szolgáltatások listázása")
-                print("7. 'exit': Kapcsolat bontása és kilépés")
+            transport = default_transports.select(CONNECT, CLASSIC)
+            if transport is None:
+                print(default_transports.unavailable_reason(CONNECT, CLASSIC))
+                return
+            adapter = await default_adapters.acquire(kiválasztott_eszköz.address)
+            try:
+                socket = await transport.connect(kiválasztott_eszköz.address, cache=cache, adapter=adapter)
+                if socket:
+                    print("\nSikeresen csatlakozva klasszikus Bluetooth eszközhöz!")
+                    print(f"Időzítés: {format_operation(metrics.last_operation)}")
+                    print("\nElérhető parancsok:")
+                    print("1. 'send': Üzenet küldése az eszköznek")
+                    print("2. 'receive': Üzenet fogadása az eszköztől")
+                    print("3. 'status': Kapcsolat állapotának lekérdezése")
+                    print("4. 'info': Részletes eszközinformációk")
+                    print("5. 'signal': Jelerősség információk")
+                    print("6. 'services': Elérhető szolgáltatások listázása")
+                    print("7. 'sendfile': Fájl küldése az eszköznek")
+                    print("8. 'exit': Kapcsolat bontása és kilépés")
                 
-                try:
-                    while True:
-                        command = input("\nKérem adja meg a parancsot: ").lower()
+                    # Nem blokkoló, keretezett adatcsatorna; a fogadás a háttérben fut
+                    stream = RfcommStream(socket, make_framing(framing), address=kiválasztott_eszköz.address)
+                    inbox = asyncio.Queue()
+                    receiver = asyncio.ensure_future(receive_messages(stream, inbox))
+                    try:
+                        while True:
+                            command = (await ainput("\nKérem adja meg a parancsot: ")).lower()
                         
-                        if command == 'exit':
-                            print("Kilépés...")
-                            break
-                        elif command == 'send':
-                            message = input("Írja be az üzenetet: ")
-                            try:
-                                socket.send(message.encode())
-                                print("Üzenet elküldve!")
-                            except Exception as e:
-                                print(f"Hiba az üzenet küldése közben: {str(e)}")
-                        elif command == 'receive':
-                            try:
-                                data = socket.recv(1024)
-                                print(f"Fogadott üzenet: {data.decode()}")
-                            except Exception as e:
-                                print(f"Hiba az üzenet fogadása közben: {str(e)}")
-                        elif command == 'status':
-                            try:
-                                socket.getpeername()
-                                print("\nKapcsolat állapota:")
-                                print("✓ Kapcsolat aktív")
-                                peer_name = socket.getpeername()
-                                print(f"  Távoli eszköz cime: {peer_name[0]}")
-                                print(f"  Port: {peer_name[1]}")
-                                print(f"  Kapcsolat típusa: Klasszikus Bluetooth")
-                            except:
-                                print("✗ A kapcsolat megszakadt!")
+                            if command == 'exit':
+                                print("Kilépés...")
                                 break
-                        elif command == 'info':
-                            try:
-                                print("\nEszköz információk:")
+                            elif command == 'send':
+                                message = await ainput("Írja be az üzenetet: ")
                                 try:
-                                    device_name = bluetooth.lookup_name(kiválasztott_eszköz['address'])
-                                    print(f"  Eszköz neve: {device_name or 'Ismeretlen'}")
-                                except:
-                                    print("  Eszköz neve: Nem elérhető")
-                                
-                                print(f"  MAC cím: {kiválasztott_eszköz['address']}")
-                                print(f"  Protokoll: RFCOMM")
-                                
+                                    await stream.send_frame(message.encode())
+                                    await stream.drain()
+                                    print("Üzenet elküldve!")
+                                except Exception as e:
+                                    print(f"Hiba az üzenet küldése közben: {str(e)}")
+                            elif command == 'receive':
                                 try:
-                                    socket_info = socket.getsockname()
-                                    print(f"  Helyi port: {socket_info[1]}")
-                                    peer_info = socket.getpeername()
-                                    print(f"  Távoli port: {peer_info[1]}")
-                                except:
-                                    print("  Port információk nem elérhetőek")
-                                
-                                print("\nKapcsolat státusz:")
+                                    if inbox.empty() and not receiver.done():
+                                        data = await asyncio.wait_for(inbox.get(), 15)
+                                        print(f"Fogadott üzenet: {data.decode(errors='replace')}")
+                                    while not inbox.empty():
+                                        print(f"Fogadott üzenet: {inbox.get_nowait().decode(errors='replace')}")
+                                except asyncio.TimeoutError:
+                                    print("Nem érkezett üzenet 15 másodpercen belül")
+                                except Exception as e:
+                                    print(f"Hiba az üzenet fogadása közben: {str(e)}")
+                            elif command == 'sendfile':
+                                path = await ainput("Fájl elérési útja: ")
+                                try:
+                                    with open(path, 'rb') as f:
+                                        result = await stream.sendfile(f)
+                                    print(f"Elküldve: {result['bytes']} bájt, {result['seconds']:.2f} s, "
+                                          f"{result['throughput'] / 1024:.1f} KB/s")
+                                except Exception as e:
+                                    print(f"Hiba a fájl küldése közben: {str(e)}")
+                            elif command == 'status':
                                 try:
                                     socket.getpeername()
-                                    print("  ✓ Aktív")
+                                    print("\nKapcsolat állapota:")
+                                    print("✓ Kapcsolat aktív")
+                                    peer_name = socket.getpeername()
+                                    print(f"  Távoli eszköz cime: {peer_name[0]}")
+                                    print(f"  Port: {peer_name[1]}")
+                                    print(f"  Kapcsolat típusa: Klasszikus Bluetooth")
                                 except:
-                                    print("  ✗ Megszakadt")
+                                    print("✗ A kapcsolat megszakadt!")
+                                    break
+                            elif command == 'info':
+                                try:
+                                    print("\nEszköz információk:")
+                                    try:
+                                        device_name = cache.get(kiválasztott_eszköz.address, 'name') if cache else None
+                                        if device_name is None:
+                                            device_name = bluetooth.lookup_name(kiválasztott_eszköz.address)
+                                            if device_name and cache is not None:
+                                                cache.update(kiválasztott_eszköz.address, name=device_name)
+                                        print(f"  Eszköz neve: {device_name or 'Ismeretlen'}")
+                                    except:
+                                        print("  Eszköz neve: Nem elérhető")
+                                
+                                    print(f"  MAC cím: {kiválasztott_eszköz.address}")
+                                    print(f"  Protokoll: RFCOMM")
+                                
+                                    try:
+                                        socket_info = socket.getsockname()
+                                        print(f"  Helyi port: {socket_info[1]}")
+                                        peer_info = socket.getpeername()
+                                        print(f"  Távoli port: {peer_info[1]}")
+                                    except:
+                                        print("  Port információk nem elérhetőek")
+                                
+                                    print("\nKapcsolat státusz:")
+                                    try:
+                                        socket.getpeername()
+                                        print("  ✓ Aktív")
+                                    except:
+                                        print("  ✗ Megszakadt")
                                     
-                            except Exception as e:
-                                print(f"Hiba az információk lekérése közben: {str(e)}")
-                        elif command == 'signal':
-                            print("\nJelerősség információk lekérése...")
-                            signal_info = get_device_signal_strength(kiválasztott_eszköz['address'])
+                                except Exception as e:
+                                    print(f"Hiba az információk lekérése közben: {str(e)}")
+                            elif command == 'signal':
+                                print("\nJelerősség információk lekérése...")
+                                signal_info = await get_device_signal_strength(kiválasztott_eszköz.address)
                             
-                            if signal_info:
-                                print("\nKapcsolat információk:")
-                                print(f"Eszköz neve: {signal_info['device_name']}")
-                                print(f"Válaszidő: {signal_info['response_time']}")
-                                print(f"Kapcsolat minősége: {signal_info['quality']}")
-                                print(f"Jelerősség: {signal_info['strength']}")
+                                if signal_info:
+                                    print("\nKapcsolat információk:")
+                                    print(f"Eszköz neve: {signal_info['device_name']}")
+                                    print(f"Válaszidő: {signal_info['response_time']:.2f} s")
+                                    if signal_info['rssi'] is not None:
+                                        print(f"RSSI: {signal_info['rssi']:.1f} dBm ({signal_info['samples']} minta, "
+                                              f"megbízhatóság: {signal_info['confidence'] * 100:.0f}%)")
+                                    print(f"Kapcsolat minősége: {signal_info['quality']}")
+                                    print(f"Jelerősség: {signal_info['strength']}")
                                 
-                                # Rövid kapcsolat monitorozás
-                                monitor_device_connection(kiválasztott_eszköz['address'])
-                        elif command == 'services':
-                            try:
-                                print("\nElérhető szolgáltatások keresése...")
-                                services = bluetooth.find_service(address=kiválasztott_eszköz['address'])
-                                if services:
-                                    print("\nTalált szolgáltatások:")
-                                    for svc in services:
-                                        print(f"\n  Szolgáltatás neve: {svc.get('name', 'Ismeretlen')}")
-                                        print(f"  Protokoll: {svc.get('protocol', 'Ismeretlen')}")
-                                        print(f"  Port: {svc.get('port', 'Ismeretlen')}")
-                                        print(f"  Service ID: {svc.get('service-id', 'Ismeretlen')}")
-                                else:
-                                    print("Nem található elérhető szolgáltatás")
-                            except Exception as e:
-                                print(f"Hiba a szolgáltatások lekérése közben: {str(e)}")
-                        else:
-                            print("Ismeretlen parancs! Használja az alábbi parancsok egyikét:")
-                            print("send, receive, status, info, signal, services, exit")
+                                    # Rövid kapcsolat monitorozás (klasszikus eszköz: inquiry RSSI-vel)
+                                    await monitor_device_connection(kiválasztott_eszköz.address, mode='inquiry')
+                            elif command == 'services':
+                                try:
+                                    print("\nElérhető szolgáltatások keresése...")
+                                    services_transport = default_transports.select(SERVICES, CLASSIC)
+                                    if services_transport is None:
+                                        print(default_transports.unavailable_reason(SERVICES, CLASSIC))
+                                        continue
+                                    services = await services_transport.services(kiválasztott_eszköz.address, cache)
+                                    if services:
+                                        print("\nTalált szolgáltatások:")
+                                        for svc in services:
+                                            print(f"\n  Szolgáltatás neve: {svc.get('name', 'Ismeretlen')}")
+                                            print(f"  Protokoll: {svc.get('protocol', 'Ismeretlen')}")
+                                            print(f"  Port: {svc.get('port', 'Ismeretlen')}")
+                                            print(f"  Service ID: {svc.get('service-id', 'Ismeretlen')}")
+                                    else:
+                                        print("Nem található elérhető szolgáltatás")
+                                except Exception as e:
+                                    print(f"Hiba a szolgáltatások lekérése közben: {str(e)}")
+                            else:
+                                print("Ismeretlen parancs! Használja az alábbi parancsok egyikét:")
+                                print("send, receive, status, info, signal, services, sendfile, exit")
                             
-                except KeyboardInterrupt:
-                    print("\nKapcsolat megszakítva a felhasználó által.")
-                finally:
-                    socket.close()
-                    print("Kapcsolat lezárva.")
-            else:
-                print("Nem sikerült kapcsolódni az eszközhöz.")
+                    except KeyboardInterrupt:
+                        print("\nKapcsolat megszakítva a felhasználó által.")
+                    finally:
+                        receiver.cancel()
+                        await asyncio.gather(receiver, return_exceptions=True)
+                        await stream.close()
+                        print("Kapcsolat lezárva.")
+                else:
+                    print("Nem sikerült kapcsolódni az eszközhöz.")
+            finally:
+                # A kapcsolódási hely minden kimenetnél (kivétel esetén is) felszabadul
+                default_adapters.release(adapter)
                 
     except KeyboardInterrupt:
         print("\nProgram leállítva.")
@@ -582,4 +945,123 @@ async def main():
         print(f"Hiba típusa: {type(e).__name__}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Bluetooth eszközök keresése és kapcsolódás")
+    parser.add_argument("--scan-timeout", type=float, default=15.0,
+                        help="Keresési ablak másodpercben (alapértelmezett: 15)")
+    parser.add_argument("--target-count", type=int, default=None,
+                        help="Ennyi talált eszköz után a keresés leáll")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="A keresés legkésőbb ennyi másodperc után leáll")
+    parser.add_argument("--cache-file", default=DEFAULT_CACHE_PATH,
+                        help="Eszköz gyorsítótár fájl helye")
+    parser.add_argument("--cache-ttl", type=float, default=24 * 3600,
+                        help="Gyorsítótár bejegyzések érvényessége másodpercben")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Gyorsítótár kikapcsolása")
+    parser.add_argument("--framing", choices=sorted(FRAMINGS), default="raw",
+                        help="Üzenet keretezés a klasszikus kapcsolaton (alapértelmezett: raw)")
+    parser.add_argument("--notify-seconds", type=float, default=5.0,
+                        help="BLE értesítések fogadásának ideje másodpercben (0: kikapcsolva)")
+    parser.add_argument("--metrics-file", default=None,
+                        help="Időmérések és metrikák mentése kilépéskor ebbe a fájlba")
+    parser.add_argument("--metrics-format", choices=["jsonl", "prometheus"], default="jsonl",
+                        help="Metrika export formátuma (alapértelmezett: jsonl)")
+    parser.add_argument("--transports", nargs="+", choices=["ble", "classic"], default=["ble", "classic"],
+                        help="Keresett eszköztípusok (csak a szükséges háttér töltődik be)")
+    parser.add_argument("--backends", action="store_true",
+                        help="A hátterek elérhetőségének kiírása, majd kilépés")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="Nem interaktív mód: célcímek fájlból ('-': standard bemenet), JSON sorok kimenettel")
+    parser.add_argument("--steps", nargs="+", choices=BATCH_STEPS, default=list(BATCH_STEPS),
+                        help="Kötegelt módban futtatott lépések")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Kötegelt módban egyszerre vizsgált eszközök száma (alapértelmezett: az adapterek "
+                             "kapcsolódási helyeinek összege)")
+    parser.add_argument("--device-timeout", type=float, default=30.0,
+                        help="Kötegelt módban eszközönkénti időkorlát másodpercben")
+    parser.add_argument("--signal-duration", type=float, default=5.0,
+                        help="Kötegelt módban a közös jelerősség mérés hossza másodpercben")
+    parser.add_argument("--record", metavar="FILE",
+                        help="Hirdetések, kapcsolódások, RFCOMM és GATT forgalom rögzítése bináris naplóba")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Valódi rádió helyett egy rögzített napló visszajátszása")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="Visszajátszási sebesség szorzó (0: a lehető leggyorsabban)")
+    parser.add_argument("--presence", metavar="FILE",
+                        help="Jelenlét-figyelő mód: figyelőlista fájlból ('-': standard bemenet), soronként "
+                             "cím és opcionális címke; érkezés/távozás események JSON sorokként")
+    parser.add_argument("--presence-socket", metavar="PATH|HOST:PORT",
+                        help="A jelenlét események közzététele helyi socketen is (Unix socket vagy host:port)")
+    parser.add_argument("--presence-duration", type=float, default=None,
+                        help="Jelenlét-figyelés hossza másodpercben (alapértelmezett: megszakításig)")
+    parser.add_argument("--depart-after", type=float, default=30.0,
+                        help="Ennyi másodperc észlelés nélkül számít távozásnak")
+    parser.add_argument("--arrive-sightings", type=int, default=2,
+                        help="Érkezéshez szükséges észlelések száma a távozási időn belül")
+    parser.add_argument("--arrive-rssi", type=float, default=None,
+                        help="Érkezéshez szükséges legkisebb RSSI (dBm)")
+    parser.add_argument("--depart-rssi", type=float, default=None,
+                        help="Ez alatti RSSI nem tartja fenn a jelenlétet (legfeljebb --arrive-rssi)")
+    parser.add_argument("--adapters", nargs="+", metavar="NAME",
+                        help="Használt Bluetooth adapterek (pl. hci0 hci1; alapértelmezett: az összes)")
+    parser.add_argument("--adapter-roles", nargs="+", metavar="NAME=ROLES",
+                        help="Adapter szerepek, pl. hci0=scan hci1=connect (alapértelmezett: az első keres, "
+                             "a többi kapcsolódik)")
+    parser.add_argument("--adapter-shards", action="store_true",
+                        help="Minden adapter keres, a kapcsolódó adaptert az eszköz címe dönti el")
+    parser.add_argument("--adapter-slots", type=int, default=4,
+                        help="Adapterenként egyszerre nyitott kapcsolatok száma")
+    args = parser.parse_args()
+    try:
+        default_adapters.configure(args.adapters, parse_roles(args.adapter_roles), args.adapter_shards,
+                                   args.adapter_slots)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.arrive_rssi is not None and args.depart_rssi is not None and args.depart_rssi > args.arrive_rssi:
+        parser.error("A --depart-rssi nem lehet nagyobb a --arrive-rssi értékénél")
+    info_output = sys.stderr if args.batch or args.presence else sys.stdout
+    if args.replay:
+        # A háttérmodulok első használata előtt kell betölteni
+        replay = install_replay(args.replay, args.replay_speed)
+        print(f"Visszajátszás: {args.replay} {replay.log.summary()}", file=info_output)
+    if args.backends:
+        print_capabilities()
+        print()
+        print_transports()
+        raise SystemExit(0)
+    cache = None if args.no_cache else DeviceCache(args.cache_file, ttl=args.cache_ttl)
+    if args.record:
+        capture.open(args.record)
+    try:
+        if args.batch:
+            targets = read_batch_targets(args.batch)
+            output = sys.stdout
+            # A diagnosztikai kiírások a hibakimenetre kerülnek, a standard kimeneten csak JSON sorok vannak
+            with contextlib.redirect_stdout(sys.stderr):
+                asyncio.run(run_batch(targets, output, args.steps, args.concurrency, args.device_timeout,
+                                      args.scan_timeout, args.signal_duration, cache))
+        elif args.presence:
+            watchlist = read_watchlist(args.presence)
+            output = sys.stdout
+            with contextlib.redirect_stdout(sys.stderr):
+                try:
+                    asyncio.run(run_presence(watchlist, output, args.presence_socket, args.presence_duration,
+                                             depart_after=args.depart_after,
+                                             arrive_sightings=args.arrive_sightings,
+                                             arrive_rssi=args.arrive_rssi, depart_rssi=args.depart_rssi))
+                except KeyboardInterrupt:
+                    print("\nJelenlét-figyelés leállítva.")
+                except RuntimeError as e:
+                    print(f"A jelenlét-figyelés nem indítható: {str(e)}")
+        else:
+            asyncio.run(main(args.scan_timeout, args.target_count, args.deadline, cache, args.framing,
+                             args.notify_seconds, tuple(args.transports)))
+    finally:
+        if cache is not None:
+            cache.close()
+        if args.record:
+            capture.close()
+            print(f"Forgalom rögzítve: {args.record} ({capture.records} rekord)", file=info_output)
+        if args.metrics_file:
+            metrics.export(args.metrics_file, args.metrics_format)
+            print(f"Metrikák mentve: {args.metrics_file}", file=info_output)
\ No newline at end of file
@@ -0,0 +1,356 @@
+"""Wi-Fi kapcsolat mintavételezése és hálózati adatok gyűjtése cserélhető háttérrel
+
+Linuxon a /proc/net/wireless, a sysfs számlálók és az /etc/resolv.conf közvetlen
+olvasásával, folyamatindítás nélkül mér; Windowson a netsh és ipconfig kimenet
+feldolgozása marad tartalékként. A statisztika folyamatos, nem tárol el minden mintát.
+"""
+import math
+import os
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bluetooth_backends import netifaces, registry
+
+PROC_WIRELESS = "/proc/net/wireless"
+RESOLV_CONF = "/etc/resolv.conf"
+SYSFS_NET = "/sys/class/net"
+# A /proc/net/wireless link minőség skálája a legtöbb meghajtónál 0-70
+LINK_QUALITY_MAX = 70.0
+
+
+class StreamingStats:
+    """Folyamatos statisztika: átlag, szórás, min/max, jitter és percentilisek
+
+    A percentilisekhez egész értékű hisztogramot tart, így a memóriaigény az
+    értéktartománytól függ, nem a minták számától.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.jitter = 0.0
+        self._last = None
+        self._histogram = {}
+
+    def add(self, value):
+        self.count += 1
+        # Welford algoritmus
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        # RFC 3550 szerinti simított jitter az egymást követő minták különbségéből
+        if self._last is not None:
+            self.jitter += (abs(value - self._last) - self.jitter) / 16.0
+        self._last = value
+        bucket = int(round(value))
+        self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else None
+
+    @property
+    def stddev(self):
+        return math.sqrt(self._m2 / self.count) if self.count else None
+
+    def percentile(self, fraction):
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(self.count * fraction))
+        seen = 0
+        for bucket in sorted(self._histogram):
+            seen += self._histogram[bucket]
+            if seen >= rank:
+                return bucket
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.mean if self.count else None,
+            'stddev': self.stddev,
+            'min': self.min,
+            'max': self.max,
+            'jitter': self.jitter,
+            'p10': self.percentile(0.10),
+            'p50': self.percentile(0.50),
+            'p90': self.percentile(0.90),
+        }
+
+
+def channel_band(channel):
+    """Frekvenciasáv a WiFi csatornaszámból (a 6 GHz-es sáv csak a netsh "Band" sorából derül ki)"""
+    if not channel.isdigit():
+        return None
+    return "2.4 GHz" if int(channel) <= 14 else "5 GHz"
+
+
+def parse_netsh_interfaces(output):
+    """netsh wlan show interfaces kimenet feldolgozása egyetlen menetben
+
+    A frekvencia a "Band" sorból jön; régebbi Windows alatt, ahol ez hiányzik, a csatornából.
+    A "Radio type" (pl. 802.11ax) a szabványt jelöli, ez a radio_type mezőbe kerül.
+    """
+    result = {'ssid': None, 'signal': None, 'rx_rate': None, 'tx_rate': None, 'frequency': None,
+              'radio_type': None, 'channel': None}
+    for line in output.split('\n'):
+        key, sep, value = line.partition(':')
+        if not sep:
+            continue
+        key = key.strip()
+        value = value.strip()
+        if key == "SSID":
+            result['ssid'] = value
+        elif key == "Signal":
+            signal_str = value.rstrip('%')
+            result['signal'] = int(signal_str) if signal_str.isdigit() else None
+        elif key.startswith("Receive rate"):
+            result['rx_rate'] = value
+        elif key.startswith("Transmit rate"):
+            result['tx_rate'] = value
+        elif key == "Radio type":
+            result['radio_type'] = value
+        elif key == "Band":
+            result['frequency'] = value
+        elif key == "Channel":
+            result['channel'] = value
+    if result['frequency'] is None and result['channel']:
+        result['frequency'] = channel_band(result['channel'])
+    return result
+
+
+def parse_ipconfig_dns(output):
+    """DNS szerverek kinyerése az ipconfig /all kimenetből egyetlen menetben
+
+    A további szerverek a "DNS Servers" sort követő, kettőspont nélküli folytatósorokban állnak.
+    """
+    servers = []
+    in_dns = False
+    for line in output.split('\n'):
+        key, sep, value = line.partition(' : ')
+        if sep:
+            in_dns = "DNS Servers" in key
+            if in_dns and value.strip():
+                servers.append(value.strip())
+        elif in_dns and line.startswith(" ") and line.strip():
+            servers.append(line.strip())
+        else:
+            in_dns = False
+    return servers
+
+
+def read_resolv_conf(path=RESOLV_CONF):
+    """DNS szerverek beolvasása az /etc/resolv.conf fájlból"""
+    servers = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == 'nameserver':
+                    servers.append(fields[1])
+    except OSError:
+        pass
+    return servers
+
+
+def read_interface_addresses():
+    """IPv4 cím és alapértelmezett átjáró a netifaces alapján
+
+    Csak az alapértelmezett útvonal interfészét kérdezi le; ha ilyen nincs,
+    az első nem loopback címet adja vissza.
+    """
+    result = {'ip': None, 'gateway': None, 'interface': None}
+    if not registry.available('netifaces'):
+        return result
+    default = netifaces.gateways().get('default', {}).get(netifaces.AF_INET)
+    if default:
+        result['gateway'], result['interface'] = default[0], default[1]
+        interfaces = [default[1]]
+    else:
+        interfaces = netifaces.interfaces()
+    for iface in interfaces:
+        for addr in netifaces.ifaddresses(iface).get(netifaces.AF_INET, []):
+            if addr.get('addr') and not addr['addr'].startswith('127.'):
+                result['ip'] = addr['addr']
+                result['interface'] = result['interface'] or iface
+                return result
+    return result
+
+
+class NetworkSnapshotCollector:
+    """Hálózati pillanatkép (SSID/jel, cím, átjáró, DNS) gyűjtése rövid élettartamú gyorsítótárral
+
+    Windowson a netsh, az ipconfig és a netifaces lekérdezés párhuzamosan fut;
+    Linuxon nem indul külső folyamat.
+    """
+
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        self._snapshot = None
+        self._taken = 0.0
+        self._lock = threading.Lock()
+
+    def snapshot(self, force=False):
+        with self._lock:
+            if not force and self._snapshot is not None and time.monotonic() - self._taken < self.ttl:
+                return dict(self._snapshot)
+            if platform.system() == "Windows":
+                snapshot = self._collect_windows()
+            else:
+                snapshot = self._collect_linux()
+            self._snapshot = snapshot
+            self._taken = time.monotonic()
+            return dict(snapshot)
+
+    def _collect_windows(self):
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            wlan = executor.submit(subprocess.check_output, ["netsh", "wlan", "show", "interfaces"], encoding='utf-8')
+            ipconfig = executor.submit(subprocess.check_output, ["ipconfig", "/all"], encoding='utf-8')
+            addresses = executor.submit(read_interface_addresses)
+            snapshot = parse_netsh_interfaces(wlan.result())
+            snapshot.update(addresses.result())
+            try:
+                snapshot['dns'] = parse_ipconfig_dns(ipconfig.result())
+            except (OSError, subprocess.CalledProcessError):
+                snapshot['dns'] = ["Nem elérhető"]
+        return snapshot
+
+    def _collect_linux(self):
+        snapshot = {'ssid': None, 'signal': None, 'rx_rate': None, 'tx_rate': None, 'frequency': None,
+                    'radio_type': None, 'channel': None}
+        if ProcWirelessSampler.available():
+            try:
+                sampler = ProcWirelessSampler()
+                try:
+                    snapshot['signal'] = sampler.sample()['signal']
+                finally:
+                    sampler.close()
+            except (OSError, RuntimeError, ValueError):
+                pass
+        snapshot.update(read_interface_addresses())
+        snapshot['dns'] = read_resolv_conf()
+        return snapshot
+
+
+class ProcWirelessSampler:
+    """Linux háttér: /proc/net/wireless és sysfs forgalmi számlálók olvasása"""
+
+    name = 'proc'
+
+    def __init__(self, interface=None):
+        self.interface = interface or self._default_interface()
+        if self.interface is None:
+            raise RuntimeError("Nem található vezeték nélküli interfész")
+        # A fájlokat nyitva tartjuk, mintánként csak visszatekerünk
+        self._wireless = open(PROC_WIRELESS, 'rb')
+        self._counters = {}
+        for counter in ('rx_bytes', 'tx_bytes'):
+            path = os.path.join(SYSFS_NET, self.interface, 'statistics', counter)
+            if os.path.exists(path):
+                self._counters[counter] = open(path, 'rb')
+
+    @staticmethod
+    def available():
+        return platform.system() == "Linux" and os.path.exists(PROC_WIRELESS)
+
+    @staticmethod
+    def _default_interface():
+        with open(PROC_WIRELESS, 'rb') as f:
+            for line in f.read().decode('ascii', 'replace').splitlines()[2:]:
+                if ':' in line:
+                    return line.split(':', 1)[0].strip()
+        return None
+
+    def sample(self):
+        self._wireless.seek(0)
+        result = {'timestamp': time.monotonic(), 'signal': None, 'level_dbm': None, 'noise_dbm': None}
+        for line in self._wireless.read().decode('ascii', 'replace').splitlines()[2:]:
+            iface, _, rest = line.partition(':')
+            if iface.strip() != self.interface:
+                continue
+            fields = rest.split()
+            link, level, noise = (float(f.rstrip('.')) for f in fields[1:4])
+            result['signal'] = max(0.0, min(100.0, link / LINK_QUALITY_MAX * 100))
+            result['level_dbm'] = level
+            result['noise_dbm'] = noise
+            break
+        for counter, f in self._counters.items():
+            f.seek(0)
+            result[counter] = int(f.read())
+        return result
+
+    def close(self):
+        self._wireless.close()
+        for f in self._counters.values():
+            f.close()
+
+
+class NetshSampler:
+    """Windows háttér: netsh wlan show interfaces kimenetének feldolgozása (mintánként egy folyamat)"""
+
+    name = 'netsh'
+
+    def __init__(self, interface=None):
+        self.interface = interface
+
+    @staticmethod
+    def available():
+        return platform.system() == "Windows"
+
+    def sample(self):
+        output = subprocess.check_output(["netsh", "wlan", "show", "interfaces"], encoding='utf-8')
+        result = parse_netsh_interfaces(output)
+        result['timestamp'] = time.monotonic()
+        return result
+
+    def close(self):
+        pass
+
+
+SAMPLERS = [ProcWirelessSampler, NetshSampler]
+
+
+def select_sampler(interface=None):
+    """Az első elérhető mintavevő háttér példányosítása (None, ha nincs ilyen)"""
+    for sampler_class in SAMPLERS:
+        if sampler_class.available():
+            try:
+                return sampler_class(interface)
+            except (OSError, RuntimeError) as e:
+                print(f"A(z) {sampler_class.name} mintavevő nem használható: {str(e)}")
+    return None
+
+
+def sample_stream(sampler, rate=1.0, duration=None):
+    """Minták egyenletes ütemű generátora élő kijelzőkhöz"""
+    period = 1.0 / rate
+    start = time.monotonic()
+    next_tick = start
+    while duration is None or time.monotonic() - start < duration:
+        yield sampler.sample()
+        next_tick += period
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Lemaradás esetén nem próbáljuk behozni a kimaradt ütemeket
+            next_tick = time.monotonic()
+
+
+def monitor_link(sampler, rate=1.0, duration=5.0, callback=None):
+    """Jelerősség mintavételezése folyamatos statisztikába; callback(minta, stats) minden mintánál"""
+    stats = StreamingStats()
+    for sample in sample_stream(sampler, rate, duration):
+        if sample.get('signal') is not None:
+            stats.add(sample['signal'])
+        if callback is not None:
+            callback(sample, stats)
+    return stats
@@ -0,0 +1,371 @@
+"""Folyamatos jelenlét-figyelés nagy MAC címlistákra
+
+Egyetlen közös keresési folyamat (BLE hirdetések és egy hosszan futó, RSSI-t
+jelentő inquiry) táplálja a figyelőlistát; eszközönként nem indul külön
+keresés. A nem figyelt címek egy szótár kereséssel kiesnek. Az eltűnéseket
+egy lejárati kupac ütemezi: jelen lévő eszközönként egyetlen bejegyzés van
+benne, egy észlelés csak az utolsó észlelés idejét írja át, és a kupac csak
+a lejáratkor nézi meg újra az eszközt, így az ütemezés költsége nem nő a
+listával. Érkezés és távozás hiszterézissel: érkezéshez arrive_sightings
+észlelés kell arrive_window másodpercen belül (legalább arrive_rssi jellel),
+távozáshoz depart_after másodpercig nem jöhet depart_rssi feletti észlelés.
+Az eseményeket figyelő függvények és egy helyi socket (JSON sorok) kapják.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+from bluetooth_adapters import default_adapters
+from bluetooth_cache import normalize_address
+from bluetooth_metrics import metrics
+from bluetooth_rssi import ble_rssi_source, inquiry_rssi_source
+from bluetooth_transports import BLE, CLASSIC, DISCOVER, default_transports, is_valid_address
+
+ARRIVE = 'arrive'
+DEPART = 'depart'
+# Folyamatos figyelésnél rövidebb inquiry körök (8 * 1.28 s), hogy a klasszikus eszközök is gyakran jelentkezzenek
+PRESENCE_INQUIRY_UNITS = 8
+
+
+def read_watchlist(source):
+    """Figyelőlista beolvasása fájlból vagy '-' esetén a standard bemenetről
+
+    Soronként egy cím, opcionálisan utána egy címke; a '#' utáni rész megjegyzés.
+    """
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    watchlist = {}
+    try:
+        for line_number, line in enumerate(stream, 1):
+            fields = line.split('#', 1)[0].split(None, 1)
+            if not fields:
+                continue
+            if not is_valid_address(fields[0]):
+                print(f"Érvénytelen MAC cím a {line_number}. sorban: {fields[0]}", file=sys.stderr)
+                continue
+            watchlist[normalize_address(fields[0])] = fields[1].strip() if len(fields) > 1 else None
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return watchlist
+
+
+class WatchEntry:
+    """Egy figyelt eszköz jelenléti állapota"""
+
+    __slots__ = ('address', 'label', 'name', 'present', 'last_seen', 'rssi', 'arrived_at',
+                 'candidate_since', 'candidate_sightings', 'sightings')
+
+    def __init__(self, address, label=None):
+        self.address = address
+        self.label = label
+        self.name = None
+        self.present = False
+        self.last_seen = None
+        self.rssi = None
+        self.arrived_at = None
+        self.candidate_since = None
+        self.candidate_sightings = 0
+        self.sightings = 0
+
+    def as_dict(self):
+        return {'address': self.address, 'label': self.label, 'name': self.name, 'present': self.present,
+                'rssi': self.rssi, 'sightings': self.sightings}
+
+
+class PresenceTracker:
+    """Figyelőlista érkezés/távozás eseményekkel
+
+    Az add_sample()/set_info() pár ugyanaz, mint az RssiMonitor-é, így a
+    bluetooth_rssi forrásai közvetlenül táplálhatják; bármely szálból hívható.
+    Az események a poll() hívásakor, a hívó szálában jutnak a figyelőkhöz.
+    """
+
+    def __init__(self, watchlist=None, depart_after=30.0, arrive_sightings=2, arrive_window=None,
+                 arrive_rssi=None, depart_rssi=None):
+        if arrive_rssi is not None and depart_rssi is not None and depart_rssi > arrive_rssi:
+            raise ValueError("A távozási RSSI küszöb nem lehet nagyobb az érkezésinél")
+        self.depart_after = depart_after
+        self.arrive_sightings = arrive_sightings
+        # Alapértelmezés szerint az érkezési ablak a távozási idő (a klasszikus inquiry ritkán jelez)
+        self.arrive_window = depart_after if arrive_window is None else arrive_window
+        self.arrive_rssi = arrive_rssi
+        self.depart_rssi = depart_rssi
+        self._entries = {}
+        self._expiry = []  # (lejárat, sorszám, bejegyzés) - jelen lévő eszközönként pontosan egy
+        self._sequence = itertools.count()
+        self._pending = []
+        self._announced = {}  # a figyelőknek már érkezettként jelzett eszközök
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.samples = 0
+        for address, label in (watchlist or {}).items():
+            self.watch(address, label)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def watch(self, address, label=None):
+        address = normalize_address(address)
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None:
+                entry = self._entries[address] = WatchEntry(address, label)
+            elif label is not None:
+                entry.label = label
+        return entry
+
+    def unwatch(self, address):
+        """A cím törlése a listáról; a kupacban maradt bejegyzése lejáratkor kiesik"""
+        with self._lock:
+            entry = self._entries.pop(normalize_address(address), None)
+            if entry is not None:
+                entry.present = False
+                self._announced.pop(entry.address, None)
+            return entry is not None
+
+    def add_listener(self, listener):
+        """listener(event) minden érkezés és távozás után hívódik (a poll() hívójának szálában)"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def set_info(self, address, name=None, **info):
+        entry = self._entries.get(address) or self._entries.get(normalize_address(address))
+        if entry is not None and name:
+            entry.name = name
+
+    def add_sample(self, address, rssi, timestamp=None):
+        """Egy észlelés rögzítése; a nem figyelt címek egy szótár kereséssel kiesnek"""
+        self.samples += 1
+        entry = self._entries.get(address) or self._entries.get(normalize_address(address))
+        if entry is None:
+            return
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            entry.rssi = rssi
+            entry.sightings += 1
+            if entry.present:
+                # Gyenge jel nem tartja életben a jelenlétet (hiszterézis a két küszöb között)
+                if rssi is None or self.depart_rssi is None or rssi >= self.depart_rssi:
+                    entry.last_seen = timestamp
+                return
+            if self.arrive_rssi is not None and (rssi is None or rssi < self.arrive_rssi):
+                return
+            if entry.candidate_since is None or timestamp - entry.candidate_since > self.arrive_window:
+                entry.candidate_since = timestamp
+                entry.candidate_sightings = 0
+            entry.candidate_sightings += 1
+            if entry.candidate_sightings >= self.arrive_sightings:
+                entry.present = True
+                entry.arrived_at = entry.last_seen = timestamp
+                entry.candidate_since = None
+                heapq.heappush(self._expiry, (timestamp + self.depart_after, next(self._sequence), entry))
+                self._pending.append(self._event(ARRIVE, entry))
+
+    def expire(self, now=None):
+        """A lejárt jelenlétek lezárása; a közben észlelt eszközök új lejárattal visszakerülnek"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                _, sequence, entry = heapq.heappop(self._expiry)
+                if not entry.present:
+                    # Közben törölték a listáról
+                    continue
+                deadline = entry.last_seen + self.depart_after
+                if deadline > now:
+                    heapq.heappush(self._expiry, (deadline, sequence, entry))
+                    continue
+                entry.present = False
+                self._pending.append(self._event(DEPART, entry, now))
+
+    def poll(self, now=None):
+        """Lejáratok feldolgozása és a függő események kézbesítése; az események listája"""
+        self.expire(now)
+        with self._lock:
+            events, self._pending = self._pending, []
+        for event in events:
+            if event['event'] == ARRIVE:
+                self._announced[event['address']] = event
+            else:
+                self._announced.pop(event['address'], None)
+            metrics.inc('bluetooth_presence_events_total', event=event['event'])
+            for listener in list(self._listeners):
+                try:
+                    listener(event)
+                except Exception as e:
+                    print(f"Hiba a jelenlét figyelőben: {str(e)}")
+        return events
+
+    def next_deadline(self):
+        with self._lock:
+            return self._expiry[0][0] if self._expiry else None
+
+    def present(self):
+        with self._lock:
+            return [entry for entry in self._entries.values() if entry.present]
+
+    def snapshot(self):
+        """A már bejelentett jelen lévő eszközök 'present' eseményként (új socket kliensnek)
+
+        Csak a kézbesített érkezések számítanak, így egy függő érkezés nem jut el kétszer a klienshez.
+        """
+        return [dict(event, event='present') for event in self._announced.values()]
+
+    def _event(self, kind, entry, now=None):
+        event = {'type': 'presence', 'event': kind, 'address': entry.address, 'label': entry.label,
+                 'name': entry.name, 'rssi': entry.rssi, 'time': time.time()}
+        if kind == DEPART:
+            event['present_seconds'] = entry.last_seen - entry.arrived_at
+            event['absent_seconds'] = (time.monotonic() if now is None else now) - entry.last_seen
+        return event
+
+    def stats(self):
+        with self._lock:
+            present = sum(1 for entry in self._entries.values() if entry.present)
+            return {'watched': len(self._entries), 'present': present, 'samples': self.samples,
+                    'scheduled': len(self._expiry)}
+
+
+class PresenceSocketServer:
+    """Jelenlét események JSON sorokként egy helyi socketen
+
+    A cím egy Unix socket útvonal vagy 'host:port'. Csatlakozáskor a kliens
+    megkapja a jelen lévő eszközöket, utána az eseményeket. A lemaradó
+    (max_buffer bájtnál többet fel nem olvasó) kliens kapcsolata bontódik.
+    """
+
+    def __init__(self, address, tracker, max_buffer=1 << 20):
+        self.address = address
+        self.tracker = tracker
+        self.max_buffer = max_buffer
+        self._server = None
+        self._writers = set()
+
+    def _tcp_address(self):
+        host, _, port = self.address.rpartition(':')
+        return (host or '127.0.0.1', int(port)) if port.isdigit() else None
+
+    async def start(self):
+        tcp = self._tcp_address()
+        if tcp is not None:
+            self._server = await asyncio.start_server(self._handle, *tcp)
+        else:
+            if os.path.exists(self.address):
+                # Egy korábbi futás ottmaradt socket fájlja
+                os.unlink(self.address)
+            self._server = await asyncio.start_unix_server(self._handle, path=self.address)
+        self.tracker.add_listener(self.publish)
+        return self
+
+    async def _handle(self, reader, writer):
+        for event in self.tracker.snapshot():
+            writer.write(_encode(event))
+        self._writers.add(writer)
+        try:
+            # A kliens nem küld semmit; az olvasás csak a bontást jelzi
+            while await reader.read(1024):
+                pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def publish(self, event):
+        line = _encode(event)
+        for writer in list(self._writers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > self.max_buffer:
+                self._writers.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+
+    def __len__(self):
+        return len(self._writers)
+
+    async def close(self):
+        self.tracker.remove_listener(self.publish)
+        for writer in list(self._writers):
+            writer.close()
+        self._writers.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._tcp_address() is None and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+def _encode(event):
+    return (json.dumps(event, ensure_ascii=False) + '\n').encode()
+
+
+class PresenceDaemon:
+    """A közös keresési folyamat futtatása és a tracker időzített lekérdezése
+
+    Kereső adapterenként egy BLE hallgató és (ha van klasszikus háttér) egy
+    folyamatos, RSSI-s inquiry fut; a tracker tick másodpercenként, illetve a
+    legközelebbi lejáratkor kerül lekérdezésre.
+    """
+
+    def __init__(self, tracker, adapters=default_adapters, transports=(BLE, CLASSIC), tick=0.5):
+        self.tracker = tracker
+        self.adapters = adapters
+        self.transports = transports
+        self.tick = tick
+        self._stop = None
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self, duration=None):
+        """Futás duration másodpercig vagy stop()-ig"""
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        stop_flag = threading.Event()
+        use_ble = BLE in self.transports and default_transports.get('bleak').usable(DISCOVER, BLE)
+        use_classic = CLASSIC in self.transports and default_transports.get('pybluez').usable(DISCOVER, CLASSIC)
+        if not use_ble and not use_classic:
+            raise RuntimeError(f"{default_transports.unavailable_reason(DISCOVER, BLE)}; "
+                               f"{default_transports.unavailable_reason(DISCOVER, CLASSIC)}")
+        ble_adapters, classic_adapter = self.adapters.scan_plan(use_ble, use_classic)
+        sources = [asyncio.ensure_future(ble_rssi_source(self.tracker, self._stop, adapter))
+                   for adapter in ble_adapters]
+        if classic_adapter is not None:
+            # Az inquiry_rssi_source határidőig ismétli az inquiry-t; végtelen futásnál egy távoli határidő
+            inquiry_seconds = duration if duration is not None else 365 * 24 * 3600
+            sources.append(loop.run_in_executor(None, inquiry_rssi_source, self.tracker, inquiry_seconds,
+                                                stop_flag, classic_adapter, PRESENCE_INQUIRY_UNITS))
+        deadline = None if duration is None else time.monotonic() + duration
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                self.tracker.poll(now)
+                for source in sources:
+                    if source.done():
+                        # A forrás hibája itt derül ki
+                        source.result()
+                wait = self.tick
+                next_deadline = self.tracker.next_deadline()
+                if next_deadline is not None:
+                    wait = min(wait, max(0.0, next_deadline - now))
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                try:
+                    await asyncio.wait_for(self._stop.wait(), max(wait, 0.01))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._stop.set()
+            stop_flag.set()
+            await asyncio.gather(*sources, return_exceptions=True)
+            self.tracker.poll()
@@ -0,0 +1,326 @@
+"""Pufferelt, keretezett, nagy áteresztőképességű adatcsatorna RFCOMM socketekhez
+
+Nem blokkoló küldés/fogadás az eseményhurkon, előre lefoglalt fogadó puffer
+(recv_into), cserélhető keretezés, írás-összevonás és sendfile-szerű
+tömeges átvitel. Bármilyen socket-szerű objektummal működik, így egy helyi
+socketpair-rel is kipróbálható.
+"""
+import asyncio
+import errno
+import os
+import socket
+import struct
+import time
+
+from traffic_log import capture
+
+
+class RawFraming:
+    """Keretezés nélküli mód: minden beérkezett adatdarab egy üzenet"""
+
+    def encode(self, payload):
+        return payload
+
+    def decode(self, buffer, start, end):
+        if start == end:
+            return None, 0
+        return bytes(buffer[start:end]), end - start
+
+
+class LengthPrefixFraming:
+    """Hossz-előtagos keretezés (big-endian, 2 vagy 4 bájtos fejléc)"""
+
+    def __init__(self, header_size=4, max_frame=16 * 1024 * 1024):
+        self._header = struct.Struct('>H' if header_size == 2 else '>I')
+        self.max_frame = max_frame
+
+    def encode(self, payload):
+        if len(payload) > self.max_frame:
+            raise ValueError(f"Túl nagy üzenet: {len(payload)} bájt")
+        return self._header.pack(len(payload)) + payload
+
+    def decode(self, buffer, start, end):
+        header_size = self._header.size
+        if end - start < header_size:
+            return None, 0
+        (length,) = self._header.unpack_from(buffer, start)
+        if length > self.max_frame:
+            raise ValueError(f"Érvénytelen kerethossz: {length} bájt")
+        if end - start < header_size + length:
+            return None, 0
+        return bytes(buffer[start + header_size:start + header_size + length]), header_size + length
+
+
+class DelimiterFraming:
+    """Elválasztó karakteres keretezés (alapértelmezés: sorvége)"""
+
+    def __init__(self, delimiter=b'\n', max_frame=1024 * 1024):
+        self.delimiter = delimiter
+        self.max_frame = max_frame
+
+    def encode(self, payload):
+        return payload + self.delimiter
+
+    def decode(self, buffer, start, end):
+        # Közvetlen keresés a fogadó pufferben, másolás nélkül
+        index = buffer.find(self.delimiter, start, end)
+        if index < 0:
+            if end - start > self.max_frame:
+                raise ValueError(f"Túl hosszú sor: több mint {self.max_frame} bájt")
+            return None, 0
+        return bytes(buffer[start:index]), index - start + len(self.delimiter)
+
+
+FRAMINGS = {
+    'raw': RawFraming,
+    'length': LengthPrefixFraming,
+    'line': DelimiterFraming,
+}
+
+
+def make_framing(name):
+    """Keretezés példányosítása név alapján ('raw', 'length', 'line')"""
+    try:
+        return FRAMINGS[name]()
+    except KeyError:
+        raise ValueError(f"Ismeretlen keretezés: {name}") from None
+
+
+_WOULD_BLOCK = (errno.EAGAIN, errno.EWOULDBLOCK)
+
+
+def _would_block(error):
+    """A PyBluez az EAGAIN-t BluetoothError-ként adja, régebben csak szöveges üzenettel"""
+    if isinstance(error, BlockingIOError):
+        return True
+    if getattr(error, 'errno', None) in _WOULD_BLOCK:
+        return True
+    return 'temporarily unavailable' in str(error).lower()
+
+
+def _native_socket(sock):
+    """Valódi socket.socket a fájlleíró másolatán; None, ha a platformon ez nem lehetséges
+
+    A PyBluez BluetoothSocket nem socket.socket, a nem blokkoló hívásai
+    az EAGAIN-t BluetoothError-ként jelzik, amit az eseményhurok sock_*
+    metódusai nem ismernek fel. Linuxon a socket modul ismeri az
+    AF_BLUETOOTH családot, így a leíróból natív socket készülhet.
+    """
+    try:
+        fd = os.dup(sock.fileno())
+    except (AttributeError, TypeError, OSError):
+        return None
+    try:
+        return socket.socket(fileno=fd)
+    except (OSError, ValueError):
+        os.close(fd)
+        return None
+
+
+class _SocketAdapter:
+    """Socket-szerű objektumok illesztése, ha natív socket nem készíthető (pl. Windowsos PyBluez)
+
+    A recv_into hiányát pótolja, és az EAGAIN-t jelentő hibákat
+    BlockingIOError-rá alakítja, hogy az eseményhurok újrapróbálja a hívást.
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+
+    def recv_into(self, buffer, nbytes=0):
+        try:
+            if hasattr(self._sock, 'recv_into'):
+                return self._sock.recv_into(buffer, nbytes)
+            data = self._sock.recv(nbytes or len(buffer))
+        except OSError as e:
+            if _would_block(e):
+                raise BlockingIOError(errno.EAGAIN, str(e)) from None
+            raise
+        buffer[:len(data)] = data
+        return len(data)
+
+    def send(self, data):
+        try:
+            return self._sock.send(data)
+        except OSError as e:
+            if _would_block(e):
+                raise BlockingIOError(errno.EAGAIN, str(e)) from None
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+class RfcommStream:
+    """Keretezett adatfolyam egy socket fölött az eseményhurkon
+
+    Az írások egy pufferbe kerülnek, és a háttérben futó küldő egyetlen
+    sock_sendall hívással viszi át az addig összegyűlt adatot.
+    """
+
+    def __init__(self, sock, framing=None, buffer_size=64 * 1024, high_water=256 * 1024, address=None):
+        # Az eredeti objektum a lezárásig megmarad, a natív másolattal együtt zárjuk
+        self._owner = None
+        if not isinstance(sock, socket.socket):
+            native = _native_socket(sock)
+            if native is not None:
+                self._owner, sock = sock, native
+            else:
+                sock = _SocketAdapter(sock)
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.framing = framing or RawFraming()
+        # A forgalom rögzítéséhez (traffic_log.capture)
+        self.address = address
+        self.high_water = high_water
+        self._loop = asyncio.get_running_loop()
+        self._rbuf = bytearray(buffer_size)
+        self._rstart = 0
+        self._rend = 0
+        self._eof = False
+        self._wbuf = bytearray()
+        self._write_event = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._write_error = None
+        self._writer = asyncio.ensure_future(self._write_loop())
+        self.stats = {'bytes_sent': 0, 'bytes_received': 0, 'frames_sent': 0, 'frames_received': 0,
+                      'send_calls': 0, 'recv_calls': 0}
+
+    # --- Fogadás ---
+
+    async def recv_into(self, buffer):
+        """Nyers adat olvasása a hívó által lefoglalt pufferbe; 0 a kapcsolat végén
+
+        Ha a belső pufferben már van adat, azt adja vissza először.
+        """
+        view = memoryview(buffer)
+        buffered = self._rend - self._rstart
+        if buffered:
+            n = min(buffered, len(view))
+            view[:n] = self._rbuf[self._rstart:self._rstart + n]
+            self._rstart += n
+            return n
+        n = await self._loop.sock_recv_into(self.sock, view)
+        self.stats['recv_calls'] += 1
+        self.stats['bytes_received'] += n
+        if n and capture.enabled:
+            capture.rfcomm(self.address, view[:n])
+        return n
+
+    async def recv_frame(self):
+        """A következő teljes üzenet; None, ha a kapcsolat lezárult"""
+        while True:
+            frame, consumed = self.framing.decode(self._rbuf, self._rstart, self._rend)
+            if frame is not None:
+                self._rstart += consumed
+                if self._rstart == self._rend:
+                    self._rstart = self._rend = 0
+                self.stats['frames_received'] += 1
+                return frame
+            if self._eof:
+                return None
+            await self._fill()
+
+    async def _fill(self):
+        # Helycsinálás: a fel nem dolgozott adat a puffer elejére kerül, szükség esetén a puffer nő
+        if self._rend == len(self._rbuf):
+            pending = self._rend - self._rstart
+            if self._rstart:
+                self._rbuf[:pending] = self._rbuf[self._rstart:self._rend]
+            else:
+                self._rbuf.extend(bytes(len(self._rbuf)))
+            self._rstart, self._rend = 0, pending
+        view = memoryview(self._rbuf)[self._rend:]
+        n = await self._loop.sock_recv_into(self.sock, view)
+        self.stats['recv_calls'] += 1
+        if n == 0:
+            self._eof = True
+            return
+        if capture.enabled:
+            capture.rfcomm(self.address, view[:n])
+        self._rend += n
+        self.stats['bytes_received'] += n
+
+    # --- Küldés ---
+
+    def write(self, data):
+        """Adat sorba állítása küldésre (összevonva a többi írással)"""
+        if self._write_error is not None:
+            raise self._write_error
+        self._wbuf += data
+        self._idle.clear()
+        self._write_event.set()
+
+    def write_frame(self, payload):
+        self.write(self.framing.encode(payload))
+        self.stats['frames_sent'] += 1
+
+    async def send_frame(self, payload):
+        """Üzenet küldése; túl sok várakozó adat esetén megvárja a kiürülést"""
+        self.write_frame(payload)
+        if len(self._wbuf) >= self.high_water:
+            await self.drain()
+
+    async def drain(self):
+        """Várakozás, amíg minden sorba állított adat kimegy"""
+        await self._idle.wait()
+        if self._write_error is not None:
+            raise self._write_error
+
+    async def _write_loop(self):
+        try:
+            while True:
+                await self._write_event.wait()
+                self._write_event.clear()
+                while self._wbuf:
+                    # Pufferek cseréje: az újabb írások már az új pufferbe kerülnek
+                    data, self._wbuf = self._wbuf, bytearray()
+                    await self._loop.sock_sendall(self.sock, data)
+                    if capture.enabled:
+                        capture.rfcomm(self.address, data, outgoing=True)
+                    self.stats['send_calls'] += 1
+                    self.stats['bytes_sent'] += len(data)
+                self._idle.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._write_error = e
+            self._idle.set()
+
+    async def sendfile(self, file, chunk_size=64 * 1024):
+        """Fájl tömeges átvitele előre lefoglalt pufferrel; az elért átviteli sebességet adja vissza"""
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        total = 0
+        start_time = time.monotonic()
+        while True:
+            n = file.readinto(buffer)
+            if not n:
+                break
+            # A write() átmásolja az adatot, így a puffer azonnal újra tölthető
+            self.write(view[:n])
+            total += n
+            if len(self._wbuf) >= self.high_water:
+                await self.drain()
+        await self.drain()
+        elapsed = time.monotonic() - start_time
+        return {
+            'bytes': total,
+            'seconds': elapsed,
+            'throughput': total / elapsed if elapsed > 0 else float('inf')
+        }
+
+    async def close(self):
+        """Kiürítés, majd a socket lezárása"""
+        try:
+            if self._write_error is None:
+                await asyncio.wait_for(self.drain(), 5.0)
+        except (asyncio.TimeoutError, OSError):
+            pass
+        finally:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self.sock.close()
+            if self._owner is not None:
+                self._owner.close()
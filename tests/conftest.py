@@ -0,0 +1,5 @@
+import os
+import sys
+
+# A modulok a tároló gyökerében vannak (nincs csomag)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,74 @@
+import struct
+import types
+import uuid
+
+from advertisement import AdvertisementPipeline, decode_eddystone, decode_ibeacon, short_uuid
+
+EDDYSTONE_UUID = '0000feaa-0000-1000-8000-00805f9b34fb'
+
+
+def device(address='AA:BB:CC:DD:EE:FF', name=None):
+    return types.SimpleNamespace(address=address, name=name, metadata={})
+
+
+def advert_data(rssi=-60, name='tag', manufacturer_data=None, service_data=None, tx_power=None):
+    return types.SimpleNamespace(rssi=rssi, local_name=name, manufacturer_data=manufacturer_data or {},
+                                 service_data=service_data or {}, service_uuids=[], tx_power=tx_power)
+
+
+def test_eddystone_tlm_counters_are_unsigned():
+    frame = b'\x20\x00' + struct.pack('>HhLL', 3000, 25 * 256, 0xFFFFFFF0, 0x80000000)
+    decoded = decode_eddystone(frame)
+    assert decoded['battery_mv'] == 3000
+    assert decoded['temperature'] == 25.0
+    assert decoded['adv_count'] == 0xFFFFFFF0
+    assert decoded['uptime'] == 0x80000000 / 10
+
+
+def test_eddystone_url_and_uid():
+    url = decode_eddystone(b'\x10\xeb\x03example\x07')
+    assert url == {'format': 'eddystone-url', 'tx_power': -21, 'url': 'https://example.com'}
+    uid = decode_eddystone(b'\x00\xeb' + bytes(range(10)) + bytes(range(6)))
+    assert uid['namespace'] == bytes(range(10)).hex()
+    assert uid['instance'] == bytes(range(6)).hex()
+    assert decode_eddystone(b'\x10\xeb\x09') is None
+
+
+def test_ibeacon():
+    beacon_uuid = uuid.uuid4()
+    data = b'\x02\x15' + beacon_uuid.bytes + struct.pack('>HHb', 1, 2, -59)
+    assert decode_ibeacon(data) == {'format': 'ibeacon', 'uuid': str(beacon_uuid),
+                                    'major': 1, 'minor': 2, 'measured_power': -59}
+    assert decode_ibeacon(data[:-1]) is None
+    assert short_uuid(EDDYSTONE_UUID) == 0xFEAA
+
+
+def test_pipeline_drops_repeated_payloads():
+    delivered = []
+    pipeline = AdvertisementPipeline(lambda adverts: delivered.append([(a.address, a.changes) for a in adverts]))
+    tlm = b'\x20\x00' + struct.pack('>HhLL', 3000, 0, 1, 1)
+    for _ in range(3):
+        pipeline.feed(device(), advert_data(service_data={EDDYSTONE_UUID: tlm}))
+    pipeline.flush()
+    # Változatlan teher, 1 dB-es RSSI ingadozás: nincs továbbadás, nincs újra dekódolás
+    pipeline.feed(device(), advert_data(rssi=-61, service_data={EDDYSTONE_UUID: tlm}))
+    pipeline.flush()
+    assert delivered == [[('AA:BB:CC:DD:EE:FF', frozenset({'new', 'payload', 'rssi'}))]]
+    assert pipeline.stats() == {'received': 4, 'duplicates': 3, 'decoded': 1, 'devices': 1}
+    assert pipeline.get('AA:BB:CC:DD:EE:FF').service_data[0].decoded['format'] == 'eddystone-tlm'
+
+
+def test_pipeline_forwards_payload_and_rssi_changes():
+    delivered = []
+    pipeline = AdvertisementPipeline(lambda adverts: delivered.extend(a.changes for a in adverts), rssi_delta=3)
+    pipeline.feed(device(), advert_data(rssi=-60))
+    pipeline.flush()
+    pipeline.feed(device(), advert_data(rssi=-65))
+    pipeline.flush()
+    pipeline.feed(device(), advert_data(rssi=-65, name='renamed'))
+    pipeline.flush()
+    pipeline.feed(device(), advert_data(rssi=-65, name='renamed'))
+    pipeline.flush(final=True)
+    assert delivered == [frozenset({'new', 'payload', 'rssi'}), frozenset({'rssi'}),
+                         frozenset({'payload'}), frozenset({'seen'})]
+    assert pipeline.get('AA:BB:CC:DD:EE:FF').local_name == 'renamed'
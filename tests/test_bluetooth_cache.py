@@ -0,0 +1,50 @@
+import json
+import os
+import time
+
+from bluetooth_cache import DeviceCache
+
+
+def test_update_is_deferred_until_flush(tmp_path):
+    path = tmp_path / 'cache.json'
+    cache = DeviceCache(str(path), flush_interval=60.0)
+    for channel in range(1, 20):
+        cache.update('aa-bb-cc-dd-ee-ff', rfcomm_channel=channel)
+    assert not path.exists()
+    cache.flush()
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['entries'][0][0] == 'AA:BB:CC:DD:EE:FF'
+    assert data['entries'][0][1]['rfcomm_channel']['value'] == 19
+    cache.close()
+
+
+def test_close_writes_pending_changes(tmp_path):
+    path = tmp_path / 'cache.json'
+    cache = DeviceCache(str(path), flush_interval=60.0)
+    cache.update('AA:BB:CC:DD:EE:FF', name='phone')
+    cache.close()
+    assert DeviceCache(str(path)).get('AA:BB:CC:DD:EE:FF', 'name') == 'phone'
+    # Csak a célfájl marad, ideiglenes fájl nem
+    assert os.listdir(tmp_path) == ['cache.json']
+
+
+def test_timer_flushes_dirty_cache(tmp_path):
+    path = tmp_path / 'cache.json'
+    cache = DeviceCache(str(path), flush_interval=0.05)
+    cache.update('AA:BB:CC:DD:EE:FF', name='phone')
+    end_time = time.monotonic() + 5.0
+    while not path.exists() and time.monotonic() < end_time:
+        time.sleep(0.01)
+    assert DeviceCache(str(path)).get('AA:BB:CC:DD:EE:FF', 'name') == 'phone'
+    cache.close()
+
+
+def test_failed_save_keeps_cache_dirty(tmp_path):
+    path = tmp_path / 'missing' / 'cache.json'
+    cache = DeviceCache(str(path), flush_interval=60.0)
+    cache.update('AA:BB:CC:DD:EE:FF', name='phone')
+    cache.flush()
+    assert not path.exists()
+    os.mkdir(tmp_path / 'missing')
+    cache.close()
+    assert DeviceCache(str(path)).get('AA:BB:CC:DD:EE:FF', 'name') == 'phone'
@@ -0,0 +1,60 @@
+import os
+import select
+
+import pytest
+
+from traffic_log import ReplayData, TrafficLog, TrafficRecorder, make_replay_bluetooth_module
+
+
+@pytest.fixture
+def replay_module(tmp_path):
+    path = str(tmp_path / 'traffic.btlog')
+    recorder = TrafficRecorder()
+    recorder.open(path)
+    recorder.inquiry('AA:BB:CC:DD:EE:01', 'phone', -50, 0x5A020C)
+    recorder.inquiry('AA:BB:CC:DD:EE:02', None, -70, None)
+    recorder.connect('AA:BB:CC:DD:EE:01', 'classic', True, 0.01, channel=5)
+    recorder.close()
+    log = TrafficLog(path)
+    yield make_replay_bluetooth_module(ReplayData(log, speed=0))
+    log.close()
+
+
+def run_inquiry(discoverer):
+    found = []
+    done = []
+    discoverer.device_discovered = lambda address, device_class, rssi, name: found.append((address, rssi, name))
+    discoverer.inquiry_complete = lambda: done.append(True)
+    discoverer.find_devices(duration=1)
+    while not done:
+        assert select.select([discoverer], [], [], 2.0)[0]
+        discoverer.process_event()
+    return found
+
+
+def test_discoverer_reports_recorded_inquiry(replay_module):
+    discoverer = replay_module.DeviceDiscoverer()
+    assert run_inquiry(discoverer) == [('AA:BB:CC:DD:EE:01', -50, 'phone'), ('AA:BB:CC:DD:EE:02', -70, None)]
+    # Ugyanaz a példány újra használható
+    assert len(run_inquiry(discoverer)) == 2
+    discoverer.close()
+
+
+def test_discoverer_pipe_closed(replay_module):
+    discoverer = replay_module.DeviceDiscoverer()
+    read_fd = discoverer.fileno()
+    discoverer.close()
+    with pytest.raises(OSError):
+        os.fstat(read_fd)
+
+    discoverer = replay_module.DeviceDiscoverer()
+    read_fd = discoverer.fileno()
+    del discoverer
+    with pytest.raises(OSError):
+        os.fstat(read_fd)
+
+
+def test_find_service_uses_recorded_channels(replay_module):
+    records = replay_module.find_service(address='AA:BB:CC:DD:EE:01')
+    assert [(r['protocol'], r['port']) for r in records] == [('RFCOMM', 5)]
+    assert issubclass(replay_module.btcommon.BluetoothError, OSError)
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import bluetooth_transports
+from bluetooth_fakes import make_fake_bluetooth_module
+from bluetooth_transports import (BLE, CLASSIC, DISCOVER, SERVICES, BleakTransport, LightblueTransport,
+                                  PyBluezTransport, Transport, TransportSelector)
+
+
+def test_transport_requires_all_operations():
+    class Partial(Transport):
+        async def connect(self, address, cache=None, adapter=None, **kwargs):
+            return None
+
+    with pytest.raises(TypeError):
+        Transport()
+    with pytest.raises(TypeError):
+        Partial()
+    for cls in (BleakTransport, PyBluezTransport, LightblueTransport):
+        cls()
+
+
+def test_bleak_discover_sync_runs_in_executor():
+    transport = BleakTransport()
+
+    async def discover(duration, adapter=None):
+        await asyncio.sleep(0)
+        return [('AA:BB:CC:DD:EE:FF', 'le-device')]
+
+    transport.discover = discover
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, transport.discover_sync, 1.0, None)
+
+    assert asyncio.run(run()) == [('AA:BB:CC:DD:EE:FF', 'le-device')]
+
+
+def test_select_reports_missing_backend():
+    selector = TransportSelector([BleakTransport()])
+    assert selector.select(SERVICES, CLASSIC) is None
+    assert selector.unavailable_reason(SERVICES, CLASSIC) == f"Nincs {CLASSIC} {SERVICES} képességű háttér"
+    assert selector.candidates(DISCOVER, BLE)
+
+
+def fake_pybluez(addresses, interval=0.01):
+    def inquiry(duration, cancel):
+        while not cancel.is_set():
+            for address in addresses:
+                yield address, 0x5A020C, -60, f"name-{address[-2:]}"
+                time.sleep(interval)
+
+    return make_fake_bluetooth_module(None, None, inquiry, lambda address: [], lambda address, timeout=10: None)
+
+
+def test_pybluez_inquiry_reports_each_address_once_and_stops(monkeypatch):
+    monkeypatch.setattr(bluetooth_transports, 'bluetooth', fake_pybluez(['AA:00:00:00:00:01', 'AA:00:00:00:00:02']))
+    stop_flag = threading.Event()
+    found = []
+
+    def on_found(address, name):
+        found.append((address, name))
+        if len(found) == 2:
+            stop_flag.set()
+
+    start_time = time.monotonic()
+    PyBluezTransport().inquiry_sync(10.0, on_found, stop_flag)
+    assert time.monotonic() - start_time < 2.0
+    assert found == [('AA:00:00:00:00:01', 'name-01'), ('AA:00:00:00:00:02', 'name-02')]
+
+
+def test_default_inquiry_uses_discover_sync():
+    class Listed(LightblueTransport):
+        def discover_sync(self, duration, adapter=None):
+            return [('AA:00:00:00:00:01', 'one'), ('AA:00:00:00:00:02', None)]
+
+    found = []
+    Listed().inquiry_sync(1.0, lambda address, name: found.append(address), threading.Event())
+    assert found == ['AA:00:00:00:00:01', 'AA:00:00:00:00:02']
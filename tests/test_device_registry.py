@@ -0,0 +1,63 @@
+import types
+
+from device_registry import BLE, CLASSIC, DeviceRegistry
+
+
+def ble(address, name=None, rssi=None):
+    return types.SimpleNamespace(address=address, name=name, rssi=rssi)
+
+
+def test_ble_and_classic_sightings_merge():
+    registry = DeviceRegistry()
+    assert registry.observe_ble(ble('aa-bb-cc-dd-ee-ff', 'Ph', -60), timestamp=1.0)
+    assert registry.observe_classic('AA:BB:CC:DD:EE:FF', name='Phone', device_class=0x5A020C, timestamp=2.0)
+    # Ismételt, változatlan észlelés nem számít változásnak
+    assert not registry.observe_classic('AA:BB:CC:DD:EE:FF', name='Phone', timestamp=3.0)
+    record = registry.get('aa:bb:cc:dd:ee:ff')
+    assert len(registry) == 1 and 'AA-BB-CC-DD-EE-FF' in registry
+    assert record.type == 'BLE + Classic'
+    assert record.name == 'Phone'
+    assert record.sightings == 3
+    assert (record.first_seen, record.last_seen) == (1.0, 3.0)
+    assert registry.counts() == {BLE: 1, CLASSIC: 1, 'total': 1}
+
+
+def test_strongest_uses_smoothed_rssi_with_hysteresis():
+    registry = DeviceRegistry(rssi_alpha=0.5)
+    registry.observe_ble(ble('AA:00:00:00:00:01', rssi=-40))
+    registry.observe_ble(ble('AA:00:00:00:00:02', rssi=-70))
+    registry.observe_classic('AA:00:00:00:00:03', rssi=-55)
+    assert [r.address[-2:] for r in registry.strongest()] == ['01', '03', '02']
+    assert [r.address[-2:] for r in registry.strongest(limit=1)] == ['01']
+    assert [r.address[-2:] for r in registry.strongest(min_rssi=-55)] == ['01', '03']
+    # 1 dB-es átlagváltozás nem rendezi át az indexet, a nagy változás igen
+    registry.observe_ble(ble('AA:00:00:00:00:03', rssi=-57))
+    assert registry.get('AA:00:00:00:00:03')._indexed_rssi == -55
+    for _ in range(4):
+        registry.observe_ble(ble('AA:00:00:00:00:02', rssi=-20))
+    assert [r.address[-2:] for r in registry.strongest()] == ['02', '01', '03']
+
+
+def test_devices_filters_by_transport_and_time():
+    registry = DeviceRegistry()
+    registry.observe_ble(ble('AA:00:00:00:00:01'), timestamp=1.0)
+    registry.observe_classic('AA:00:00:00:00:02', timestamp=5.0)
+    assert [r.address for r in registry.devices()] == ['AA:00:00:00:00:01', 'AA:00:00:00:00:02']
+    assert [r.address for r in registry.devices(CLASSIC)] == ['AA:00:00:00:00:02']
+    assert [r.address for r in registry.devices(since=2.0)] == ['AA:00:00:00:00:02']
+
+
+def test_observe_advertisement_counts_raw_sightings():
+    registry = DeviceRegistry()
+    advert = types.SimpleNamespace(address='AA:00:00:00:00:01', rssi=-50, changes=frozenset({'new', 'payload', 'rssi'}),
+                                   last_seen=1.0, raw_count=4, device=None, local_name='tag')
+    assert registry.observe_advertisement(advert)
+    advert.changes = frozenset({'seen'})
+    advert.raw_count = 2
+    advert.rssi = -90
+    assert not registry.observe_advertisement(advert)
+    record = registry.get('AA:00:00:00:00:01')
+    assert record.sightings == 6
+    # Csak a továbbadott RSSI változás frissít
+    assert record.rssi == -50
+    assert record.advertisement is advert
@@ -0,0 +1,36 @@
+from gatt_engine import NotificationRing
+
+
+def test_popped_batch_survives_later_pushes():
+    ring = NotificationRing(slots=2, slot_size=4)
+    ring.push(1, b'AAAA', 0.0)
+    ring.push(2, b'BBBB', 0.0)
+    batch = ring.pop_batch(10)
+    ring.push(3, b'CCCC', 0.0)
+    assert [bytes(view) for _, _, view in batch] == [b'AAAA', b'BBBB']
+    # Minden hely a kiadott kötegé volt, így az új értesítés veszett el
+    assert ring.dropped == 1
+    assert ring.pop_batch(10) == []
+
+
+def test_slots_released_on_next_pop():
+    ring = NotificationRing(slots=4, slot_size=4)
+    ring.push(1, b'AAAA', 0.0)
+    ring.push(2, b'BBBB', 0.0)
+    first = ring.pop_batch(1)
+    ring.push(3, b'CCCC', 0.0)
+    assert bytes(first[0][2]) == b'AAAA'
+    second = ring.pop_batch(10)
+    ring.push(4, b'DDDD', 0.0)
+    ring.push(5, b'EEEE', 0.0)
+    assert [bytes(view) for _, _, view in second] == [b'BBBB', b'CCCC']
+    assert [key for key, _, _ in ring.pop_batch(10)] == [4, 5]
+    assert ring.dropped == 0
+
+
+def test_overflow_drops_oldest_unread():
+    ring = NotificationRing(slots=2, slot_size=4)
+    for key, data in ((1, b'AAAA'), (2, b'BBBB'), (3, b'CCCC')):
+        ring.push(key, data, 0.0)
+    assert ring.dropped == 1
+    assert [bytes(view) for _, _, view in ring.pop_batch(10)] == [b'BBBB', b'CCCC']
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import socket
+import stat
+
+from host_scanner import HostScanner
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def start_stub():
+    async def handle(reader, writer):
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_open_port_found():
+    async def run():
+        server, port = await start_stub()
+        closed = free_port()
+        scanner = HostScanner(backend='connect', shards=2)
+        seen = []
+        async with server:
+            result = await scanner.scan_all('127.0.0.1', [port, closed], deadline=5.0, on_port=seen.append)
+        return port, closed, scanner, seen, result
+
+    port, closed, scanner, seen, result = asyncio.run(run())
+    assert [item['port'] for item in result['open_ports']] == [port]
+    assert [item['port'] for item in seen] == [port]
+    assert result['complete'] and result['scanned'] == 2
+    assert scanner.cache.entry('127.0.0.1', closed)['state'] == 'closed'
+
+
+def test_rescan_skips_cached_closed_ports():
+    async def run():
+        server, port = await start_stub()
+        closed = free_port()
+        scanner = HostScanner(backend='connect', shards=2)
+        async with server:
+            await scanner.scan_all('127.0.0.1', [port, closed], deadline=5.0)
+            return port, await scanner.scan_all('127.0.0.1', [port, closed], deadline=5.0)
+
+    port, result = asyncio.run(run())
+    assert result['scanned'] == 1 and result['skipped'] == 1
+    assert [item['port'] for item in result['open_ports']] == [port]
+
+
+def test_port_disappears_after_server_closes():
+    async def run():
+        server, port = await start_stub()
+        scanner = HostScanner(backend='connect')
+        first = await scanner.scan_all('127.0.0.1', [port], deadline=5.0)
+        server.close()
+        await server.wait_closed()
+        second = await scanner.scan_all('127.0.0.1', [port], deadline=5.0)
+        return port, scanner, first, second
+
+    port, scanner, first, second = asyncio.run(run())
+    assert [item['port'] for item in first['open_ports']] == [port]
+    # A nyitott portot mindig újraellenőrizzük, így a bezárás azonnal látszik
+    assert second['scanned'] == 1
+    assert second['open_ports'] == []
+    assert scanner.cache.open_ports('127.0.0.1') == []
+
+
+def fake_nmap(tmp_path, monkeypatch, script):
+    path = tmp_path / 'nmap'
+    path.write_text('#!/bin/sh\n' + script)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv('PATH', str(tmp_path) + os.pathsep + os.environ.get('PATH', ''))
+
+
+def test_nmap_reports_each_port_once(tmp_path, monkeypatch):
+    fake_nmap(tmp_path, monkeypatch,
+              "echo 'Discovered open port 22/tcp on 10.0.0.1'\n"
+              "echo '22/tcp open  ssh  OpenSSH 9.6'\n")
+    scanner = HostScanner(backend='nmap', shards=1)
+    seen = []
+    result = asyncio.run(scanner.scan_all('10.0.0.1', [22, 80], deadline=5.0, on_port=seen.append))
+    assert [item['port'] for item in seen] == [22]
+    assert result['open_ports'][0]['service'] == 'ssh'
+    assert result['open_ports'][0]['version'] == 'OpenSSH 9.6'
+    assert scanner.cache.entry('10.0.0.1', 80)['state'] == 'closed'
+
+
+def test_nmap_failure_is_reported(tmp_path, monkeypatch):
+    fake_nmap(tmp_path, monkeypatch,
+              "echo 'You requested a scan type which requires root privileges.' >&2\n"
+              "exit 1\n")
+    scanner = HostScanner(backend='nmap', shards=1)
+    result = asyncio.run(scanner.scan_all('10.0.0.1', [22, 80], deadline=5.0))
+    assert not result['complete']
+    assert 'root privileges' in result['errors'][0]
+    # A sikertelen futás portjai nem kerülnek zártként a gyorsítótárba
+    assert scanner.cache.entry('10.0.0.1', 80) is None
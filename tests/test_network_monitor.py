@@ -0,0 +1,32 @@
+from network_monitor import parse_netsh_interfaces
+
+NETSH_OUTPUT = """
+There is 1 interface on the system:
+
+    Name                   : Wi-Fi
+    State                  : connected
+    SSID                   : hotspot
+    BSSID                  : 12:34:56:78:9a:bc
+    Radio type             : 802.11ax
+    Band                   : 5 GHz
+    Channel                : 36
+    Receive rate (Mbps)    : 866.7
+    Transmit rate (Mbps)   : 780
+    Signal                 : 87%
+"""
+
+
+def test_radio_type_and_band_are_separate():
+    result = parse_netsh_interfaces(NETSH_OUTPUT)
+    assert result['radio_type'] == '802.11ax'
+    assert result['frequency'] == '5 GHz'
+    assert result['channel'] == '36'
+    assert result['signal'] == 87
+    assert result['rx_rate'] == '866.7'
+
+
+def test_frequency_from_channel_without_band():
+    output = NETSH_OUTPUT.replace("    Band                   : 5 GHz\n", "").replace(": 36", ": 6")
+    result = parse_netsh_interfaces(output)
+    assert result['radio_type'] == '802.11ax'
+    assert result['frequency'] == '2.4 GHz'
@@ -0,0 +1,92 @@
+import pytest
+
+from presence import ARRIVE, DEPART, PresenceTracker
+
+ADDRESS = 'AA:BB:CC:DD:EE:FF'
+
+
+def kinds(events):
+    return [(event['event'], event['address']) for event in events]
+
+
+def test_arrival_needs_sightings_within_window():
+    tracker = PresenceTracker({ADDRESS: 'phone'}, depart_after=30.0, arrive_sightings=3, arrive_window=10.0)
+    tracker.add_sample('aa:bb:cc:dd:ee:ff', -60, timestamp=0.0)
+    tracker.add_sample(ADDRESS, -60, timestamp=5.0)
+    # Az ablakon kívüli észlelés új jelöltséget kezd
+    tracker.add_sample(ADDRESS, -60, timestamp=20.0)
+    assert tracker.poll(now=20.0) == []
+    tracker.add_sample(ADDRESS, -60, timestamp=21.0)
+    tracker.add_sample(ADDRESS, -60, timestamp=22.0)
+    events = tracker.poll(now=22.0)
+    assert kinds(events) == [(ARRIVE, ADDRESS)]
+    assert events[0]['label'] == 'phone'
+    tracker.add_sample('11:22:33:44:55:66', -40, timestamp=23.0)
+    assert tracker.stats() == {'watched': 1, 'present': 1, 'samples': 6, 'scheduled': 1}
+
+
+def test_rssi_hysteresis():
+    tracker = PresenceTracker({ADDRESS: None}, depart_after=10.0, arrive_sightings=1,
+                              arrive_rssi=-60, depart_rssi=-80)
+    tracker.add_sample(ADDRESS, -70, timestamp=0.0)
+    assert tracker.poll(now=0.0) == []
+    tracker.add_sample(ADDRESS, -55, timestamp=1.0)
+    assert kinds(tracker.poll(now=1.0)) == [(ARRIVE, ADDRESS)]
+    # A két küszöb közötti jel életben tartja a jelenlétet, a depart_rssi alatti nem
+    tracker.add_sample(ADDRESS, -75, timestamp=8.0)
+    tracker.add_sample(ADDRESS, -90, timestamp=15.0)
+    assert tracker.poll(now=15.0) == []
+    events = tracker.poll(now=18.0)
+    assert kinds(events) == [(DEPART, ADDRESS)]
+    assert events[0]['present_seconds'] == 7.0
+    assert events[0]['absent_seconds'] == 10.0
+
+
+def test_threshold_order_is_checked():
+    with pytest.raises(ValueError):
+        PresenceTracker(arrive_rssi=-80, depart_rssi=-60)
+
+
+def test_expiry_reschedules_single_heap_entry():
+    tracker = PresenceTracker({ADDRESS: None}, depart_after=10.0, arrive_sightings=1)
+    tracker.add_sample(ADDRESS, -50, timestamp=0.0)
+    tracker.poll(now=0.0)
+    for timestamp in (4.0, 8.0, 12.0):
+        tracker.add_sample(ADDRESS, -50, timestamp=timestamp)
+    assert tracker.stats()['scheduled'] == 1
+    assert tracker.next_deadline() == 10.0
+    # Lejáratkor a közbeni észlelés miatt új határidővel visszakerül
+    assert tracker.poll(now=10.0) == []
+    assert tracker.next_deadline() == 22.0
+    assert tracker.stats()['scheduled'] == 1
+    assert kinds(tracker.poll(now=22.0)) == [(DEPART, ADDRESS)]
+    assert tracker.stats()['scheduled'] == 0
+    assert tracker.present() == []
+
+
+def test_unwatch_while_scheduled():
+    tracker = PresenceTracker({ADDRESS: None}, depart_after=10.0, arrive_sightings=1)
+    tracker.add_sample(ADDRESS, -50, timestamp=0.0)
+    tracker.poll(now=0.0)
+    assert [event['address'] for event in tracker.snapshot()] == [ADDRESS]
+    assert tracker.unwatch(ADDRESS)
+    assert not tracker.unwatch(ADDRESS)
+    assert tracker.snapshot() == []
+    # Újrafelvétel után a régi kupacbejegyzés nem okoz távozást, az új érkezés saját bejegyzést kap
+    tracker.watch(ADDRESS)
+    tracker.add_sample(ADDRESS, -50, timestamp=5.0)
+    assert kinds(tracker.poll(now=5.0)) == [(ARRIVE, ADDRESS)]
+    assert tracker.poll(now=10.0) == []
+    assert tracker.stats()['scheduled'] == 1
+    assert kinds(tracker.poll(now=15.0)) == [(DEPART, ADDRESS)]
+
+
+def test_snapshot_skips_pending_arrivals_and_listeners_get_events():
+    tracker = PresenceTracker({ADDRESS: None}, arrive_sightings=1)
+    received = []
+    tracker.add_listener(received.append)
+    tracker.add_sample(ADDRESS, -50, timestamp=0.0)
+    assert tracker.snapshot() == []
+    tracker.poll(now=0.0)
+    assert kinds(received) == [(ARRIVE, ADDRESS)]
+    assert [event['event'] for event in tracker.snapshot()] == ['present']
@@ -0,0 +1,184 @@
+import asyncio
+import io
+import socket
+
+import pytest
+
+import rfcomm_stream
+from rfcomm_stream import DelimiterFraming, LengthPrefixFraming, RfcommStream
+
+
+class BluetoothError(OSError):
+    pass
+
+
+class FakeBluezSocket:
+    """PyBluez-szerű socket: nincs recv_into, az EAGAIN BluetoothError-ként, csak szövegként jön"""
+
+    def __init__(self, sock):
+        self._sock = sock
+        self.closed = False
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def setblocking(self, flag):
+        self._sock.setblocking(flag)
+
+    def recv(self, nbytes):
+        try:
+            return self._sock.recv(nbytes)
+        except BlockingIOError:
+            raise BluetoothError("(11, 'Resource temporarily unavailable')") from None
+
+    def send(self, data):
+        try:
+            return self._sock.send(data)
+        except BlockingIOError:
+            raise BluetoothError("(11, 'Resource temporarily unavailable')") from None
+
+    def close(self):
+        self.closed = True
+        self._sock.close()
+
+
+async def read_exactly(sock, size):
+    loop = asyncio.get_running_loop()
+    data = bytearray()
+    while len(data) < size:
+        chunk = await loop.sock_recv(sock, size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return bytes(data)
+
+
+@pytest.mark.parametrize('framing', [LengthPrefixFraming(), LengthPrefixFraming(header_size=2), DelimiterFraming()])
+def test_framing_round_trip(framing):
+    async def run():
+        local, remote = socket.socketpair()
+        sender = RfcommStream(local, framing)
+        receiver = RfcommStream(remote, framing)
+        messages = [b'first', b'', b'x' * 5000, b'last']
+        for message in messages:
+            sender.write_frame(message)
+        await sender.drain()
+        received = [await receiver.recv_frame() for _ in messages]
+        await sender.close()
+        assert await receiver.recv_frame() is None
+        await receiver.close()
+        return messages, received
+
+    messages, received = asyncio.run(run())
+    assert received == messages
+
+
+@pytest.mark.parametrize('framing', [LengthPrefixFraming(), DelimiterFraming()])
+def test_frame_split_across_reads(framing):
+    async def run():
+        local, remote = socket.socketpair()
+        remote.setblocking(False)
+        stream = RfcommStream(local, framing, buffer_size=8)
+        encoded = framing.encode(b'split frame payload') + framing.encode(b'next')
+        loop = asyncio.get_running_loop()
+        pending = asyncio.ensure_future(stream.recv_frame())
+        for i in range(0, len(encoded), 3):
+            await loop.sock_sendall(remote, encoded[i:i + 3])
+            await asyncio.sleep(0.01)
+        frames = [await pending, await stream.recv_frame()]
+        calls = stream.stats['recv_calls']
+        remote.close()
+        await stream.close()
+        return frames, calls
+
+    frames, calls = asyncio.run(run())
+    assert frames == [b'split frame payload', b'next']
+    assert calls > 1
+
+
+def test_short_writes_and_drain():
+    async def run():
+        local, remote = socket.socketpair()
+        # Kis küldő puffer: a sock_sendall csak részletekben tud írni
+        local.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        remote.setblocking(False)
+        stream = RfcommStream(local, high_water=16 * 1024)
+        payload = bytes(range(256)) * 4096
+        for i in range(0, len(payload), 1000):
+            stream.write(payload[i:i + 1000])
+        reader = asyncio.ensure_future(read_exactly(remote, len(payload)))
+        await stream.drain()
+        received = await reader
+        stats = dict(stream.stats)
+        await stream.close()
+        remote.close()
+        return payload, received, stats
+
+    payload, received, stats = asyncio.run(run())
+    assert received == payload
+    assert stats['bytes_sent'] == len(payload)
+    # Az írások összevonva mennek ki, nem írásonként egy hívással
+    assert stats['send_calls'] < len(payload) // 1000
+
+
+def test_drain_raises_after_peer_closed():
+    async def run():
+        local, remote = socket.socketpair()
+        remote.close()
+        stream = RfcommStream(local)
+        stream.write(b'x' * 1024)
+        with pytest.raises(OSError):
+            await stream.drain()
+        await stream.close()
+
+    asyncio.run(run())
+
+
+def test_sendfile():
+    async def run():
+        local, remote = socket.socketpair()
+        remote.setblocking(False)
+        stream = RfcommStream(local, high_water=8 * 1024)
+        content = bytes(range(251)) * 1000
+        reader = asyncio.ensure_future(read_exactly(remote, len(content)))
+        result = await stream.sendfile(io.BytesIO(content), chunk_size=4096)
+        received = await reader
+        await stream.close()
+        remote.close()
+        return content, received, result
+
+    content, received, result = asyncio.run(run())
+    assert received == content
+    assert result['bytes'] == len(content)
+    assert result['throughput'] > 0
+
+
+def exchange_over_bluez_socket():
+    async def run():
+        local, remote = socket.socketpair()
+        remote.setblocking(False)
+        fake = FakeBluezSocket(local)
+        stream = RfcommStream(fake, DelimiterFraming())
+        loop = asyncio.get_running_loop()
+        # A fogadás előbb üres socketbe fut, így a nem blokkoló hívás EAGAIN-t kap
+        pending = asyncio.ensure_future(stream.recv_frame())
+        await asyncio.sleep(0.01)
+        await loop.sock_sendall(remote, b'hello\n')
+        frame = await pending
+        stream.write_frame(b'reply')
+        await stream.drain()
+        reply = await read_exactly(remote, 6)
+        await stream.close()
+        remote.close()
+        return frame, reply, fake.closed
+
+    return asyncio.run(run())
+
+
+def test_bluez_socket_wrapped_natively():
+    assert exchange_over_bluez_socket() == (b'hello', b'reply\n', True)
+
+
+def test_bluez_socket_adapter_retries_eagain(monkeypatch):
+    monkeypatch.setattr(rfcomm_stream, '_native_socket', lambda sock: None)
+    assert exchange_over_bluez_socket() == (b'hello', b'reply\n', True)
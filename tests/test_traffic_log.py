@@ -0,0 +1,56 @@
+import types
+
+from traffic_log import RFCOMM, TrafficLog, TrafficRecorder, decode_advert, encode_advert
+
+
+def write_log(path, payloads):
+    recorder = TrafficRecorder()
+    recorder.open(str(path))
+    for payload in payloads:
+        recorder.rfcomm('AA:BB:CC:DD:EE:FF', payload)
+    recorder.close()
+
+
+def test_close_with_live_records(tmp_path):
+    path = tmp_path / 'traffic.btlog'
+    write_log(path, [b'first', b'second'])
+    with TrafficLog(str(path)) as log:
+        for record in log:
+            last = record
+    # A rekord a napló lezárása után is olvasható
+    assert last.type == RFCOMM
+    assert last.address == 'AA:BB:CC:DD:EE:FF'
+    assert last.payload == b'second'
+
+
+def test_records_filter_and_reopen_for_append(tmp_path):
+    path = tmp_path / 'traffic.btlog'
+    write_log(path, [b'one'])
+    write_log(path, [b'two'])
+    with TrafficLog(str(path)) as log:
+        assert log.scan_addresses() == ['AA:BB:CC:DD:EE:FF']
+        assert [record.payload for record in log.records(RFCOMM)] == [b'one', b'two']
+        assert log.summary()['records'] == {'rfcomm': 2}
+
+
+def test_advert_round_trip():
+    device = types.SimpleNamespace(address='AA:BB:CC:DD:EE:FF', name=None, rssi=-70, metadata={})
+    data = types.SimpleNamespace(
+        rssi=-61, local_name='sensor', tx_power=4,
+        manufacturer_data={0x004C: b'\x02\x15' + bytes(21), 0x0059: b''},
+        service_data={'0000feaa-0000-1000-8000-00805F9B34FB': b'\x20\x00' + bytes(12), 'not-a-uuid': b'x'},
+        service_uuids=['0000180f-0000-1000-8000-00805f9b34fb'])
+    decoded = decode_advert(encode_advert(device, data))
+    assert decoded == {
+        'rssi': -61, 'tx_power': 4, 'local_name': 'sensor',
+        'manufacturer_data': {0x004C: b'\x02\x15' + bytes(21), 0x0059: b''},
+        'service_data': {'0000feaa-0000-1000-8000-00805f9b34fb': b'\x20\x00' + bytes(12)},
+        'service_uuids': ['0000180f-0000-1000-8000-00805f9b34fb'],
+    }
+
+
+def test_advert_without_optional_fields():
+    device = types.SimpleNamespace(address='AA:BB:CC:DD:EE:FF', name=None, rssi=None, metadata={})
+    decoded = decode_advert(encode_advert(device, None))
+    assert decoded == {'rssi': None, 'tx_power': None, 'local_name': None, 'manufacturer_data': {},
+                       'service_data': {}, 'service_uuids': []}
@@ -0,0 +1,678 @@
+"""Keresési és kapcsolati forgalom rögzítése tömör bináris naplóba és visszajátszása
+
+Rögzítéskor (capture.open()) a hirdetések, inquiry találatok, kapcsolódási
+kísérletek, RFCOMM és GATT adatok időbélyeggel a napló végére íródnak. A
+naplót a TrafficLog memóriába képezve (mmap) olvassa: a rekordfejeket másolás
+nélkül járja be, és csak a kért rekordok hasznos terhét másolja ki. A
+visszajátszó bleak és bluetooth modulok ugyanazt a forgalmat adják vissza a
+keresésnek, monitorozásnak és kapcsolódásnak valós időben vagy a lehető
+leggyorsabban, így a kritikus útvonalak rádió nélkül mérhetők és tesztelhetők.
+
+Formátum: 8 bájtos fejléc (BTLOG, verzió), majd rekordok. Rekordfej:
+típus (B), jelzők (B), cím index (I), időbélyeg (d), hossz (I), utána a
+hasznos teher. Minden cím egyszer, egy ADDRESS rekordban szerepel szövegesen.
+"""
+import asyncio
+import json
+import mmap
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import types
+import uuid
+
+from advertisement import advertisement_payload
+from bluetooth_fakes import RFCOMM, BluetoothError, make_fake_bluetooth_module
+
+MAGIC = b'BTLOG\x00'
+VERSION = 1
+FILE_HEADER = struct.Struct('<6sBx')
+RECORD_HEADER = struct.Struct('<BBIdI')
+
+# Rekordtípusok
+ADDRESS = 0
+ADVERT = 1
+INQUIRY = 2
+CONNECT = 3
+RFCOMM = 4
+GATT_READ = 5
+GATT_NOTIFY = 6
+GATT_TABLE = 7
+
+# RFCOMM jelző: kimenő adat
+OUTGOING = 1
+
+TRANSPORTS = {'ble': 1, 'classic': 2}
+_NONE_I8 = -128
+_NONE_U32 = 0xFFFFFFFF
+
+_ADVERT_HEAD = struct.Struct('<bbB')
+_MANUFACTURER = struct.Struct('<HH')
+_INQUIRY = struct.Struct('<bIB')
+_CONNECT = struct.Struct('<BBBd')
+_HANDLE = struct.Struct('<H')
+
+
+def _i8(value):
+    return _NONE_I8 if value is None else max(-127, min(127, int(value)))
+
+
+def _uuid_bytes(value):
+    try:
+        return uuid.UUID(str(value)).bytes
+    except ValueError:
+        return None
+
+
+def encode_advert(device, advertisement_data):
+    name, manufacturer_data, service_data, tx_power, service_uuids = advertisement_payload(device, advertisement_data)
+    rssi = getattr(advertisement_data, 'rssi', None)
+    if rssi is None:
+        rssi = getattr(device, 'rssi', None)
+    name = (name or '').encode('utf-8')[:255]
+    parts = [_ADVERT_HEAD.pack(_i8(rssi), _i8(tx_power), len(name)), name,
+             bytes((len(manufacturer_data),))]
+    for company_id, data in manufacturer_data:
+        parts += [_MANUFACTURER.pack(company_id, len(data)), data]
+    service_data = [(_uuid_bytes(u), data) for u, data in service_data]
+    service_data = [(u, data) for u, data in service_data if u is not None]
+    parts.append(bytes((len(service_data),)))
+    for service_uuid, data in service_data:
+        parts += [service_uuid, _HANDLE.pack(len(data)), data]
+    service_uuids = [u for u in (_uuid_bytes(u) for u in service_uuids) if u is not None]
+    parts.append(bytes((len(service_uuids),)))
+    parts += service_uuids
+    return b''.join(parts)
+
+
+def decode_advert(payload):
+    """ADVERT hasznos teher -> szótár (bleak AdvertisementData mezőnevekkel)"""
+    rssi, tx_power, name_length = _ADVERT_HEAD.unpack_from(payload, 0)
+    offset = _ADVERT_HEAD.size
+    name = bytes(payload[offset:offset + name_length]).decode('utf-8', 'replace') or None
+    offset += name_length
+    manufacturer_data = {}
+    for _ in range(payload[offset]):
+        company_id, length = _MANUFACTURER.unpack_from(payload, offset + 1)
+        offset += _MANUFACTURER.size
+        manufacturer_data[company_id] = bytes(payload[offset + 1:offset + 1 + length])
+        offset += length
+    offset += 1
+    service_data = {}
+    for _ in range(payload[offset]):
+        service_uuid = str(uuid.UUID(bytes=bytes(payload[offset + 1:offset + 17])))
+        (length,) = _HANDLE.unpack_from(payload, offset + 17)
+        offset += 18
+        service_data[service_uuid] = bytes(payload[offset + 1:offset + 1 + length])
+        offset += length
+    offset += 1
+    count = payload[offset]
+    service_uuids = [str(uuid.UUID(bytes=bytes(payload[offset + 1 + i * 16:offset + 17 + i * 16])))
+                     for i in range(count)]
+    return {'rssi': None if rssi == _NONE_I8 else rssi, 'tx_power': None if tx_power == _NONE_I8 else tx_power,
+            'local_name': name, 'manufacturer_data': manufacturer_data, 'service_data': service_data,
+            'service_uuids': service_uuids}
+
+
+def decode_inquiry(payload):
+    rssi, device_class, name_length = _INQUIRY.unpack_from(payload, 0)
+    name = bytes(payload[_INQUIRY.size:_INQUIRY.size + name_length]).decode('utf-8', 'replace') or None
+    return {'rssi': None if rssi == _NONE_I8 else rssi,
+            'device_class': None if device_class == _NONE_U32 else device_class, 'name': name}
+
+
+def decode_connect(payload):
+    transport, ok, channel, duration = _CONNECT.unpack_from(payload, 0)
+    return {'transport': 'ble' if transport == 1 else 'classic', 'ok': bool(ok),
+            'channel': channel or None, 'duration': duration}
+
+
+class TrafficRecorder:
+    """Forgalom rögzítése; megnyitás nélkül minden hívás azonnal visszatér
+
+    Bármely szálból hívható (a klasszikus inquiry és RFCOMM próbálkozások külön szálban futnak).
+    """
+
+    def __init__(self):
+        self.path = None
+        self.records = 0
+        self._file = None
+        self._addresses = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def open(self, path):
+        """Rögzítés indítása; létező napló esetén hozzáfűzés"""
+        self.close()
+        addresses = {}
+        if os.path.exists(path) and os.path.getsize(path):
+            with TrafficLog(path) as log:
+                addresses = {address: index for index, address in enumerate(log.scan_addresses())}
+        self._file = open(path, 'ab', buffering=64 * 1024)
+        if not self._file.tell():
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self._addresses = addresses
+        self.path = path
+        self.records = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def _write(self, record_type, address, payload, flags=0, timestamp=None):
+        with self._lock:
+            if self._file is None:
+                return
+            timestamp = time.time() if timestamp is None else timestamp
+            index = self._addresses.get(address)
+            if index is None:
+                index = self._addresses[address] = len(self._addresses)
+                encoded = str(address).encode('utf-8')
+                self._file.write(RECORD_HEADER.pack(ADDRESS, 0, index, timestamp, len(encoded)))
+                self._file.write(encoded)
+            self._file.write(RECORD_HEADER.pack(record_type, flags, index, timestamp, len(payload)))
+            self._file.write(payload)
+            self.records += 1
+
+    def advert(self, device, advertisement_data=None):
+        if self._file is not None:
+            self._write(ADVERT, device.address, encode_advert(device, advertisement_data))
+
+    def inquiry(self, address, name=None, rssi=None, device_class=None):
+        if self._file is not None:
+            name = (name or '').encode('utf-8')[:255]
+            device_class = _NONE_U32 if device_class is None else device_class
+            self._write(INQUIRY, address, _INQUIRY.pack(_i8(rssi), device_class, len(name)) + name)
+
+    def connect(self, address, transport, ok, duration, channel=None):
+        if self._file is not None:
+            self._write(CONNECT, address, _CONNECT.pack(TRANSPORTS[transport], bool(ok), channel or 0, duration))
+
+    def rfcomm(self, address, data, outgoing=False):
+        if self._file is not None:
+            self._write(RFCOMM, address, bytes(data), OUTGOING if outgoing else 0)
+
+    def gatt_read(self, address, handle, data):
+        if self._file is not None and data is not None:
+            self._write(GATT_READ, address, _HANDLE.pack(handle) + bytes(data))
+
+    def gatt_notify(self, address, handle, data):
+        if self._file is not None:
+            self._write(GATT_NOTIFY, address, _HANDLE.pack(handle) + bytes(data))
+
+    def gatt_table(self, address, table):
+        if self._file is not None:
+            self._write(GATT_TABLE, address, json.dumps(table, separators=(',', ':')).encode('utf-8'))
+
+
+class LogRecord:
+    """Egy napló rekord; a payload saját bytes másolat, a napló lezárása után is érvényes"""
+
+    __slots__ = ('type', 'flags', 'address', 'timestamp', 'payload')
+
+    def __init__(self, record_type, flags, address, timestamp, payload):
+        self.type = record_type
+        self.flags = flags
+        self.address = address
+        self.timestamp = timestamp
+        self.payload = payload
+
+
+class TrafficLog:
+    """Napló olvasása memóriába képezve; a rekordok sorban járhatók be
+
+    A hasznos teher kimásolódik, így a kiadott rekordok nem tartják fogva a
+    leképezést, és a close() akkor is sikerül, ha még élnek rekordok.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        if size and (size < FILE_HEADER.size or FILE_HEADER.unpack_from(self._map, 0)[0] != MAGIC):
+            self.close()
+            raise ValueError(f"Nem forgalmi napló: {path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def _scan(self):
+        """(típus, jelzők, cím index, időbélyeg, kezdet, vég) hármasok; a csonka utolsó rekordot kihagyja"""
+        data = self._map
+        size = len(data)
+        offset = FILE_HEADER.size if size else 0
+        unpack = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        while offset + header_size <= size:
+            record_type, flags, index, timestamp, length = unpack(data, offset)
+            start = offset + header_size
+            end = start + length
+            if end > size:
+                break
+            yield record_type, flags, index, timestamp, start, end
+            offset = end
+
+    def scan_addresses(self):
+        """A naplóban szereplő címek az index sorrendjében"""
+        return [self._map[start:end].decode('utf-8')
+                for record_type, _, _, _, start, end in self._scan() if record_type == ADDRESS]
+
+    def records(self, *record_types):
+        """A megadott típusú (üres: minden) rekordok időrendben"""
+        addresses = []
+        data = self._map
+        for record_type, flags, index, timestamp, start, end in self._scan():
+            if record_type == ADDRESS:
+                addresses.append(data[start:end].decode('utf-8'))
+            elif not record_types or record_type in record_types:
+                # Az mmap szeletelése bytes másolatot ad, nem exportált puffert
+                yield LogRecord(record_type, flags, addresses[index], timestamp, data[start:end])
+
+    def __iter__(self):
+        return self.records()
+
+    def summary(self):
+        """Rekordszám típusonként, címszám és időtartam"""
+        counts = {}
+        first = last = None
+        addresses = 0
+        for record_type, _, _, timestamp, _, _ in self._scan():
+            if record_type == ADDRESS:
+                addresses += 1
+                continue
+            counts[record_type] = counts.get(record_type, 0) + 1
+            first = timestamp if first is None else first
+            last = timestamp
+        names = {ADVERT: 'advert', INQUIRY: 'inquiry', CONNECT: 'connect', RFCOMM: 'rfcomm',
+                 GATT_READ: 'gatt_read', GATT_NOTIFY: 'gatt_notify', GATT_TABLE: 'gatt_table'}
+        return {'records': {names.get(k, str(k)): v for k, v in sorted(counts.items())},
+                'addresses': addresses, 'seconds': (last - first) if first is not None else 0.0}
+
+
+# Folyamatszintű rögzítő, a CLI és a GUI is ezt használja
+capture = TrafficRecorder()
+
+
+# --- Visszajátszás ---
+
+class ReplayClock:
+    """A napló időbélyegeinek leképezése a jelenre; speed=0 esetén nincs várakozás"""
+
+    def __init__(self, origin, speed=1.0):
+        self.origin = origin
+        self.speed = speed
+        self.start = time.monotonic()
+        self._count = 0
+
+    def delay(self, timestamp):
+        if not self.speed:
+            return 0.0
+        return (timestamp - self.origin) / self.speed - (time.monotonic() - self.start)
+
+    async def wait(self, timestamp):
+        delay = self.delay(timestamp)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            # Maximális sebességnél is időnként átadjuk a vezérlést az eseményhuroknak
+            self._count += 1
+            if self._count % 256 == 0:
+                await asyncio.sleep(0)
+
+    def wait_sync(self, timestamp, stop_event=None):
+        delay = self.delay(timestamp)
+        if delay > 0:
+            if stop_event is not None:
+                return not stop_event.wait(delay)
+            time.sleep(delay)
+        return True
+
+    def scaled(self, seconds):
+        return seconds / self.speed if self.speed else 0.0
+
+
+class ReplayData:
+    """A napló kis volumenű részei (inquiry, kapcsolódás, RFCOMM, GATT) előre indexelve
+
+    A hirdetések (a nagy tömeg) nem kerülnek memóriába, azokat a szkenner
+    minden indításkor közvetlenül a naplóból olvassa.
+    """
+
+    def __init__(self, log, speed=1.0):
+        self.log = log
+        self.speed = speed
+        self.origin = None
+        self.inquiries = []
+        self.names = {}
+        self.connects = {}
+        self.rfcomm = {}
+        self.gatt_reads = {}
+        self.notifications = {}
+        self.gatt_tables = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        for record in log.records():
+            if self.origin is None:
+                self.origin = record.timestamp
+            if record.type == INQUIRY:
+                inquiry = decode_inquiry(record.payload)
+                self.inquiries.append((record.timestamp, record.address, inquiry))
+                if inquiry['name']:
+                    self.names[record.address] = inquiry['name']
+            elif record.type == ADVERT:
+                continue
+            elif record.type == CONNECT:
+                connect = decode_connect(record.payload)
+                self.connects.setdefault((record.address, connect['transport']), []).append(
+                    (record.timestamp, connect))
+            elif record.type == RFCOMM and not record.flags & OUTGOING:
+                self.rfcomm.setdefault(record.address, []).append((record.timestamp, record.payload))
+            elif record.type in (GATT_READ, GATT_NOTIFY):
+                (handle,) = _HANDLE.unpack_from(record.payload, 0)
+                data = record.payload[_HANDLE.size:]
+                if record.type == GATT_READ:
+                    self.gatt_reads.setdefault((record.address, handle), []).append(data)
+                else:
+                    self.notifications.setdefault(record.address, []).append((record.timestamp, handle, data))
+            elif record.type == GATT_TABLE:
+                self.gatt_tables[record.address] = json.loads(record.payload.decode('utf-8'))
+
+    def clock(self, origin=None):
+        return ReplayClock(self.origin if origin is None else origin, self.speed)
+
+    def next_item(self, key, items):
+        """A következő rögzített elem egy kulcshoz; a végén elölről kezdi"""
+        if not items:
+            return None
+        with self._lock:
+            position = self._cursors.get(key, 0)
+            self._cursors[key] = position + 1
+        return items[position % len(items)]
+
+    def next_connect(self, address, transport, channel=None):
+        attempts = self.connects.get((address, transport), [])
+        if channel is not None:
+            attempts = [a for a in attempts if a[1]['channel'] == channel]
+        return self.next_item(('connect', address, transport, channel), attempts)
+
+
+def make_replay_bleak_module(data):
+    """bleak helyettesítő, amely a naplóból játssza vissza a hirdetéseket és a GATT forgalmat"""
+    module = types.ModuleType('bleak')
+
+    class BLEDevice:
+        def __init__(self, address, name, rssi):
+            self.address = address
+            self.name = name
+            self.rssi = rssi
+            self.metadata = {}
+            self.details = None
+
+    class AdvertisementData:
+        def __init__(self, rssi=None, local_name=None, manufacturer_data=None, service_data=None,
+                     service_uuids=None, tx_power=None):
+            self.rssi = rssi
+            self.local_name = local_name
+            self.manufacturer_data = manufacturer_data or {}
+            self.service_data = service_data or {}
+            self.service_uuids = service_uuids or []
+            self.tx_power = tx_power
+
+    class BleakScanner:
+        def __init__(self, detection_callback=None, **kwargs):
+            self._callback = detection_callback
+            self._task = None
+            self.advertisements = 0
+
+        async def _replay(self):
+            clock = data.clock()
+            for record in data.log.records(ADVERT):
+                await clock.wait(record.timestamp)
+                fields = decode_advert(record.payload)
+                self.advertisements += 1
+                if self._callback is not None:
+                    self._callback(BLEDevice(record.address, fields['local_name'], fields['rssi']),
+                                   AdvertisementData(**fields))
+
+        async def start(self):
+            self._task = asyncio.ensure_future(self._replay())
+
+        async def stop(self):
+            if self._task is not None:
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+                self._task = None
+
+        @classmethod
+        async def discover(cls, timeout=5.0, **kwargs):
+            devices = {}
+            scanner = cls(detection_callback=lambda d, a: devices.__setitem__(d.address, d))
+            await scanner.start()
+            await asyncio.sleep(timeout)
+            await scanner.stop()
+            return list(devices.values())
+
+    class BleakClient:
+        def __init__(self, address, timeout=10.0, disconnected_callback=None, **kwargs):
+            self.address = address
+            self.is_connected = False
+            self.services = []
+            self._disconnected_callback = disconnected_callback
+            self._notify_tasks = {}
+
+        async def connect(self, timeout=10.0):
+            attempt = data.next_connect(self.address, 'ble')
+            if attempt is None:
+                raise OSError(f"Nincs rögzített kapcsolódás: {self.address}")
+            _, connect = attempt
+            latency = data.clock().scaled(connect['duration'])
+            if latency > timeout:
+                await asyncio.sleep(timeout)
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(latency)
+            if not connect['ok']:
+                raise OSError("Rögzített sikertelen kapcsolódás")
+            self.services = [types.SimpleNamespace(
+                uuid=service['uuid'], handle=service['handle'], description=service['description'],
+                characteristics=[types.SimpleNamespace(**char) for char in service['characteristics']])
+                for service in data.gatt_tables.get(self.address, [])]
+            self.is_connected = True
+            return True
+
+        async def disconnect(self):
+            for task in self._notify_tasks.values():
+                task.cancel()
+            self._notify_tasks = {}
+            self.is_connected = False
+            return True
+
+        async def get_services(self):
+            return self.services
+
+        async def read_gatt_char(self, char):
+            handle = getattr(char, 'handle', char)
+            value = data.next_item(('read', self.address, handle), data.gatt_reads.get((self.address, handle)))
+            if value is None:
+                raise OSError(f"Nincs rögzített olvasás: handle {handle}")
+            return bytearray(value)
+
+        async def write_gatt_char(self, char, value, response=False):
+            return None
+
+        async def start_notify(self, char, callback):
+            handle = getattr(char, 'handle', char)
+            notifications = [n for n in data.notifications.get(self.address, []) if n[1] == handle]
+
+            async def replay():
+                if not notifications:
+                    return
+                clock = data.clock(notifications[0][0])
+                sender = types.SimpleNamespace(handle=handle)
+                for timestamp, _, value in notifications:
+                    await clock.wait(timestamp)
+                    callback(sender, bytearray(value))
+
+            self._notify_tasks[handle] = asyncio.ensure_future(replay())
+
+        async def stop_notify(self, char):
+            task = self._notify_tasks.pop(getattr(char, 'handle', char), None)
+            if task is not None:
+                task.cancel()
+
+        async def __aenter__(self):
+            await self.connect()
+            return self
+
+        async def __aexit__(self, *exc_info):
+            await self.disconnect()
+
+    module.BLEDevice = BLEDevice
+    module.AdvertisementData = AdvertisementData
+    module.BleakScanner = BleakScanner
+    module.BleakClient = BleakClient
+    return module
+
+
+def make_replay_bluetooth_module(data):
+    """PyBluez helyettesítő: inquiry, SDP, RFCOMM kapcsolódás és fogadott adat a naplóból"""
+
+    class BluetoothSocket:
+        """Sikeres kapcsolódás után egy helyi socketpár egyik vége, a másikra a rögzített adat érkezik"""
+
+        def __init__(self, proto=RFCOMM):
+            self.timeout = None
+            self.peer = None
+            self._sock = None
+            self._closed = threading.Event()
+
+        def settimeout(self, timeout):
+            self.timeout = timeout
+            if self._sock is not None:
+                self._sock.settimeout(timeout)
+
+        def bind(self, address):
+            # A helyi adapter címe nem számít
+            pass
+
+        def setblocking(self, flag):
+            self.settimeout(None if flag else 0.0)
+
+        def connect(self, address):
+            attempt = data.next_connect(address[0], 'classic', address[1])
+            if attempt is None:
+                raise BluetoothError("Host is down")
+            connected_at, connect = attempt
+            clock = data.clock()
+            time.sleep(clock.scaled(connect['duration']))
+            if not connect['ok']:
+                raise BluetoothError("Connection refused")
+            self._sock, remote = socket.socketpair()
+            self._sock.settimeout(self.timeout)
+            self.peer = address
+            incoming = [item for item in data.rfcomm.get(address[0], []) if item[0] >= connected_at]
+            threading.Thread(target=self._feed, args=(remote, incoming, data.clock(connected_at)),
+                             daemon=True).start()
+
+        def _feed(self, remote, incoming, clock):
+            try:
+                for timestamp, payload in incoming:
+                    if not clock.wait_sync(timestamp, self._closed):
+                        break
+                    remote.sendall(payload)
+                # A kimenő adatot elnyeljük, amíg a kapcsolat nyitva van
+                remote.settimeout(0.2)
+                while not self._closed.is_set():
+                    try:
+                        if not remote.recv(65536):
+                            break
+                    except socket.timeout:
+                        pass
+            except OSError:
+                pass
+            finally:
+                remote.close()
+
+        def getpeername(self):
+            return self.peer
+
+        def close(self):
+            self._closed.set()
+            if self._sock is not None:
+                self._sock.close()
+            self.peer = None
+
+        def __getattr__(self, name):
+            # send, recv, recv_into, fileno stb. a helyi socketre
+            if self._sock is None:
+                raise BluetoothError("Not connected")
+            return getattr(self._sock, name)
+
+    def discover_devices(duration=8, lookup_names=False, **kwargs):
+        clock = data.clock()
+        end_time = time.monotonic() + duration * 1.28
+        found = {}
+        for timestamp, address, inquiry in data.inquiries:
+            if clock.delay(timestamp) > end_time - time.monotonic():
+                break
+            clock.wait_sync(timestamp)
+            found.setdefault(address, inquiry['name'] or data.names.get(address))
+        if lookup_names:
+            return list(found.items())
+        return list(found)
+
+    def inquiry(duration, cancel):
+        end_time = time.monotonic() + duration * 1.28
+        clock = data.clock()
+        for timestamp, address, found in data.inquiries:
+            if cancel.is_set() or clock.delay(timestamp) > end_time - time.monotonic():
+                break
+            if not clock.wait_sync(timestamp, cancel):
+                break
+            yield address, found['device_class'], found['rssi'], found['name']
+
+    def service_channels(address):
+        return sorted({connect['channel'] for _, connect in data.connects.get((address, 'classic'), [])
+                       if connect['ok'] and connect['channel']})
+
+    def lookup_name(address, timeout=10):
+        return data.names.get(address)
+
+    return make_fake_bluetooth_module(BluetoothSocket, discover_devices, inquiry, service_channels, lookup_name)
+
+
+def install_replay(path, speed=1.0):
+    """A visszajátszó bleak és bluetooth modul betöltése a sys.modules-ba
+
+    A háttérmodulok első használata előtt kell hívni (a bluetooth_backends
+    késleltetett betöltése ekkor már ezeket találja). speed=0: maximális sebesség.
+    """
+    log = TrafficLog(path)
+    data = ReplayData(log, speed)
+    modules = {'bleak': make_replay_bleak_module(data), 'bluetooth': make_replay_bluetooth_module(data)}
+    sys.modules.update(modules)
+    # A rögzített futás nem függ a gép adaptereitől; itt importálva, mert a bluetooth_transports ezt a modult használja
+    from bluetooth_transports import default_health
+    default_health.assume(True)
+    return data